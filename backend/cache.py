@@ -0,0 +1,213 @@
+"""
+Cache - Small key/value caches shared by the backend modules
+
+- MemoryCache: in-process LRU with a TTL (microsecond hits)
+- SQLiteCache: on-disk store that survives restarts (one SQLite file)
+- TieredCache: memory in front of disk, promoting disk hits
+
+Values must be JSON-serializable (the disk tier stores them as JSON).
+
+SIMPLICITY: stdlib only, one lock per cache, no background threads - expired
+entries are dropped when they are looked up or when the cache is full.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    Args:
+        max_entries: Least recently used entries are evicted past this size
+        ttl: Seconds an entry stays valid (0 = never expires)
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, created_at: Optional[float] = None):
+        """Store value; created_at backdates it (it expires ttl seconds after that)."""
+        with self._lock:
+            self._entries[key] = (value, time.time() if created_at is None else created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache:
+    """
+    Thread-safe on-disk cache in a single SQLite file.
+
+    Args:
+        path: Database file (parent directories are created)
+        max_entries: Least recently used rows are deleted past this size
+        ttl: Seconds an entry stays valid (0 = never expires)
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, time it was stored) for a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE cache SET used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY used_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """
+    Memory cache in front of an optional disk cache.
+
+    Disk hits are copied into memory so the next lookup is an in-process hit;
+    the copy keeps the disk entry's age, so it expires when the disk entry does.
+
+    Args:
+        memory: The in-process tier
+        disk: The persistent tier (None = memory only)
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, created_at = entry
+                self.memory.set(key, value, created_at)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+def build_cache(max_entries: int, ttl: float, path: str = "", disk_entries: int = 10000) -> TieredCache:
+    """
+    Build a memory cache, backed by SQLite at `path` when one is given.
+
+    Args:
+        max_entries: Size of the memory tier
+        ttl: Seconds entries stay valid in both tiers
+        path: SQLite file for the disk tier ("" = memory only)
+        disk_entries: Size of the disk tier
+    """
+    disk = None
+    if path:
+        try:
+            disk = SQLiteCache(path, max_entries=disk_entries, ttl=ttl)
+        except sqlite3.Error as e:
+            print(f"[cache] Warning: Disk cache unavailable at {path}: {e}")
+    return TieredCache(MemoryCache(max_entries, ttl), disk)
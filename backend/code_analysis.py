@@ -0,0 +1,217 @@
+"""
+Code Analysis - Static (AST) facts about a generated script
+
+Used to key caches by what the code does rather than how it is formatted,
+and to spot scripts whose output can differ from run to run.
+
+SIMPLICITY: one ast.parse per question, no execution. Code that doesn't
+parse is reported as-is (a SyntaxError is itself a deterministic result).
+"""
+
+import ast
+import hashlib
+from typing import Dict, List, Optional, Set
+
+# Importing any of these (or a submodule) makes a script's output time-,
+# randomness-, environment- or network-dependent
+NONDETERMINISTIC_MODULES = {
+    # Time and randomness
+    "time", "datetime", "calendar", "random", "secrets", "uuid",
+    # Host environment and processes
+    "os", "platform", "getpass", "socket", "subprocess", "multiprocessing", "threading",
+    "tempfile", "glob", "shutil", "pathlib",
+    # Network
+    "urllib", "http", "ftplib", "smtplib", "ssl", "requests", "httpx", "aiohttp", "urllib3", "websockets",
+    # Third-party randomness
+    "numpy.random", "faker",
+}
+
+# Builtins whose result depends on the outside world or the process
+NONDETERMINISTIC_CALLS = {"input", "id", "hash", "open"}
+
+# Builtins whose result doesn't depend on the order they see items in
+ORDER_FREE_CALLS = {"sorted", "sum", "min", "max", "len", "set", "frozenset", "any", "all"}
+
+
+def normalize_code(code: str) -> str:
+    """
+    Canonical form of code: its AST dump, so formatting and comments don't matter.
+
+    Falls back to the stripped source when the code doesn't parse.
+    """
+    try:
+        return ast.dump(ast.parse(code))
+    except (SyntaxError, ValueError):
+        return code.strip()
+
+
+def code_hash(code: str) -> str:
+    """Short hash of normalize_code(code) - equal for code that differs only in formatting/comments."""
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()[:16]
+
+
+def _nondeterministic_prefix(module: str) -> Optional[str]:
+    """The NONDETERMINISTIC_MODULES entry that module is (or is inside of), if any."""
+    parts = module.split(".")
+    for i in range(len(parts), 0, -1):
+        if ".".join(parts[:i]) in NONDETERMINISTIC_MODULES:
+            return ".".join(parts[:i])
+    return None
+
+
+def _import_aliases(tree: ast.Module) -> Dict[str, str]:
+    """Local name -> full dotted name it refers to, for every absolute import."""
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+                else:
+                    # "import os.path" binds "os"
+                    root = alias.name.split(".")[0]
+                    aliases[root] = root
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            aliases.update((alias.asname or alias.name, f"{node.module}.{alias.name}")
+                           for alias in node.names if alias.name != "*")
+    return aliases
+
+
+def _dotted_name(node: ast.expr) -> Optional[str]:
+    """The dotted name ("np.random.rand") of an attribute chain, None if it doesn't start at a name."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    return ".".join([node.id] + parts[::-1])
+
+
+def _shows_set_order(tree: ast.Module) -> bool:
+    """
+    Whether the iteration order of a set that may hold strings can reach the
+    output: the set printed or formatted into a string (f-string, str(),
+    repr(), join()), turned into a list or tuple, looped over by a loop that
+    prints, or walked by a comprehension whose result isn't order-free
+    (sorted(), sum(), len(), ...).
+    """
+    set_names = {target.id for node in ast.walk(tree) if isinstance(node, ast.Assign) and _is_set(node.value)
+                 for target in node.targets if isinstance(target, ast.Name)}
+
+    def is_set(node: ast.expr) -> bool:
+        return _is_set(node) or (isinstance(node, ast.Name) and node.id in set_names)
+
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if name == "print" and any(is_set(arg) for arg in node.args):
+                return True
+            if name in ("str", "repr", "list", "tuple", "enumerate") and node.args and is_set(node.args[0]):
+                return True
+            if isinstance(node.func, ast.Attribute) and node.func.attr == "join" and node.args \
+                    and is_set(node.args[0]):
+                return True
+        elif isinstance(node, ast.FormattedValue) and is_set(node.value):
+            return True
+        elif isinstance(node, (ast.For, ast.AsyncFor)) and is_set(node.iter):
+            if any(_calls_print(child) for statement in node.body for child in ast.walk(statement)):
+                return True
+        elif isinstance(node, (ast.ListComp, ast.GeneratorExp, ast.DictComp)) \
+                and any(is_set(generator.iter) for generator in node.generators):
+            parent = parents.get(node)
+            if not (isinstance(parent, ast.Call) and isinstance(parent.func, ast.Name)
+                    and parent.func.id in ORDER_FREE_CALLS):
+                return True
+    return False
+
+
+def _calls_print(node: ast.AST) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print"
+
+
+def _is_set(node: ast.expr) -> bool:
+    """A set display, comprehension or set()/frozenset() call - except a display of numbers only."""
+    if isinstance(node, ast.Set):
+        return not all(isinstance(item, ast.Constant) and isinstance(item.value, (int, float))
+                       for item in node.elts)
+    if isinstance(node, ast.SetComp):
+        return True
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("set", "frozenset")
+
+
+def imported_modules(code: str) -> Set[str]:
+    """
+    Full dotted names of every module the code imports (absolute imports only).
+
+    Returns:
+        e.g. {"os.path", "numpy", "collections"}; empty if the code doesn't parse
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return set()
+
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module)
+    return modules
+
+
+def nondeterminism_reasons(code: str) -> List[str]:
+    """
+    Why the code's output may differ between identical runs.
+
+    Returns:
+        Human-readable reasons, e.g. ["imports random", "calls input()"];
+        an empty list means the script looks deterministic
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return []
+
+    # "from numpy import random" pulls in numpy.random - check the imported names too
+    names = imported_modules(code)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.update(f"{node.module}.{alias.name}" for alias in node.names if alias.name != "*")
+
+    reasons = []
+    imported = set()
+    for module in sorted(names):
+        matched = _nondeterministic_prefix(module)
+        if matched:
+            reasons.append(f"imports {module}")
+            imported.add(matched)
+
+    # "import numpy as np" + "np.random.rand()" only imports numpy - follow
+    # the aliases through attribute chains to the module actually used
+    aliases = _import_aliases(tree)
+    used = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            chain = _dotted_name(node)
+            root = chain.split(".")[0] if chain else None
+            if root in aliases:
+                matched = _nondeterministic_prefix(aliases[root] + chain[len(root):])
+                if matched and matched not in imported:
+                    used.add(matched)
+    reasons.extend(f"uses {module}" for module in sorted(used))
+
+    if _shows_set_order(tree):
+        # Iteration order of a set of strings changes with the hash seed
+        reasons.append("outputs set order")
+
+    called = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in NONDETERMINISTIC_CALLS:
+            called.add(node.func.id)
+        elif isinstance(node, ast.Name) and node.id == "__import__":
+            called.add("__import__")
+    reasons.extend(f"calls {name}()" for name in sorted(called))
+    return reasons
@@ -5,6 +5,7 @@ Simple and straightforward: just load environment variables and validate they ex
 """
 
 from dotenv import load_dotenv
+import json
 import os
 
 # Load environment variables from .env file
@@ -12,10 +13,140 @@ load_dotenv()
 
 # API Keys for sponsor services
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Shared LLM HTTP pool (see llm_client.py) - HTTP/2 is used when the h2 package is installed
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 GALILEO_API_KEY = os.getenv("GALILEO_API_KEY")
 DAYTONA_API_KEY = os.getenv("DAYTONA_API_KEY")
 DAYTONA_API_URL = os.getenv("DAYTONA_API_URL", "https://app.daytona.io/api")
+DAYTONA_CONNECTION_POOL_SIZE = int(os.getenv("DAYTONA_CONNECTION_POOL_SIZE", "32"))  # Keep-alive connections per client
+
+# Sandbox pool - pre-warmed Daytona sandboxes leased by execute_code
+SANDBOX_IMAGE = os.getenv("SANDBOX_IMAGE", "python:3.11-slim")
+SANDBOX_POOL_MIN_SIZE = int(os.getenv("SANDBOX_POOL_MIN_SIZE", "1"))
+SANDBOX_POOL_MAX_SIZE = int(os.getenv("SANDBOX_POOL_MAX_SIZE", "4"))  # Per pool: the base image and each dependency snapshot
+SANDBOX_POOL_MAX_USES = int(os.getenv("SANDBOX_POOL_MAX_USES", "20"))
+SANDBOX_POOL_HEALTH_INTERVAL = float(os.getenv("SANDBOX_POOL_HEALTH_INTERVAL", "30"))
+# Scripts up to this size are embedded in the code_run payload instead of uploaded
+SANDBOX_INLINE_LIMIT_BYTES = int(os.getenv("SANDBOX_INLINE_LIMIT_BYTES", str(256 * 1024)))
+
+# Sandbox teardown - deletes run in the background with retries; a reaper deletes
+# labelled sandboxes of dead processes (this host) that have been inactive longer
+# than the TTL (0 = off), and any labelled sandbox after the much longer foreign TTL
+SANDBOX_DELETE_ATTEMPTS = int(os.getenv("SANDBOX_DELETE_ATTEMPTS", "4"))
+SANDBOX_DELETE_RETRY_DELAY = float(os.getenv("SANDBOX_DELETE_RETRY_DELAY", "2"))
+SANDBOX_ORPHAN_TTL = float(os.getenv("SANDBOX_ORPHAN_TTL", "3600"))
+SANDBOX_REAP_INTERVAL = float(os.getenv("SANDBOX_REAP_INTERVAL", "600"))
+SANDBOX_FOREIGN_ORPHAN_TTL = float(os.getenv("SANDBOX_FOREIGN_ORPHAN_TTL", str(24 * 3600)))
+
+# Kernel - a resident fork-server in each pooled sandbox (and for the local
+# backend) that pre-imports these modules and forks a fresh child per run
+KERNEL_ENABLED = os.getenv("KERNEL_ENABLED", "true").lower() in ("1", "true", "yes")
+KERNEL_PRELOAD = [name.strip() for name in os.getenv("KERNEL_PRELOAD", "numpy,pandas").split(",") if name.strip()]
+
+# Dependency snapshots - scripts importing third-party packages run in a snapshot
+# that has them preinstalled (built once per dependency set in the background, then cached)
+DEPENDENCY_SNAPSHOTS_ENABLED = os.getenv("DEPENDENCY_SNAPSHOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+SANDBOX_PYTHON_VERSION = os.getenv("SANDBOX_PYTHON_VERSION", "3.11")
+DEPENDENCY_CACHE_PATH = os.getenv("DEPENDENCY_CACHE_PATH", ".cache/dependency_snapshots.sqlite")
+SNAPSHOT_BUILD_TIMEOUT = float(os.getenv("SNAPSHOT_BUILD_TIMEOUT", "900"))
+SNAPSHOT_RETRY_AFTER = float(os.getenv("SNAPSHOT_RETRY_AFTER", "3600"))
+# While a snapshot builds (in the background), packages are pip-installed into a base sandbox
+RUNTIME_INSTALL_TIMEOUT = float(os.getenv("RUNTIME_INSTALL_TIMEOUT", "300"))
+# Snapshots built outside the app, as JSON: {"snapshot-name": ["numpy", "pandas"], ...}
+PREBUILT_SNAPSHOTS = json.loads(os.getenv("PREBUILT_SNAPSHOTS", "{}"))
+
+# Execution backend - "daytona" (sandboxed, default) or "local" (trusted/offline only)
+EXECUTION_BACKEND = os.getenv("EXECUTION_BACKEND", "daytona")
+LOCAL_CPU_SECONDS = int(os.getenv("LOCAL_CPU_SECONDS", "30"))
+LOCAL_MEMORY_MB = int(os.getenv("LOCAL_MEMORY_MB", "512"))
+LOCAL_FILE_SIZE_MB = int(os.getenv("LOCAL_FILE_SIZE_MB", "50"))
+
+# Output caps - each captured stream keeps its first/last N characters and drops the middle
+OUTPUT_HEAD_CHARS = int(os.getenv("OUTPUT_HEAD_CHARS", str(64 * 1024)))
+OUTPUT_TAIL_CHARS = int(os.getenv("OUTPUT_TAIL_CHARS", str(64 * 1024)))
+# Directory the full, uncapped output is spilled to (empty = don't spill)
+OUTPUT_SPILL_DIR = os.getenv("OUTPUT_SPILL_DIR", "")
+
+# Execution result cache - repeat runs of the same (normalized) code skip the sandbox
+EXECUTION_CACHE_ENABLED = os.getenv("EXECUTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXECUTION_CACHE_SIZE = int(os.getenv("EXECUTION_CACHE_SIZE", "256"))
+EXECUTION_CACHE_TTL = float(os.getenv("EXECUTION_CACHE_TTL", "3600"))
+# SQLite file for a persistent cache tier (empty = memory only)
+EXECUTION_CACHE_PATH = os.getenv("EXECUTION_CACHE_PATH", "")
+# Don't cache scripts that use time, randomness, the environment or the network
+EXECUTION_CACHE_DETERMINISTIC_ONLY = os.getenv("EXECUTION_CACHE_DETERMINISTIC_ONLY", "true").lower() in ("1", "true", "yes")
+
+# Generation cache - identical prompts (same system prompt, model and parameters)
+# reuse the generated code instead of calling the LLM again
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "512"))
+GENERATION_CACHE_DISK_SIZE = int(os.getenv("GENERATION_CACHE_DISK_SIZE", "10000"))
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+# SQLite file for the persistent tier (empty = memory only)
+GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", ".cache/generations.sqlite")
+
+# Model routing - easy jobs go to the fast tier, hard ones and escalations
+# (failed fast-tier code, repeated fixes) to the strong tier (see model_router.py)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "gpt-4o-mini")
+ROUTER_STRONG_MODEL = os.getenv("ROUTER_STRONG_MODEL", "gpt-4o")
+ROUTER_HARD_PROMPT_WORDS = int(os.getenv("ROUTER_HARD_PROMPT_WORDS", "60"))
+ROUTER_HARD_FIX_LINES = int(os.getenv("ROUTER_HARD_FIX_LINES", "80"))
+# Below this fast-tier success rate (over the last ROUTER_WINDOW outcomes,
+# once there are ROUTER_MIN_SAMPLES) everything goes to the strong tier
+ROUTER_MIN_FAST_SUCCESS = float(os.getenv("ROUTER_MIN_FAST_SUCCESS", "0.6"))
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+
+# Fix context - shrink the broken code + error sent to fix_code to this many
+# tokens (traceback pruning, stubbing definitions that aren't on the stack)
+FIX_CONTEXT_ENABLED = os.getenv("FIX_CONTEXT_ENABLED", "true").lower() in ("1", "true", "yes")
+FIX_CONTEXT_TOKEN_BUDGET = int(os.getenv("FIX_CONTEXT_TOKEN_BUDGET", "3000"))
+# Error text is never trimmed below this, even if the code alone is over budget
+FIX_CONTEXT_MIN_ERROR_TOKENS = int(os.getenv("FIX_CONTEXT_MIN_ERROR_TOKENS", "300"))
+# Shorter definitions aren't worth stubbing
+FIX_CONTEXT_MIN_STUB_LINES = int(os.getenv("FIX_CONTEXT_MIN_STUB_LINES", "3"))
+
+# Fix mode - "diff" asks the model for SEARCH/REPLACE edits that are applied
+# locally (full rewrite if they don't apply), "full" for the whole program
+FIX_MODE = os.getenv("FIX_MODE", "diff").lower()
+# Shorter programs are cheap to rewrite - they always use full mode
+FIX_DIFF_MIN_LINES = int(os.getenv("FIX_DIFF_MIN_LINES", "20"))
+# How similar (0-1) a block of code must be to an edit's SEARCH text to take the edit
+FIX_PATCH_MIN_SIMILARITY = float(os.getenv("FIX_PATCH_MIN_SIMILARITY", "0.8"))
+
+# Rule fixer - try deterministic AST fixes (missing stdlib import, unprinted
+# result, uncalled functions) before calling the LLM (see rule_fixer.py)
+RULE_FIXER_ENABLED = os.getenv("RULE_FIXER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Fix cache - the same error on the same code reuses a fix that already passed
+# re-execution (keyed by normalized code, exception type and failing line)
+FIX_CACHE_ENABLED = os.getenv("FIX_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+FIX_CACHE_SIZE = int(os.getenv("FIX_CACHE_SIZE", "256"))
+FIX_CACHE_DISK_SIZE = int(os.getenv("FIX_CACHE_DISK_SIZE", "5000"))
+FIX_CACHE_TTL = float(os.getenv("FIX_CACHE_TTL", str(30 * 24 * 3600)))
+# SQLite file for the persistent tier (empty = memory only)
+FIX_CACHE_PATH = os.getenv("FIX_CACHE_PATH", ".cache/fixes.sqlite")
+
+# Repair loop - fix and re-run until the code works or a budget runs out
+REPAIR_MAX_ITERATIONS = int(os.getenv("REPAIR_MAX_ITERATIONS", "3"))
+REPAIR_MAX_TOKENS = int(os.getenv("REPAIR_MAX_TOKENS", "30000"))
+REPAIR_MAX_SECONDS = float(os.getenv("REPAIR_MAX_SECONDS", "180"))
+
+# Speculative generation - ask for this many candidates per prompt and run them
+# all at once; the first that succeeds wins (1 = off; costs ~N x output tokens)
+GENERATION_CANDIDATES = int(os.getenv("GENERATION_CANDIDATES", "1"))
+
+# Pre-flight - check code locally (syntax, undefined names, never prints) and
+# hand doomed scripts straight back without creating a sandbox
+PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Keep a copy of every executed script in generated_code/ (written off the critical path)
+SAVE_GENERATED_CODE = os.getenv("SAVE_GENERATED_CODE", "true").lower() in ("1", "true", "yes")
 
 def validate_config():
     """Validate that all required API keys are present."""
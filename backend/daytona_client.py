@@ -0,0 +1,81 @@
+"""
+Daytona Client - One long-lived, shared Daytona client per process
+
+Building a Daytona client sets up its API clients and HTTP connection pools,
+and every fresh client pays new TCP/TLS handshakes on its first requests.
+This registry builds the client lazily on first use and hands the same
+instance to the executor, every sandbox pool and the lifecycle manager, so
+keep-alive connections are reused across calls (and across Streamlit reruns,
+which re-execute the script but keep imported modules).
+
+SIMPLICITY: a dict keyed by (api_url, api_key) behind one lock - changing
+the credentials gets a new client, everything else shares one.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from backend import config
+
+_clients: Dict[Tuple[str, str], object] = {}
+_lock = threading.Lock()
+_stats = {"created": 0, "reused": 0, "setup_ms": 0.0}
+
+
+def get_client(api_key: Optional[str] = None, api_url: Optional[str] = None):
+    """
+    Return the shared Daytona client, creating it on first use.
+
+    Args:
+        api_key: Defaults to config.DAYTONA_API_KEY
+        api_url: Defaults to config.DAYTONA_API_URL
+
+    Returns:
+        Daytona client (thread-safe; share it, don't close it)
+    """
+    api_key = api_key or config.DAYTONA_API_KEY
+    api_url = api_url or config.DAYTONA_API_URL
+    if not api_key:
+        raise ValueError("DAYTONA_API_KEY not found in environment")
+
+    key = (api_url, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _stats["reused"] += 1
+            return client
+        client = new_client(api_key, api_url)
+        _clients[key] = client
+        return client
+
+
+def new_client(api_key: str, api_url: str):
+    """
+    Build a standalone Daytona client (bypasses the registry - prefer get_client).
+
+    Returns:
+        Daytona client with a keep-alive pool of config.DAYTONA_CONNECTION_POOL_SIZE
+    """
+    from daytona import Daytona, DaytonaConfig
+
+    started = time.perf_counter()
+    client = Daytona(DaytonaConfig(
+        api_key=api_key,
+        api_url=api_url,
+        connection_pool_maxsize=config.DAYTONA_CONNECTION_POOL_SIZE,
+    ))
+    _stats["created"] += 1
+    _stats["setup_ms"] += (time.perf_counter() - started) * 1000
+    return client
+
+
+def reset_clients():
+    """Forget the shared clients (e.g. after rotating credentials)."""
+    with _lock:
+        _clients.clear()
+
+
+def client_stats() -> dict:
+    """How many clients were built vs reused, and total setup time spent."""
+    with _lock:
+        return dict(_stats, cached=len(_clients))
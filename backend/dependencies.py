@@ -0,0 +1,208 @@
+"""
+Dependencies - Sandbox environments that already have a script's imports installed
+
+The generator tells the model to assume libraries are installed, but the base
+image is bare python:3.11-slim. This module reads a script's imports (AST),
+maps them to pip packages, and resolves them to a Daytona snapshot that has
+them preinstalled:
+
+1. A prebuilt snapshot from config.PREBUILT_SNAPSHOTS covering the packages
+2. A snapshot built earlier for exactly this dependency set (build cache)
+3. A new snapshot built from Image.debian_slim().pip_install(...) - in the
+   background: until it is ready the script runs on the base image and the
+   packages are pip-installed at run time, so the first run doesn't wait
+   for a build that can take SNAPSHOT_BUILD_TIMEOUT
+
+SIMPLICITY: one snapshot per dependency set, named after its hash, so the
+build cache is just "have we built this name yet" and survives restarts.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+from backend import config
+from backend.cache import TieredCache, build_cache
+from backend.code_analysis import imported_modules
+
+# Import name -> pip package, where the two differ
+IMPORT_TO_PACKAGE = {
+    "PIL": "pillow",
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python-headless",
+    "dateutil": "python-dateutil",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "jwt": "pyjwt",
+    "magic": "python-magic",
+    "pptx": "python-pptx",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "yaml": "pyyaml",
+    "Crypto": "pycryptodome",
+    "OpenSSL": "pyopenssl",
+    "attr": "attrs",
+    "google.protobuf": "protobuf",
+}
+
+# Importable without installing anything (interpreter internals, not in stdlib_module_names)
+_ALWAYS_AVAILABLE = {"__future__", "__main__", "builtins"}
+
+_build_cache: Optional[TieredCache] = None
+_build_locks: Dict[str, threading.Lock] = {}
+_builds: Dict[str, threading.Thread] = {}
+_locks_guard = threading.Lock()
+_verified = set()
+
+
+def required_packages(codes: Iterable[str]) -> List[str]:
+    """
+    Pip packages the given scripts import that aren't in the standard library.
+
+    Args:
+        codes: Script sources (a batch shares one environment)
+
+    Returns:
+        Sorted, de-duplicated package names, e.g. ["numpy", "scikit-learn"]
+    """
+    packages = set()
+    for code in codes:
+        for module in imported_modules(code):
+            top = module.split(".")[0]
+            if top in sys.stdlib_module_names or top in _ALWAYS_AVAILABLE:
+                continue
+            if module in IMPORT_TO_PACKAGE:
+                packages.add(IMPORT_TO_PACKAGE[module])
+            else:
+                packages.add(IMPORT_TO_PACKAGE.get(top, top))
+    return sorted(packages)
+
+
+def snapshot_name(packages: Sequence[str]) -> str:
+    """Deterministic snapshot name for a dependency set (and base Python version)."""
+    material = "\n".join([config.SANDBOX_PYTHON_VERSION, *sorted(packages)])
+    return f"codephoenix-deps-{hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]}"
+
+
+def find_prebuilt(packages: Sequence[str]) -> Optional[str]:
+    """Smallest configured prebuilt snapshot whose packages cover the given ones."""
+    wanted = set(packages)
+    candidates = [(len(provided), name) for name, provided in config.PREBUILT_SNAPSHOTS.items()
+                  if wanted <= set(provided)]
+    return min(candidates)[1] if candidates else None
+
+
+def resolve_snapshot(client, packages: Sequence[str], wait: bool = False) -> Optional[str]:
+    """
+    Snapshot to create the sandbox from, if it is ready.
+
+    A missing snapshot starts building in the background (one build per
+    dependency set); later calls get it once the build is done.
+
+    Args:
+        client: Daytona client
+        packages: Output of required_packages
+        wait: Block until a missing snapshot is built instead
+
+    Returns:
+        Snapshot name, or None to use the base image (no packages needed,
+        snapshots disabled, the build is still running or failed recently)
+    """
+    if not packages or not config.DEPENDENCY_SNAPSHOTS_ENABLED:
+        return None
+
+    prebuilt = find_prebuilt(packages)
+    if prebuilt:
+        return prebuilt
+
+    name = snapshot_name(packages)
+    # Only the checks are serialized - the build itself runs in its own thread
+    with _lock_for(name):
+        record = _get_build_cache().get(name)
+        if record and record.get("status") == "ready" and (name in _verified or _exists(client, name)):
+            _verified.add(name)
+            return name
+        if record and record.get("status") == "failed" and time.time() - record["at"] < config.SNAPSHOT_RETRY_AFTER:
+            print(f"[deps] Snapshot for {', '.join(packages)} failed to build recently, using base image")
+            return None
+
+        with _locks_guard:
+            build = _builds.get(name)
+        if build is None:
+            if _exists(client, name):
+                _record(name, packages, "ready")
+                return name
+            build = threading.Thread(target=_build_in_background, args=(client, name, packages),
+                                     name=f"snapshot-{name}", daemon=True)
+            with _locks_guard:
+                _builds[name] = build
+            build.start()
+
+    if not wait:
+        print(f"[deps] Snapshot {name} is still building, using the base image meanwhile")
+        return None
+    build.join()
+    return name if name in _verified else None
+
+
+def building() -> List[str]:
+    """Names of the snapshots being built right now."""
+    with _locks_guard:
+        return sorted(_builds)
+
+
+def _build_in_background(client, name: str, packages: Sequence[str]):
+    try:
+        _build(client, name, packages)
+    finally:
+        with _locks_guard:
+            _builds.pop(name, None)
+
+
+def _build(client, name: str, packages: Sequence[str]) -> bool:
+    from daytona import CreateSnapshotParams, Image
+
+    print(f"[deps] Building snapshot {name} with: {', '.join(packages)}...")
+    started = time.time()
+    try:
+        image = Image.debian_slim(config.SANDBOX_PYTHON_VERSION).pip_install(*packages)
+        client.snapshot.create(CreateSnapshotParams(name=name, image=image), timeout=config.SNAPSHOT_BUILD_TIMEOUT)
+    except Exception as e:
+        print(f"[deps] Warning: Snapshot build failed: {e}")
+        _record(name, packages, "failed")
+        return False
+
+    print(f"[deps] ✓ Snapshot {name} built in {time.time() - started:.0f}s")
+    _record(name, packages, "ready")
+    return True
+
+
+def _exists(client, name: str) -> bool:
+    try:
+        snapshot = client.snapshot.get(name)
+    except Exception:
+        return False
+    state = str(getattr(snapshot, "state", "active")).lower()
+    return "active" in state
+
+
+def _record(name: str, packages: Sequence[str], status: str):
+    _get_build_cache().set(name, {"packages": list(packages), "status": status, "at": time.time()})
+    if status == "ready":
+        _verified.add(name)
+
+
+def _lock_for(name: str) -> threading.Lock:
+    with _locks_guard:
+        return _build_locks.setdefault(name, threading.Lock())
+
+
+def _get_build_cache() -> TieredCache:
+    """Build records by snapshot name; entries never expire (snapshots are verified instead)."""
+    global _build_cache
+    with _locks_guard:
+        if _build_cache is None:
+            _build_cache = build_cache(256, 0, config.DEPENDENCY_CACHE_PATH)
+        return _build_cache
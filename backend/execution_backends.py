@@ -0,0 +1,594 @@
+"""
+Execution Backends - Where execute_code actually runs the script
+
+- DaytonaBackend: leases a sandbox from the pool (default, isolated)
+- LocalBackend: resource-limited subprocess on this machine (trusted/offline
+  workloads, benchmarks, tests without network)
+
+Both run the same wrapper from sandbox_wrapper.py and return the raw wrapper
+output, so result parsing and error classification stay in executor.py.
+"""
+
+import asyncio
+import os
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from backend import config, daytona_client, dependencies, kernel, sandbox_pool
+from backend.sandbox_wrapper import SPILL_FILES, build_batch_wrapper, build_stream_wrapper, build_wrapper
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+
+# Renders wrapper source from (job directory, scripts to embed by filename)
+WrapperBuilder = Callable[[str, Dict[str, str]], str]
+
+
+def _via_kernel(build: WrapperBuilder, timeout: int) -> WrapperBuilder:
+    """Route a sandbox wrapper through the sandbox's kernel (see kernel.py), if enabled."""
+    if not config.KERNEL_ENABLED:
+        return build
+    return lambda work_dir, sources: kernel.client_program(build(work_dir, sources), work_dir, timeout)
+
+
+def _spill_fetch(spill_to: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """Translate {"stdout": local_path, ...} into the wrapper's spill files to fetch."""
+    if not spill_to:
+        return None
+    return {SPILL_FILES[stream]: path for stream, path in spill_to.items()}
+
+
+def _mark(phases: Optional[Dict[str, float]], name: str, started: float) -> float:
+    """Add the wall time since `started` to phases[name] (in ms); returns the current time."""
+    now = time.perf_counter()
+    if phases is not None:
+        phases[name] = round(phases.get(name, 0.0) + (now - started) * 1000, 3)
+    return now
+
+
+@contextmanager
+def _killed_on(cancel: Optional[threading.Event], kill: Callable[[], None]):
+    """
+    Call kill() once `cancel` is set while the block runs (again every second
+    until the block exits, in case the job hadn't started the first time).
+    """
+    if cancel is None:
+        yield
+        return
+    done = threading.Event()
+
+    def watch():
+        while not cancel.wait(0.1):
+            if done.is_set():
+                return
+        while not done.is_set():
+            try:
+                kill()
+            except Exception as e:
+                print(f"[executor] Warning: Failed to stop a cancelled run: {e}")
+            done.wait(1.0)
+
+    watcher = threading.Thread(target=watch, name="cancel-watch", daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+
+
+def _fits_inline(files: Dict[str, str]) -> bool:
+    """Whether scripts are small enough to embed in the wrapper instead of uploading."""
+    return sum(len(source.encode("utf-8")) for source in files.values()) <= config.SANDBOX_INLINE_LIMIT_BYTES
+
+
+class ExecutionBackend(ABC):
+    """Interface every execution backend implements."""
+
+    # Short human-readable name used in log lines and error messages
+    label = "Execution"
+
+    @property
+    def environment(self) -> str:
+        """Identifies what the script runs on (part of the execution cache key)."""
+        return self.label
+
+    @abstractmethod
+    def run_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                    fetch: Optional[Dict[str, str]] = None, phases: Optional[Dict[str, float]] = None,
+                    cancel: Optional[threading.Event] = None) -> Tuple[int, str]:
+        """
+        Place files in a fresh job directory and run the wrapper built for it.
+
+        Args:
+            files: Mapping of filename (relative to the job dir) to source
+            build: Renders the wrapper source given the job directory path
+                and the files to embed in it (the rest must be on disk)
+            timeout: Wall-clock limit in seconds for the whole wrapper run
+            fetch: Mapping of filename (relative to the job dir) to a local
+                path to copy it to once the wrapper finished; files the
+                wrapper didn't write are skipped
+            phases: Filled with the wall time (ms) of each phase of the run:
+                client_init, create, install, upload, run, fetch, delete (whichever
+                apply to the backend)
+            cancel: Once set, the running wrapper is killed and run_wrapper
+                returns as soon as the job has stopped (its output is then
+                incomplete); the sandbox or job dir is released as usual
+
+        Returns:
+            Tuple of (process_exit_code: int, raw_output: str); raw_output
+            contains the wrapper's __RESULT__ blob when it ran to completion
+        """
+
+    def run(self, code: str, timeout: int = 60, spill_to: Optional[Dict[str, str]] = None,
+            phases: Optional[Dict[str, float]] = None, cancel: Optional[threading.Event] = None) -> Tuple[int, str]:
+        """
+        Run one script through the standard wrapper.
+
+        spill_to maps "stdout"/"stderr" to local paths that receive the full,
+        uncapped stream (the wrapper's result only carries the capped copy).
+        Setting cancel kills the script (see run_wrapper).
+        """
+        return self.run_wrapper(
+            {"script.py": code}, lambda work_dir, sources: build_wrapper(work_dir, sources, spill=bool(spill_to)),
+            timeout, _spill_fetch(spill_to), phases, cancel
+        )
+
+    def run_batch(self, codes: List[str], timeout: int = 300,
+                  phases: Optional[Dict[str, float]] = None) -> Tuple[int, str]:
+        """Run several scripts through the batch wrapper in a single round trip."""
+        files = {f"script_{i}.py": code for i, code in enumerate(codes)}
+        return self.run_wrapper(
+            files, lambda work_dir, sources: build_batch_wrapper(work_dir, len(codes), sources), timeout,
+            phases=phases
+        )
+
+    def stream(self, code: str, timeout: int = 60, spill_to: Optional[Dict[str, str]] = None,
+               phases: Optional[Dict[str, float]] = None) -> Iterator[str]:
+        """Run one script through the streaming wrapper, yielding raw output as it arrives (spill_to as in run)."""
+        return self.stream_wrapper(
+            {"script.py": code},
+            lambda work_dir, sources: build_stream_wrapper(work_dir, sources, spill=bool(spill_to)),
+            timeout, _spill_fetch(spill_to), phases
+        )
+
+    def stream_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                       fetch: Optional[Dict[str, str]] = None,
+                       phases: Optional[Dict[str, float]] = None) -> Iterator[str]:
+        """
+        Like run_wrapper, but yield raw output text incrementally.
+
+        The default runs to completion and yields everything at once; backends
+        that can follow a live process override it.
+        """
+        _, output = self.run_wrapper(files, build, timeout, fetch, phases)
+        yield output
+
+    def prepare(self):
+        """Fail fast on misconfiguration before any work is done (optional)."""
+
+    def warm_up(self, files: Dict[str, str]):
+        """
+        Get ready to run these scripts soon, e.g. start a sandbox for them.
+
+        May block (executor.prepare_run calls it from a background thread).
+        """
+        self.prepare()
+
+
+class DaytonaBackend(ExecutionBackend):
+    """Runs scripts in pooled Daytona sandboxes."""
+
+    label = "Daytona"
+
+    @property
+    def environment(self) -> str:
+        return f"daytona:{config.SANDBOX_IMAGE}"
+
+    def prepare(self):
+        sandbox_pool.get_pool(daytona_client.get_client)
+
+    def warm_up(self, files: Dict[str, str]):
+        self._pool_for(files)[0].warm()
+
+    def run_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                    fetch: Optional[Dict[str, str]] = None,
+                    phases: Optional[Dict[str, float]] = None,
+                    cancel: Optional[threading.Event] = None) -> Tuple[int, str]:
+        from daytona import FileUpload
+
+        started = time.perf_counter()
+        build = _via_kernel(build, timeout)
+        pool, install = self._pool_for(files)
+        started = _mark(phases, "client_init", started)
+
+        # Lease a pre-warmed Daytona sandbox (created on demand if the pool is empty)
+        print("[executor] Leasing Daytona sandbox from pool...")
+        with pool.lease() as sandbox:
+            started = _mark(phases, "create", started)
+            print(f"[executor] ✓ Sandbox leased")
+            if install:
+                self._install(sandbox, install)
+                started = _mark(phases, "install", started)
+
+            if _fits_inline(files):
+                # Scripts ride inside the code_run payload - no upload round trip
+                wrapper = build(sandbox_pool.WORK_DIR, files)
+            else:
+                # Too big to inline: all scripts go up in one request, straight from memory
+                print(f"[executor] Uploading {len(files)} file(s)...")
+                sandbox.fs.upload_files([
+                    FileUpload(source=source.encode("utf-8"), destination=f"{sandbox_pool.WORK_DIR}/{name}")
+                    for name, source in files.items()
+                ])
+                wrapper = build(sandbox_pool.WORK_DIR, {})
+            started = _mark(phases, "upload", started)
+
+            # code_run() expects Python code, not shell commands
+            # So we run a Python wrapper that executes the script(s)
+            print("[executor] Executing code in Daytona...")
+            # Cancelled: killing the job's processes makes code_run return
+            with _killed_on(cancel, lambda: sandbox.process.exec(sandbox_pool.KILL_COMMAND, timeout=30)):
+                response = sandbox.process.code_run(wrapper, timeout=timeout)
+            started = _mark(phases, "run", started)
+
+            # Before the lease ends - releasing the sandbox wipes the job dir
+            if fetch:
+                self._fetch(sandbox, fetch)
+                started = _mark(phases, "fetch", started)
+        _mark(phases, "delete", started)
+
+        output = response.result if hasattr(response, 'result') else str(response)
+        exit_code = response.exit_code if hasattr(response, 'exit_code') else 1
+        return exit_code, output
+
+    def stream_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                       fetch: Optional[Dict[str, str]] = None,
+                       phases: Optional[Dict[str, float]] = None) -> Iterator[str]:
+        from daytona import FileUpload, SessionExecuteRequest
+
+        started = time.perf_counter()
+        build = _via_kernel(build, timeout)
+        pool, install = self._pool_for(files)
+        started = _mark(phases, "client_init", started)
+
+        print("[executor] Leasing Daytona sandbox from pool...")
+        with pool.lease() as sandbox:
+            started = _mark(phases, "create", started)
+            print(f"[executor] ✓ Sandbox leased")
+            if install:
+                self._install(sandbox, install)
+                started = _mark(phases, "install", started)
+
+            # The wrapper goes up as a file - a session runs shell commands, not code.
+            # Small scripts are embedded in it, so that's the only upload.
+            if _fits_inline(files):
+                files = {"wrapper.py": build(sandbox_pool.WORK_DIR, files)}
+            else:
+                files = dict(files, **{"wrapper.py": build(sandbox_pool.WORK_DIR, {})})
+            print(f"[executor] Uploading {len(files)} file(s)...")
+            sandbox.fs.upload_files([
+                FileUpload(source=source.encode("utf-8"), destination=f"{sandbox_pool.WORK_DIR}/{name}")
+                for name, source in files.items()
+            ])
+            started = _mark(phases, "upload", started)
+
+            session_id = f"codephoenix-{uuid.uuid4().hex[:12]}"
+            sandbox.process.create_session(session_id)
+            try:
+                print("[executor] Streaming code execution in Daytona...")
+                command = sandbox.process.execute_session_command(
+                    session_id,
+                    SessionExecuteRequest(command=f"python3 -u {sandbox_pool.WORK_DIR}/wrapper.py", run_async=True),
+                )
+
+                # The SDK follows logs over a websocket with async callbacks;
+                # bridge them onto this (sync) generator through a queue
+                chunks: "queue.Queue" = queue.Queue()
+
+                def follow_logs():
+                    try:
+                        asyncio.run(sandbox.process.get_session_command_logs_async(
+                            session_id, command.cmd_id, chunks.put, chunks.put
+                        ))
+                    except Exception as e:
+                        chunks.put(e)
+                    finally:
+                        chunks.put(None)
+
+                threading.Thread(target=follow_logs, name="daytona-logs", daemon=True).start()
+
+                deadline = time.time() + timeout
+                while True:
+                    try:
+                        chunk = chunks.get(timeout=max(0.0, deadline - time.time()))
+                    except queue.Empty:
+                        raise TimeoutError(f"Script exceeded wall-clock limit of {timeout}s")
+                    if chunk is None:
+                        break
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    yield chunk
+                started = _mark(phases, "run", started)
+
+                if fetch:
+                    self._fetch(sandbox, fetch)
+                    started = _mark(phases, "fetch", started)
+            finally:
+                try:
+                    sandbox.process.delete_session(session_id)
+                except Exception:
+                    pass
+        _mark(phases, "delete", started)
+
+    def _pool_for(self, files: Dict[str, str]) -> Tuple[sandbox_pool.SandboxPool, List[str]]:
+        """
+        Pool for the scripts' third-party imports, and the packages still to install.
+
+        Returns:
+            (pool, packages) - the snapshot pool and no packages once the
+            dependency snapshot is ready; until then (or without snapshots)
+            the base pool and the packages to pip-install before the run
+        """
+        base = sandbox_pool.get_pool(daytona_client.get_client)
+        packages = dependencies.required_packages(files.values())
+        if not packages:
+            return base, []
+        print(f"[executor] Script imports third-party packages: {', '.join(packages)}")
+        snapshot = dependencies.resolve_snapshot(base.client, packages)
+        if snapshot is None:
+            return base, packages
+        return sandbox_pool.get_pool(daytona_client.get_client, snapshot), []
+
+    def _install(self, sandbox, packages: List[str]):
+        """pip-install packages into a base-image sandbox (a failure shows up as the script's ImportError)."""
+        print(f"[executor] Installing {', '.join(packages)} at run time...")
+        response = sandbox.process.exec(
+            "pip install --quiet --disable-pip-version-check " + " ".join(shlex.quote(p) for p in packages),
+            timeout=int(config.RUNTIME_INSTALL_TIMEOUT),
+        )
+        if getattr(response, "exit_code", 0):
+            print(f"[executor] Warning: pip install failed: {str(getattr(response, 'result', ''))[-500:]}")
+
+    def _fetch(self, sandbox, fetch: Optional[Dict[str, str]]):
+        """Download job-dir files straight to local paths (streamed to disk, not held in memory)."""
+        for name, local_path in (fetch or {}).items():
+            try:
+                sandbox.fs.download_file(f"{sandbox_pool.WORK_DIR}/{name}", local_path)
+            except Exception as e:
+                print(f"[executor] Warning: Failed to fetch {name}: {e}")
+
+
+class LocalBackend(ExecutionBackend):
+    """
+    Runs scripts in a resource-limited local subprocess.
+
+    NOT a security boundary - only use it for trusted or offline workloads.
+    The child gets rlimits for CPU, memory and file size, a scratch working
+    directory, a scrubbed environment (no API keys), and is killed with its
+    whole process group when the wall-clock timeout expires. Once the local
+    kernel is up, the child is forked from it instead of started from scratch
+    (the memory limit then applies on top of what the kernel has preloaded).
+    """
+
+    label = "Local"
+
+    @property
+    def environment(self) -> str:
+        return f"local:{sys.version.split()[0]}"
+
+    def __init__(self, cpu_seconds: int = None, memory_mb: int = None, file_size_mb: int = None):
+        self.cpu_seconds = cpu_seconds or config.LOCAL_CPU_SECONDS
+        self.memory_mb = memory_mb or config.LOCAL_MEMORY_MB
+        self.file_size_mb = file_size_mb or config.LOCAL_FILE_SIZE_MB
+
+    def _limit_resources(self):
+        """preexec_fn: runs in the child between fork and exec."""
+        if resource is None:
+            return
+        # Soft limit sends SIGXCPU, the hard limit one second later is a SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + 1))
+        memory = self.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        file_size = self.file_size_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+
+    def prepare(self):
+        if config.KERNEL_ENABLED:
+            # Starts in the background - runs use a plain subprocess until it's ready
+            kernel.get_local_kernel(config.KERNEL_PRELOAD, self._env(None))
+
+    def _env(self, work_dir: Optional[str]) -> Dict[str, str]:
+        """Scrubbed environment for the child (no API keys)."""
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "LANG": "C.UTF-8",
+            "PYTHONIOENCODING": "utf-8",
+        }
+        if work_dir:
+            env["HOME"] = work_dir
+        return env
+
+    def _start(self, files: Dict[str, str], build: WrapperBuilder, timeout: int):
+        """
+        Start the wrapper in a scratch job directory: forked from the local
+        kernel when it's up, otherwise in a fresh interpreter.
+
+        Returns the job dir and the job (iterate it for output, then read exit_code).
+        """
+        work_dir = tempfile.mkdtemp(prefix="codephoenix_")
+        wrapper = build(work_dir, files)
+
+        local_kernel = kernel.get_local_kernel(config.KERNEL_PRELOAD, self._env(None)) if config.KERNEL_ENABLED else None
+        if local_kernel is not None and local_kernel.ready:
+            try:
+                return work_dir, local_kernel.submit(wrapper, work_dir, timeout, self._limits(), {"HOME": work_dir})
+            except OSError as e:
+                print(f"[executor] Warning: Local kernel unavailable ({e}), using a subprocess")
+
+        # The wrapper is fed on stdin - a -c argument is capped at 128KB on Linux
+        proc = subprocess.Popen(
+            [sys.executable, "-I", "-u", "-"],
+            cwd=work_dir,
+            env=self._env(work_dir),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            preexec_fn=self._limit_resources if resource is not None else None,
+            start_new_session=True,
+        )
+        return work_dir, _ProcessJob(proc, wrapper, timeout)
+
+    def _limits(self) -> Dict[str, int]:
+        """The rlimits of _limit_resources, for a kernel child to apply to itself."""
+        return {
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_mb * 1024 * 1024,
+            "file_size_bytes": self.file_size_mb * 1024 * 1024,
+        }
+
+    def run_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                    fetch: Optional[Dict[str, str]] = None,
+                    phases: Optional[Dict[str, float]] = None,
+                    cancel: Optional[threading.Event] = None) -> Tuple[int, str]:
+        started = time.perf_counter()
+        work_dir, job = self._start(files, build, timeout)
+        print(f"[executor] Executing code in local {job.kind}...")
+        started = _mark(phases, "create", started)
+        try:
+            with _killed_on(cancel, job.kill):
+                output = "".join(job)
+            started = _mark(phases, "run", started)
+
+            if job.exit_code < 0:
+                output += f"\nProcess killed by signal {signal.Signals(-job.exit_code).name}"
+            if fetch:
+                _move_out(work_dir, fetch)
+                started = _mark(phases, "fetch", started)
+            return job.exit_code, output
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            _mark(phases, "delete", started)
+
+    def stream_wrapper(self, files: Dict[str, str], build: WrapperBuilder, timeout: int,
+                       fetch: Optional[Dict[str, str]] = None,
+                       phases: Optional[Dict[str, float]] = None) -> Iterator[str]:
+        started = time.perf_counter()
+        work_dir, job = self._start(files, build, timeout)
+        print(f"[executor] Streaming code execution in local {job.kind}...")
+        started = _mark(phases, "create", started)
+        try:
+            # Closing this generator early closes the job, which kills the script
+            yield from job
+            started = _mark(phases, "run", started)
+
+            if job.exit_code < 0:
+                yield f"\nProcess killed by signal {signal.Signals(-job.exit_code).name}"
+            if fetch:
+                _move_out(work_dir, fetch)
+                started = _mark(phases, "fetch", started)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            _mark(phases, "delete", started)
+
+
+class _ProcessJob:
+    """A wrapper running in its own interpreter, with the same interface as kernel.KernelJob."""
+
+    kind = "subprocess"
+
+    def __init__(self, proc: subprocess.Popen, wrapper: str, timeout: int):
+        self._proc = proc
+        self._wrapper = wrapper
+        self._timeout = timeout
+        self.exit_code: Optional[int] = None
+
+    def kill(self):
+        """Kill the script and anything it spawned."""
+        _kill_group(self._proc)
+
+    def __iter__(self) -> Iterator[str]:
+        proc = self._proc
+        try:
+            proc.stdin.write(self._wrapper)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass  # Child died before reading its program - its output says why
+
+        # readline() has no timeout - a watchdog enforces the wall-clock limit
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            _kill_group(proc)
+
+        watchdog = threading.Timer(self._timeout, on_timeout)
+        watchdog.start()
+        try:
+            for line in iter(proc.stdout.readline, ""):
+                yield line
+            proc.wait()
+            if timed_out.is_set():
+                raise TimeoutError(f"Script exceeded wall-clock limit of {self._timeout}s")
+            self.exit_code = proc.returncode
+        finally:
+            watchdog.cancel()
+            if proc.poll() is None:
+                # Consumer stopped early - don't leave the script running
+                _kill_group(proc)
+                proc.wait()
+            proc.stdout.close()
+
+
+def _move_out(work_dir: str, fetch: Optional[Dict[str, str]]):
+    """Move job-dir files out before the scratch directory is deleted."""
+    for name, local_path in (fetch or {}).items():
+        source = os.path.join(work_dir, name)
+        if os.path.exists(source):
+            shutil.move(source, local_path)
+
+
+def _kill_group(proc: subprocess.Popen):
+    """Kill the child and anything it spawned (it leads its own session)."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, AttributeError):
+        proc.kill()
+
+
+_BACKENDS: Dict[str, type] = {
+    "daytona": DaytonaBackend,
+    "local": LocalBackend,
+}
+_instances: Dict[str, ExecutionBackend] = {}
+
+
+def get_backend(name: str = None) -> ExecutionBackend:
+    """
+    Look up an execution backend by name (defaults to config.EXECUTION_BACKEND).
+
+    Args:
+        name: "daytona" or "local"
+
+    Returns:
+        Shared backend instance
+    """
+    name = (name or config.EXECUTION_BACKEND).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown execution backend '{name}' (choose from: {', '.join(_BACKENDS)})")
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+    return _instances[name]
@@ -3,62 +3,164 @@ Code Executor - Runs generated Python code in Daytona sandbox
 
 REUSED PATTERN: Based on claudeTutorial/step3_sandboxes/daytona_sandbox.py
 Simplified for hackathon - just the essentials for code execution
+
+Where the code runs is pluggable (see execution_backends.py): Daytona by
+default, or a resource-limited local subprocess for trusted/offline work.
+Code that is sure to fail is caught locally first (see preflight.py).
 """
 
-import tempfile
+import asyncio
+import hashlib
+import mmap
 import os
-import re
-from typing import Tuple
-from daytona import Daytona, DaytonaConfig, CreateSandboxFromImageParams
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from backend import config
+from backend.cache import TieredCache, build_cache
+from backend.code_analysis import nondeterminism_reasons, normalize_code
+from backend.execution_backends import ExecutionBackend, get_backend
+from backend.preflight import check_code
+from backend.sandbox_wrapper import (
+    WRAPPER_VERSION, OutputBuffer, StreamDecoder, parse_batch_result, parse_result
+)
+
+# generated_code/ copies are a debugging aid - write them from a background
+# thread so local disk I/O never sits between the user and their result
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist-code")
+
+def _write_generated_code(code: str, filename: str):
+    try:
+        os.makedirs("generated_code", exist_ok=True)
+        output_path = os.path.join("generated_code", filename)
+        with open(output_path, "w") as f:
+            f.write(code)
+        print(f"[executor] Saved code to {output_path}")
+    except OSError as e:
+        print(f"[executor] Warning: Failed to save code locally: {e}")
+
+def _persist_code(code: str, filename: str):
+    """Queue a copy of the script for generated_code/ (if enabled)."""
+    if config.SAVE_GENERATED_CODE:
+        _persist_executor.submit(_write_generated_code, code, filename)
+
+_result_cache: Optional[TieredCache] = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> TieredCache:
+    """Process-wide execution result cache, built from config on first use."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = build_cache(config.EXECUTION_CACHE_SIZE, config.EXECUTION_CACHE_TTL,
+                                        config.EXECUTION_CACHE_PATH)
+        return _result_cache
+
+@lru_cache(maxsize=1024)
+def _cache_key(code: str, environment: str, deterministic_only: bool) -> Optional[str]:
+    """
+    Content address of a run: hash of the normalized code, the environment it
+    runs on, and the wrapper version. None if the result must not be cached.
 
-def _get_daytona_client():
+    Memoized on the raw text, so repeating identical code skips the AST work.
     """
-    Initialize Daytona client (reused pattern from claudeTutorial).
+    if deterministic_only:
+        reasons = nondeterminism_reasons(code)
+        if reasons:
+            print(f"[executor] Not caching result ({', '.join(reasons[:3])})")
+            return None
+    material = "\0".join([normalize_code(code), environment, WRAPPER_VERSION])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _result_cache_key(code: str, backend: ExecutionBackend, use_cache: bool,
+                      spill_to: Optional[Dict[str, str]]) -> Optional[str]:
+    # A spilled run must actually execute to produce its output files
+    if not (use_cache and config.EXECUTION_CACHE_ENABLED) or spill_to:
+        return None
+    return _cache_key(code, backend.environment, config.EXECUTION_CACHE_DETERMINISTIC_ONLY)
+
+def spill_paths(spill_dir: str, filename: str) -> Dict[str, str]:
     """
-    if not config.DAYTONA_API_KEY:
-        raise ValueError("DAYTONA_API_KEY not found in environment")
+    Local files the full output of `filename` is spilled to under spill_dir.
 
-    daytona_config = DaytonaConfig(
-        api_key=config.DAYTONA_API_KEY,
-        api_url=config.DAYTONA_API_URL
-    )
+    Returns:
+        {"stdout": ".../<name>.stdout.log", "stderr": ".../<name>.stderr.log"}
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return {stream: os.path.join(spill_dir, f"{stem}.{stream}.log") for stream in ("stdout", "stderr")}
 
-    return Daytona(daytona_config)
+def open_spilled_output(path: str):
+    """
+    Memory-map a spilled output file for reading.
 
-def _classify_error(exit_code: int, stdout: str, stderr: str) -> str:
+    The file is paged in on demand, so slicing or searching output of any
+    size doesn't load it all into memory. Returns b"" for an empty file
+    (which can't be mapped); close the returned mmap when done.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _spill_targets(spill_dir: Optional[str], filename: str) -> Optional[Dict[str, str]]:
+    spill_dir = spill_dir if spill_dir is not None else config.OUTPUT_SPILL_DIR
+    if not spill_dir:
+        return None
+    os.makedirs(spill_dir, exist_ok=True)
+    return spill_paths(spill_dir, filename)
+
+def _mark_phase(phases: Dict[str, float], name: str, started: float):
+    phases[name] = round((time.perf_counter() - started) * 1000, 3)
+
+def _execution_metrics(backend: ExecutionBackend, phases: Dict[str, float], stats: Optional[Dict],
+                       started: float, cached: bool = False, preflight: bool = False,
+                       exceptions: Optional[List[Dict]] = None) -> Dict:
+    """
+    Metrics for one execution: wall time per phase on this side, resource
+    usage the wrapper measured inside the sandbox (None if it never reported),
+    and the exceptions the script caught itself (advisory; before Python
+    3.12 only the swallowed ones are seen).
+    """
+    stats = stats or {}
+    return {
+        "backend": backend.label,
+        "cached": cached,
+        "preflight": preflight,
+        "phases_ms": dict(phases),
+        "total_ms": round((time.perf_counter() - started) * 1000, 3),
+        "script_seconds": stats.get("run_seconds"),
+        "cpu_seconds": stats.get("cpu_seconds"),
+        "peak_rss_mb": stats.get("peak_rss_mb"),
+        "stdout_bytes": stats.get("stdout_bytes"),
+        "stderr_bytes": stats.get("stderr_bytes"),
+        "handled_exceptions": handled_exceptions(exceptions),
+    }
+
+def _classify_error(exit_code: int, stdout: str, stderr: str, exceptions: Optional[List[Dict]] = None) -> str:
     """
     Classify execution outcome for better error handling.
 
+    The wrapper reports exceptions the script raised as structured records,
+    so this is a field lookup - it no longer scans the output and can't be
+    fooled by a script that merely prints the word "Error". Catching an
+    exception is normal control flow (EAFP); only one swallowed by a handler
+    that does nothing at all counts against the run.
+
     Returns:
         - "success": Normal execution with output
         - "silent_failure": Succeeded but no output (likely handled exception)
-        - "handled_exception": Succeeded but exception patterns in output
+        - "handled_exception": Succeeded but an exception was silently swallowed
         - "crash": Hard failure with non-zero exit code
     """
     # Hard crash
     if exit_code != 0:
         return "crash"
 
-    # Check for exception patterns even if caught
-    exception_patterns = [
-        r'ZeroDivisionError',
-        r'ValueError',
-        r'TypeError',
-        r'KeyError',
-        r'IndexError',
-        r'AttributeError',
-        r'FileNotFoundError',
-        r'Exception',
-        r'Error:',
-        r'Traceback',
-        r'Cannot divide by zero'
-    ]
-
-    combined_output = stdout + stderr
-    for pattern in exception_patterns:
-        if re.search(pattern, combined_output, re.IGNORECASE):
-            return "handled_exception"
+    # Exceptions caught by `except: pass` and the like
+    if _swallowed(exceptions):
+        return "handled_exception"
 
     # Success but no output (suspicious)
     if not stdout.strip() and not stderr.strip():
@@ -66,131 +168,488 @@ def _classify_error(exit_code: int, stdout: str, stderr: str) -> str:
 
     return "success"
 
-def execute_code(code: str, filename: str = "generated_script.py") -> Tuple[bool, str, str, str]:
+def _swallowed(exceptions: Optional[List[Dict]]) -> List[Dict]:
+    """Exception records the wrapper saw caught by a handler that does nothing."""
+    return [record for record in exceptions or () if record.get("handled") and record.get("swallowed")]
+
+def handled_exceptions(exceptions: Optional[List[Dict]]) -> str:
+    """Advisory summary of the exceptions a script caught itself (empty if none)."""
+    return _format_exceptions([record for record in exceptions or () if record.get("handled")])
+
+def _format_exceptions(exceptions: Optional[List[Dict]]) -> str:
+    """
+    Render exception records as one line each, e.g.
+    "Handled ZeroDivisionError at script.py line 5: division by zero (x3)".
+    """
+    lines = []
+    for record in exceptions or ():
+        state = "Handled" if record.get("handled") else "Unhandled"
+        count = record.get("count", 1)
+        repeat = f" (x{count})" if count > 1 else ""
+        lines.append(f"{state} {record.get('type')} at {record.get('file')} line {record.get('line')}: "
+                     f"{record.get('message')}{repeat}")
+    return "\n".join(lines)
+
+def _to_result(exit_code: int, stdout: str, stderr: str,
+               exceptions: Optional[List[Dict]] = None) -> Tuple[bool, str, str, str]:
+    """
+    Turn a script's exit code, streams and exception records into the public
+    execute_code tuple.
+
+    For swallowed exceptions the error field carries the exception locations
+    so the fixer knows exactly where the script hid a failure. Other caught
+    exceptions only show up in the metrics (handled_exceptions).
+    """
+    success = exit_code == 0
+
+    # Classify the error type
+    error_type = _classify_error(exit_code, stdout, stderr, exceptions)
+
+    if success:
+        error = ""
+        if error_type == "handled_exception":
+            error = "Handled exceptions detected:\n" + _format_exceptions(_swallowed(exceptions))
+        return True, stdout, error, error_type
+    else:
+        error = stderr if stderr else stdout
+        unhandled = [record for record in exceptions or () if not record.get("handled")]
+        if unhandled:
+            error = f"{error.rstrip()}\n\n{_format_exceptions(unhandled)}"
+        return False, "", error, error_type
+
+def _preflight(code: str, filename: str, enabled: bool, phases: Dict[str, float]) -> Optional[Tuple]:
+    """
+    The execute_code result for code pre-flight proves doomed, or None to run it.
+
+    A predicted silent failure keeps success=True like a real one; the error
+    field says why, so the fixer gets the reason either way.
+    """
+    if not (enabled and config.PREFLIGHT_ENABLED):
+        return None
+    started = time.perf_counter()
+    problem = check_code(code, filename)
+    _mark_phase(phases, "preflight", started)
+    if problem is None:
+        return None
+    error_type, error = problem
+    print(f"[executor] Pre-flight caught a {error_type}, skipped execution")
+    return error_type == "silent_failure", "", error, error_type
+
+def _warm_up(backend: Union[str, ExecutionBackend, None], code: str):
+    try:
+        if not isinstance(backend, ExecutionBackend):
+            backend = get_backend(backend)
+        backend.warm_up({"script.py": code})
+    except Exception as e:
+        print(f"[executor] Warning: Failed to warm up backend: {e}")
+
+def prepare_run(code: str, filename: str = "generated_script.py",
+                backend: Union[str, ExecutionBackend, None] = None) -> Optional[Tuple[str, str]]:
     """
-    Execute Python code in a Daytona sandbox.
+    Get ready to execute code that was just generated, before anyone asks to.
+
+    Runs the pre-flight check right away and, if the code may run, starts
+    warming the backend for it (a sandbox from the right pool, the local
+    kernel) in the background so execute_code finds it ready.
+
+    Returns:
+        None if pre-flight found nothing, otherwise its (error_type, error)
+    """
+    problem = check_code(code, filename) if config.PREFLIGHT_ENABLED else None
+    if problem is None:
+        threading.Thread(target=_warm_up, args=(backend, code), name="warm-up", daemon=True).start()
+    return problem
+
+def execute_code(code: str, filename: str = "generated_script.py",
+                 backend: Union[str, ExecutionBackend, None] = None,
+                 spill_dir: Optional[str] = None, use_cache: bool = True,
+                 return_metrics: bool = False, preflight: bool = True,
+                 cancel: Optional[threading.Event] = None) -> Tuple:
+    """
+    Execute Python code through an execution backend (Daytona by default).
+
+    Output is capped to config.OUTPUT_HEAD_CHARS / OUTPUT_TAIL_CHARS per
+    stream, with a truncation marker in place of the dropped middle.
+
+    Results of deterministic scripts are cached by content (normalized code,
+    environment, wrapper version), so a repeat run never reaches the backend.
+    Code with a syntax error, an undefined name or no way to print anything
+    is reported without running it (see preflight.check_code).
 
     Args:
         code: Python code to execute
         filename: Name for the generated file (for saving locally)
+        backend: Backend name ("daytona", "local"), instance, or None for config.EXECUTION_BACKEND
+        spill_dir: Directory to write the full, uncapped output to (see
+            spill_paths / open_spilled_output); None uses config.OUTPUT_SPILL_DIR,
+            "" disables spilling
+        use_cache: Look up / store the result in the execution result cache
+        return_metrics: Also return a metrics dict (phase timings, CPU time,
+            peak RSS, output bytes) as a fifth element
+        preflight: Run the local pre-flight checks first
+        cancel: Setting this event kills the running script (the result is
+            then a crash or whatever the cut-off output amounts to, never cached)
 
     Returns:
         Tuple of (success: bool, output: str, error: str, error_type: str)
         error_type can be: "success", "silent_failure", "handled_exception", "crash"
+        With return_metrics: (success, output, error, error_type, metrics: dict)
+    """
+    started = time.perf_counter()
+    phases: Dict[str, float] = {}
+    stats = None
+    exceptions = None
+    cached = False
+
+    if not isinstance(backend, ExecutionBackend):
+        backend = get_backend(backend)
+
+    result = _preflight(code, filename, preflight, phases)
+    if result is not None:
+        if return_metrics:
+            return (*result, _execution_metrics(backend, phases, None, started, preflight=True))
+        return result
+
+    spill_to = _spill_targets(spill_dir, filename)
+    cache_key = _result_cache_key(code, backend, use_cache, spill_to)
+    lookup_started = time.perf_counter()
+    result = get_result_cache().get(cache_key) if cache_key else None
+    if cache_key:
+        _mark_phase(phases, "cache_lookup", lookup_started)
+
+    if result is not None:
+        result = tuple(result)
+        cached = True
+        print(f"[executor] ✓ Cached result (type={result[3]}), skipped execution")
+    else:
+        backend.prepare()
+        try:
+            # Save code locally for reference (off the critical path)
+            _persist_code(code, filename)
+
+            process_exit_code, output = backend.run(code, timeout=60, spill_to=spill_to, phases=phases,
+                                                     cancel=cancel)
+
+            # Parse results
+            parse_started = time.perf_counter()
+            exit_code, stdout, stderr, exceptions, stats = parse_result(output, process_exit_code)
+            result = _to_result(exit_code, stdout, stderr, exceptions)
+            _mark_phase(phases, "parse", parse_started)
+            print(f"[executor] Execution complete (success={result[0]}, type={result[3]})")
+
+            # Only results the wrapper reported itself - not timeouts or killed runs
+            if cache_key and exceptions is not None:
+                get_result_cache().set(cache_key, list(result))
+
+        except Exception as e:
+            error_msg = f"{backend.label} execution failed: {str(e)}"
+            print(f"[executor] ERROR: {error_msg}")
+            result = (False, "", error_msg, "crash")
+
+    if return_metrics:
+        return (*result, _execution_metrics(backend, phases, stats, started, cached, exceptions=exceptions))
+    return result
+
+def stream_code(code: str, filename: str = "generated_script.py",
+                backend: Union[str, ExecutionBackend, None] = None,
+                spill_dir: Optional[str] = None, use_cache: bool = True,
+                return_metrics: bool = False, preflight: bool = True) -> Iterator[Tuple[str, Any]]:
+    """
+    Execute Python code and yield its output while it runs.
+
+    The sandbox runs the streaming wrapper, which forwards output in framed
+    chunks instead of buffering everything until the script ends. Past the
+    output cap it stops forwarding and sends the truncation marker and the
+    stream's tail when the script ends.
+
+    Args:
+        code: Python code to execute
+        filename: Name for the generated file (for saving locally)
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+        spill_dir: Directory to write the full, uncapped output to (as in execute_code)
+        use_cache: Look up / store the result in the execution result cache;
+            a cached result is replayed as a single output event
+        return_metrics: Also yield a ("metrics", dict) event (as in
+            execute_code) right before the result
+        preflight: Run the local pre-flight checks first; doomed code yields
+            its error as a stderr event and never reaches the backend
+
+    Yields:
+        ("stdout", text) / ("stderr", text) events as output arrives, then a
+        final ("result", (success, output, error, error_type)) event carrying
+        the same tuple execute_code returns
     """
-    daytona = _get_daytona_client()
-    sandbox = None
+    started = time.perf_counter()
+    phases: Dict[str, float] = {}
+
+    if not isinstance(backend, ExecutionBackend):
+        backend = get_backend(backend)
+
+    doomed = _preflight(code, filename, preflight, phases)
+    if doomed is not None:
+        yield "stderr", doomed[2]
+        if return_metrics:
+            yield "metrics", _execution_metrics(backend, phases, None, started, preflight=True)
+        yield "result", doomed
+        return
+
+    spill_to = _spill_targets(spill_dir, filename)
+    cache_key = _result_cache_key(code, backend, use_cache, spill_to)
+    if cache_key:
+        lookup_started = time.perf_counter()
+        cached = get_result_cache().get(cache_key)
+        _mark_phase(phases, "cache_lookup", lookup_started)
+        if cached is not None:
+            print(f"[executor] ✓ Cached result (type={cached[3]}), skipped execution")
+            success, output, error, error_type = cached
+            if output:
+                yield "stdout", output
+            if error and not success:
+                yield "stderr", error
+            if return_metrics:
+                yield "metrics", _execution_metrics(backend, phases, None, started, cached=True)
+            yield "result", tuple(cached)
+            return
+
+    backend.prepare()
+
+    decoder = StreamDecoder()
+    # The wrapper caps what it forwards, but unframed output (a crashing
+    # interpreter) isn't capped - bound the accumulated copies here too
+    stdout_buffer = OutputBuffer()
+    stderr_buffer = OutputBuffer()
 
     try:
-        # Save code locally for reference
-        output_path = os.path.join("generated_code", filename)
-        with open(output_path, "w") as f:
-            f.write(code)
-        print(f"[executor] Saved code to {output_path}")
+        # Save code locally for reference (off the critical path)
+        _persist_code(code, filename)
 
-        # Create Daytona sandbox
-        print("[executor] Creating Daytona sandbox...")
-        params = CreateSandboxFromImageParams(image="python:3.11-slim")
-        sandbox = daytona.create(params, timeout=150)
-        print(f"[executor] ✓ Sandbox created")
+        def drain(events):
+            for stream, text in events:
+                (stdout_buffer if stream == "stdout" else stderr_buffer).append(text)
+            return events
 
-        # Upload code to sandbox
-        print("[executor] Uploading code...")
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
+        for raw in backend.stream(code, timeout=60, spill_to=spill_to, phases=phases):
+            yield from drain(decoder.feed(raw))
+        yield from drain(decoder.close())
+
+        exit_code = decoder.exit_code
+        if exit_code is None:
+            # Wrapper never reported - it was killed or the interpreter died
+            exit_code = 1
+            stderr_buffer.append("Execution ended before the script reported a result\n")
+
+        parse_started = time.perf_counter()
+        result = _to_result(exit_code, stdout_buffer.getvalue(), stderr_buffer.getvalue(), decoder.exceptions)
+        _mark_phase(phases, "parse", parse_started)
+        print(f"[executor] Execution complete (success={result[0]}, type={result[3]})")
 
+        if cache_key and decoder.exit_code is not None:
+            get_result_cache().set(cache_key, list(result))
+
+    except Exception as e:
+        error_msg = f"{backend.label} execution failed: {str(e)}"
+        print(f"[executor] ERROR: {error_msg}")
+        result = (False, "", error_msg, "crash")
+
+    if return_metrics:
+        yield "metrics", _execution_metrics(backend, phases, decoder.stats, started, exceptions=decoder.exceptions)
+    yield "result", result
+
+async def stream_code_async(code: str, filename: str = "generated_script.py",
+                            backend: Union[str, ExecutionBackend, None] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Async iterator version of stream_code (same events).
+
+    The blocking generator is driven from a worker thread and its events are
+    handed to the event loop as they arrive.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def pump():
         try:
-            sandbox.fs.upload_file(temp_file, "script.py")
+            for event in stream_code(code, filename, backend):
+                loop.call_soon_threadsafe(events.put_nowait, event)
         finally:
-            os.unlink(temp_file)
-
-        # Execute code in sandbox
-        print("[executor] Executing code in Daytona...")
-
-        # code_run() expects Python code, not shell commands
-        # So we create a Python wrapper that executes the uploaded script
-        exec_wrapper = """
-import sys
-import io
-import json
-
-# Capture stdout and stderr
-old_stdout = sys.stdout
-old_stderr = sys.stderr
-stdout_capture = io.StringIO()
-stderr_capture = io.StringIO()
-
-sys.stdout = stdout_capture
-sys.stderr = stderr_capture
-
-exit_code = 0
-try:
-    exec(open('script.py').read(), {'__name__': '__main__'})
-except Exception as e:
-    import traceback
-    stderr_capture.write(f"ERROR: {e}\\n")
-    stderr_capture.write(traceback.format_exc())
-    exit_code = 1
-finally:
-    sys.stdout = old_stdout
-    sys.stderr = old_stderr
-
-# Output results
-result = {
-    'stdout': stdout_capture.getvalue(),
-    'stderr': stderr_capture.getvalue(),
-    'exit_code': exit_code
-}
-print('__RESULT__')
-print(json.dumps(result))
-"""
+            loop.call_soon_threadsafe(events.put_nowait, done)
+
+    worker = loop.run_in_executor(None, pump)
+    while True:
+        event = await events.get()
+        if event is done:
+            break
+        yield event
+    await worker
+
+def execute_batch(codes: Sequence[str], backend: Union[str, ExecutionBackend, None] = None,
+                  timeout: int = 300, preflight: bool = True) -> List[Tuple[bool, str, str, str]]:
+    """
+    Execute many scripts in a single sandbox round trip.
+
+    All scripts are uploaded together and run one after another by the batch
+    wrapper, each with its own globals and its own captured stdout/stderr.
+    Per-script overhead drops from a sandbox lifecycle to a few milliseconds.
+    Scripts share one interpreter, so imported modules stay loaded between
+    them - use execute_many when scripts must be fully isolated.
+
+    Args:
+        codes: Python scripts to execute
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+        timeout: Wall-clock limit in seconds for the whole batch
+        preflight: Run the local pre-flight checks first; only scripts that
+            pass them are sent to the sandbox
+
+    Returns:
+        List of (success, stdout, stderr, error_type) tuples, one per script
+    """
+    if not codes:
+        return []
+    if not isinstance(backend, ExecutionBackend):
+        backend = get_backend(backend)
+
+    results = [_preflight(code, f"script_{i}.py", preflight, {}) for i, code in enumerate(codes)]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+    backend.prepare()
 
-        response = sandbox.process.code_run(exec_wrapper, timeout=60)
-
-        # Parse results
-        output = response.result if hasattr(response, 'result') else str(response)
-
-        # Extract JSON result
-        if '__RESULT__' in output:
-            import json
-            json_part = output.split('__RESULT__')[1].strip()
-            try:
-                result = json.loads(json_part)
-                exit_code = result.get('exit_code', 1)
-                stdout = result.get('stdout', '')
-                stderr = result.get('stderr', '')
-            except json.JSONDecodeError:
-                exit_code = 1
-                stdout = output
-                stderr = "Failed to parse execution result"
-        else:
-            exit_code = response.exit_code if hasattr(response, 'exit_code') else 1
-            stdout = output
-            stderr = ""
-
-        success = exit_code == 0
-
-        # Classify the error type
-        error_type = _classify_error(exit_code, stdout, stderr)
-        print(f"[executor] Execution complete (success={success}, type={error_type})")
-
-        if success:
-            return True, stdout, "", error_type
-        else:
-            return False, "", stderr if stderr else stdout, error_type
+    try:
+        print(f"[executor] Executing batch of {len(pending)} scripts...")
+        process_exit_code, output = backend.run_batch([codes[i] for i in pending], timeout=timeout)
+        for i, parsed in zip(pending, parse_batch_result(output, process_exit_code, len(pending))):
+            results[i] = _to_result(*parsed[:4])
+        passed = sum(1 for success, _, _, _ in results if success)
+        print(f"[executor] Batch complete ({passed}/{len(results)} succeeded)")
+        return results
 
     except Exception as e:
-        error_msg = f"Daytona execution failed: {str(e)}"
+        error_msg = f"{backend.label} batch execution failed: {str(e)}"
         print(f"[executor] ERROR: {error_msg}")
-        return False, "", error_msg, "crash"
+        for i in pending:
+            results[i] = (False, "", error_msg, "crash")
+        return results
+
+async def execute_code_async(code: str, filename: str = "generated_script.py",
+                             backend: Union[str, ExecutionBackend, None] = None,
+                             executor: Optional[ThreadPoolExecutor] = None,
+                             cancel: Optional[threading.Event] = None) -> Tuple[bool, str, str, str]:
+    """
+    Awaitable execute_code - runs the blocking backend call off the event loop.
+
+    Args:
+        code: Python code to execute
+        filename: Name for the generated file (for saving locally)
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+        executor: Thread pool to run on (None = the loop's default executor)
+        cancel: Kills the script once set (see execute_code)
+
+    Returns:
+        Same tuple as execute_code
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(execute_code, code, filename, backend, cancel=cancel))
+
+async def execute_as_completed(codes: Sequence[str], concurrency: int = 4,
+                               filenames: Optional[Sequence[str]] = None,
+                               backend: Union[str, ExecutionBackend, None] = None
+                               ) -> AsyncIterator[Tuple[int, Tuple[bool, str, str, str]]]:
+    """
+    Execute many scripts concurrently, yielding results as they finish.
 
+    At most `concurrency` scripts are in flight at once (sandbox lease, upload
+    and run all overlap across scripts). With the Daytona backend the sandbox
+    pool's max size is a second cap - raise SANDBOX_POOL_MAX_SIZE to match.
+    Leaving the loop early cancels scripts that have not started yet and
+    kills the ones still running; closing the generator returns once they
+    have stopped and given back their sandboxes.
+
+    Args:
+        codes: Python scripts to execute
+        concurrency: Maximum number of scripts running at the same time
+        filenames: Optional local filenames (default generated_script_<i>.py)
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+
+    Yields:
+        Tuple of (index into codes, execute_code result tuple)
+    """
+    if filenames is None:
+        filenames = [f"generated_script_{i}.py" for i in range(len(codes))]
+    if not isinstance(backend, ExecutionBackend):
+        backend = get_backend(backend)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="execute")
+    stop = threading.Event()
+
+    async def run_one(index: int):
+        async with semaphore:
+            result = await execute_code_async(codes[index], filenames[index], backend, executor=pool, cancel=stop)
+            return index, result
+
+    tasks = [asyncio.create_task(run_one(i)) for i in range(len(codes))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
     finally:
-        # Cleanup sandbox
-        if sandbox is not None:
-            try:
-                print("[executor] Cleaning up sandbox...")
-                sandbox.delete()
-                print("[executor] ✓ Sandbox deleted")
-            except Exception as e:
-                print(f"[executor] Warning: Failed to delete sandbox: {e}")
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        # Scripts already running are being killed - wait for them to release their sandboxes
+        await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+def execute_first_success(codes: Sequence[str], filenames: Optional[Sequence[str]] = None,
+                          backend: Union[str, ExecutionBackend, None] = None,
+                          concurrency: Optional[int] = None) -> Tuple[Optional[int], List[Optional[Tuple[bool, str, str, str]]]]:
+    """
+    Race alternative scripts: run them concurrently and stop at the first success.
+
+    Candidates that haven't started when one succeeds are cancelled; ones
+    already running are killed, and their sandboxes are released before this
+    returns.
+
+    Args:
+        codes: Alternative scripts for the same task
+        filenames: Optional local filenames (default generated_script_<i>.py)
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+        concurrency: Scripts in flight at once (default all of them)
+
+    Returns:
+        Tuple of (index of the winning script or None if none succeeded,
+        execute_code results by index - None for the ones cut short)
+    """
+    async def race():
+        results: List[Optional[Tuple[bool, str, str, str]]] = [None] * len(codes)
+        finished = execute_as_completed(codes, concurrency or len(codes), filenames, backend)
+        try:
+            async for index, result in finished:
+                results[index] = result
+                if result[3] == "success":
+                    print(f"[executor] ✓ Candidate {index} succeeded first")
+                    return index, results
+        finally:
+            await finished.aclose()
+        print(f"[executor] None of {len(codes)} candidates succeeded")
+        return None, results
+
+    return asyncio.run(race())
+
+async def execute_many(codes: Sequence[str], concurrency: int = 4,
+                       filenames: Optional[Sequence[str]] = None,
+                       backend: Union[str, ExecutionBackend, None] = None) -> List[Tuple[bool, str, str, str]]:
+    """
+    Execute many scripts concurrently and return results in input order.
+
+    Args:
+        codes: Python scripts to execute
+        concurrency: Maximum number of scripts running at the same time
+        filenames: Optional local filenames (default generated_script_<i>.py)
+        backend: Backend name, instance, or None for config.EXECUTION_BACKEND
+
+    Returns:
+        List of execute_code result tuples, one per input script
+    """
+    results: List[Optional[Tuple[bool, str, str, str]]] = [None] * len(codes)
+    async for index, result in execute_as_completed(codes, concurrency, filenames, backend):
+        results[index] = result
+    return results
@@ -0,0 +1,137 @@
+"""
+Fix Cache - Heal a failure we've already healed without calling the LLM
+
+The same broken code keeps failing the same way (the ZeroDivisionError
+average from test_6 is the classic), and every repeat paid for a fresh fix.
+A failure is fingerprinted by:
+
+1. code_analysis.code_hash - the normalized AST, so formatting/comments don't matter
+2. the exception type ("ZeroDivisionError", or "silent_failure" for no output)
+3. the line of the innermost script frame on the failing stack
+
+fix_code stores every fix it makes under the failure's fingerprint, unverified.
+Once the fixed code has been re-executed, record_result() marks the entry
+verified (or not); only verified fixes are handed out again. A cached fix that
+later fails loses its verified flag, so it is never served twice in a row.
+
+Entries live in a TieredCache: LRU memory in front of SQLite, both evicting
+the least recently used fixes.
+
+SIMPLICITY: one fix per fingerprint - a newer verified fix replaces the old one.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Dict, Optional
+from backend import config
+from backend.cache import TieredCache, build_cache
+from backend.code_analysis import code_hash
+from backend.fix_context import FRAME_RE, LIBRARY_PATHS, SUMMARY_RE
+
+# Last line of a traceback ("json.decoder.JSONDecodeError: ...") or the
+# wrapper's summary ("Unhandled KeyError at script.py line 4: ...")
+EXCEPTION_RE = re.compile(
+    r"^(?:(?:Handled|Unhandled) )?(?:[A-Za-z_][\w]*\.)*"
+    r"(?P<type>[A-Za-z_]\w*(?:Error|Exception|Warning|Exit|Interrupt|StopIteration))\b")
+
+_fix_cache: Optional[TieredCache] = None
+_cache_lock = threading.Lock()
+_cache_counts = {"hits": 0, "misses": 0}
+
+
+def get_fix_cache() -> TieredCache:
+    """Process-wide fix cache, built from config on first use."""
+    global _fix_cache
+    with _cache_lock:
+        if _fix_cache is None:
+            _fix_cache = build_cache(config.FIX_CACHE_SIZE, config.FIX_CACHE_TTL,
+                                     config.FIX_CACHE_PATH, config.FIX_CACHE_DISK_SIZE)
+        return _fix_cache
+
+
+def fingerprint(code: str, error: str) -> str:
+    """Key of a failure: normalized code hash, exception type and failing line."""
+    material = "\0".join([code_hash(code), exception_type(error), str(failing_line(error) or "")])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def exception_type(error: str) -> str:
+    """Type of the last exception in the error text ("silent_failure" for no output)."""
+    found = None
+    for line in error.splitlines():
+        match = EXCEPTION_RE.match(line.strip())
+        if match:
+            found = match.group("type")
+    if found:
+        return found
+    if "no output" in error.lower() or "silent_failure" in error.lower():
+        return "silent_failure"
+    lines = [line.strip() for line in error.splitlines() if line.strip()]
+    return lines[-1][:200] if lines else ""
+
+
+def failing_line(error: str) -> Optional[int]:
+    """Line of the innermost frame that belongs to the script (None without frames)."""
+    line = None
+    for text in error.splitlines():
+        match = FRAME_RE.match(text) or SUMMARY_RE.match(text)
+        if match and not any(marker in match.group("file") for marker in LIBRARY_PATHS):
+            line = int(match.group("line"))
+    return line
+
+
+def lookup(key: str) -> Optional[Dict]:
+    """
+    A verified fix for this fingerprint.
+
+    Returns:
+        The cache entry (fixed_code, model, verified, successes, failures),
+        None if there is none or it hasn't passed re-execution
+    """
+    entry = get_fix_cache().get(key)
+    if entry is None or not entry.get("verified"):
+        _count("misses")
+        return None
+    _count("hits")
+    return entry
+
+
+def store(key: str, fixed_code: str, model: str):
+    """Remember a new (unverified) fix - a verified one already stored is kept."""
+    cache = get_fix_cache()
+    entry = cache.get(key)
+    if entry is not None and entry.get("verified"):
+        return
+    cache.set(key, {"fixed_code": fixed_code, "model": model, "verified": None, "successes": 0, "failures": 0})
+
+
+def record_result(key: str, fixed_code: str, success: bool, model: str = ""):
+    """
+    Record whether a fix passed re-execution.
+
+    A success verifies the entry (replacing a different, unverified fix); a
+    failure un-verifies it. Results for a fix other than the stored one are
+    ignored unless they are successes.
+    """
+    cache = get_fix_cache()
+    entry = cache.get(key)
+    if entry is None or entry["fixed_code"] != fixed_code:
+        if not success:
+            return
+        entry = {"fixed_code": fixed_code, "model": model, "successes": 0, "failures": 0}
+    entry["successes" if success else "failures"] += 1
+    entry["verified"] = success
+    cache.set(key, entry)
+    print(f"[fix_cache] Fix {key[:8]} {'verified' if success else 'failed re-execution'}")
+
+
+def fix_cache_stats() -> Dict[str, int]:
+    """Hits and misses of fix_code's cache since the process started."""
+    with _cache_lock:
+        return dict(_cache_counts)
+
+
+def _count(outcome: str):
+    with _cache_lock:
+        _cache_counts[outcome] += 1
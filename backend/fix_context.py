@@ -0,0 +1,368 @@
+"""
+Fix Context - Fit the broken code and its error into a token budget for fix_code
+
+Streamlit hands the fixer the whole program and the whole stderr. For a big
+script or a deep traceback most of those tokens are noise: library frames,
+thousands of identical recursion frames, functions that never ran. When the
+pair is over FIX_CONTEXT_TOKEN_BUDGET, this module shrinks it in order:
+
+1. Traceback - keep the script's frames and the frame that raised, collapse
+   library frames and repeated frames/cycles, reduce chained tracebacks to
+   their final exception line
+2. Code - keep imports, module-level code and every definition on the
+   failing stack in full; other top-level functions/classes become one-line
+   stubs the model copies back verbatim and restore() expands again. The
+   traceback's script line numbers are rewritten to the sliced code, so the
+   model (and diff-mode line hints) point at the right lines
+3. Error text - trim the middle as a last resort (the exception line at the
+   end always survives)
+
+Tokens are counted with tiktoken (in requirements.txt); without it they are
+estimated at 4 characters per token.
+
+SIMPLICITY: line-based traceback parsing and top-level-only slicing - a
+class on the stack is kept whole. Anything that doesn't parse is left as-is.
+"""
+
+import ast
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from backend import config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Frame header as printed by traceback: '  File "script.py", line 12, in main'
+FRAME_RE = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<func>.+)$')
+# "Unhandled KeyError at script.py line 4: ..." - the wrapper's exception summary
+SUMMARY_RE = re.compile(r"^(?:Handled|Unhandled) \w[\w.]* at (?P<file>\S+) line (?P<line>\d+)")
+# One-line stand-in for an omitted definition; restore() swaps the original back in
+STUB_MARKER = "# <kept: {name}>"
+STUB_RE = re.compile(r"^[ \t]*(?:async\s+def|def|class)\s+\w+.*#\s*<kept:\s*(\w+)>[ \t]*$", re.MULTILINE)
+
+# Frames from these paths are library code, not the script
+LIBRARY_PATHS = ("site-packages", "dist-packages", "/lib/python", "<frozen")
+
+_encoding = None
+
+
+class FixContext:
+    """Code and error text to put in the fix prompt, plus what it took to get there."""
+
+    def __init__(self, code: str, error: str, kept: Dict[str, str], tokens_before: int, tokens_after: int):
+        self.code = code
+        self.error = error
+        # Definitions replaced by stubs: name -> original source
+        self.kept = kept
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+
+    @property
+    def compressed(self) -> bool:
+        return self.tokens_after < self.tokens_before
+
+    def stats(self) -> Dict:
+        """Entries for the fix metrics dict."""
+        return {
+            "context_tokens_before": self.tokens_before,
+            "context_tokens_after": self.tokens_after,
+            "context_stubs": len(self.kept),
+        }
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the model's tokenizer, or a ~4 chars/token estimate without tiktoken."""
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def compress(code: str, error: str, budget: Optional[int] = None) -> FixContext:
+    """
+    Shrink code + error until they fit the token budget (see module docstring).
+
+    Args:
+        code: The program that failed
+        error: The error text from execution (stderr, exception summary)
+        budget: Max tokens for both together (default config.FIX_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        FixContext - unchanged text if it already fits
+    """
+    budget = budget or config.FIX_CONTEXT_TOKEN_BUDGET
+    before = count_tokens(code) + count_tokens(error)
+    if not config.FIX_CONTEXT_ENABLED or before <= budget:
+        return FixContext(code, error, {}, before, before)
+
+    error = compress_traceback(error)
+    kept: Dict[str, str] = {}
+    if count_tokens(code) + count_tokens(error) > budget:
+        lines, functions = failing_locations(error)
+        code, kept, line_map = _slice(code, lines, functions)
+        if kept:
+            error = renumber_lines(error, line_map)
+
+    room = budget - count_tokens(code)
+    if count_tokens(error) > room:
+        error = trim_middle(error, max(room, config.FIX_CONTEXT_MIN_ERROR_TOKENS))
+
+    after = count_tokens(code) + count_tokens(error)
+    print(f"[fix_context] Fix context {before} -> {after} tokens (budget {budget}, {len(kept)} stubs)")
+    return FixContext(code, error, kept, before, after)
+
+
+def compress_traceback(error: str) -> str:
+    """Keep the frames that explain the failure; collapse library frames and repetition."""
+    lines = error.splitlines()
+    starts = [i for i, line in enumerate(lines) if line.startswith("Traceback (most recent call last)")]
+    if not starts:
+        return error
+
+    out = lines[:starts[0]]
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(lines)
+        block = lines[start:end]
+        if n + 1 < len(starts):
+            # Earlier link in an exception chain: its final line says enough
+            out.extend(line for line in block[-3:] if line.strip() and not FRAME_RE.match(line))
+            continue
+        out.extend(_compress_block(block))
+    return "\n".join(out)
+
+
+def _compress_block(block: List[str]) -> List[str]:
+    header, frames, tail = block[0], [], []
+    i = 1
+    while i < len(block):
+        match = FRAME_RE.match(block[i])
+        if match:
+            frame = [block[i]]
+            i += 1
+            # Source line, caret markers
+            while i < len(block) and block[i].startswith("    ") and not FRAME_RE.match(block[i]):
+                frame.append(block[i])
+                i += 1
+            frames.append((match.group("file"), match.group("line"), match.group("func"), frame))
+        elif block[i].strip().startswith("[Previous line repeated"):
+            if frames:
+                frames[-1][3].append(block[i])
+            i += 1
+        else:
+            tail = block[i:]
+            break
+
+    kept: List[List[str]] = []
+    skipped = 0
+    for index, (path, _, _, frame) in enumerate(frames):
+        if any(marker in path for marker in LIBRARY_PATHS) and index != len(frames) - 1:
+            skipped += 1
+            continue
+        if skipped:
+            kept.append([f"  ... {skipped} library frame(s) omitted ..."])
+            skipped = 0
+        kept.append(frame)
+    if skipped:
+        kept.append([f"  ... {skipped} library frame(s) omitted ..."])
+
+    out = [header]
+    for frame in _collapse_cycles(kept):
+        out.extend(frame)
+    return out + tail
+
+
+def _collapse_cycles(frames: List[List[str]], max_period: int = 3) -> List[List[str]]:
+    """Replace a frame (or a cycle of up to max_period frames) repeated back to back with one copy + a count."""
+    out: List[List[str]] = []
+    i = 0
+    while i < len(frames):
+        for period in range(1, max_period + 1):
+            unit = frames[i:i + period]
+            repeats = 1
+            while frames[i + repeats * period:i + (repeats + 1) * period] == unit:
+                repeats += 1
+            if repeats > 1 and len(unit) == period:
+                out.extend(unit)
+                plural = "frame" if period == 1 else f"{period} frames"
+                out.append([f"  [Previous {plural} repeated {repeats - 1} more times]"])
+                i += repeats * period
+                break
+        else:
+            out.append(frames[i])
+            i += 1
+    return out
+
+
+def failing_locations(error: str) -> Tuple[Set[int], Set[str]]:
+    """
+    Line numbers and function names on the failing stack that belong to the script.
+
+    Returns:
+        ({12, 30}, {"main", "parse_row"}) - empty sets if the error has no frames
+    """
+    lines: Set[int] = set()
+    functions: Set[str] = set()
+    for text in error.splitlines():
+        match = FRAME_RE.match(text) or SUMMARY_RE.match(text)
+        if not match or any(marker in match.group("file") for marker in LIBRARY_PATHS):
+            continue
+        lines.add(int(match.group("line")))
+        func = match.groupdict().get("func")
+        if func and func != "<module>":
+            functions.add(func.strip())
+    return lines, functions
+
+
+def slice_code(code: str, lines: Set[int], functions: Set[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Stub out top-level definitions that aren't on the failing stack.
+
+    With no stack information (e.g. a silent failure) every definition stays.
+
+    Returns:
+        Tuple of (sliced code, {name: original source of each stubbed definition})
+    """
+    sliced, kept, _ = _slice(code, lines, functions)
+    return sliced, kept
+
+
+def _slice(code: str, lines: Set[int], functions: Set[str]) -> Tuple[str, Dict[str, str], Dict[int, int]]:
+    """slice_code, plus where each original line ended up ({original line: sliced line}, 1-based)."""
+    if not lines and not functions:
+        return code, {}, {}
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return code, {}, {}
+
+    source = code.splitlines()
+    out: List[str] = []
+    kept: Dict[str, str] = {}
+    line_map: Dict[int, int] = {}
+    position = 0
+
+    def copy(end: int):
+        for number in range(position + 1, end + 1):
+            out.append(source[number - 1])
+            line_map[number] = len(out)
+
+    for node in tree.body:
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        last = node.end_lineno
+        if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                and node.name not in functions and not any(first <= line <= last for line in lines)
+                and node.name not in kept and last - first >= config.FIX_CONTEXT_MIN_STUB_LINES):
+            copy(first - 1)
+            kept[node.name] = "\n".join(source[first - 1:last])
+            out.append(_stub(node, source) + "  " + STUB_MARKER.format(name=node.name))
+            line_map.update((number, len(out)) for number in range(first, last + 1))
+            position = last
+    copy(len(source))
+    if not kept:
+        return code, {}, {}
+    return "\n".join(out) + ("\n" if code.endswith("\n") else ""), kept, line_map
+
+
+def renumber_lines(error: str, line_map: Dict[int, int]) -> str:
+    """Rewrite the script's line numbers in traceback frames / exception summaries through line_map."""
+    def renumber(text: str) -> str:
+        match = FRAME_RE.match(text) or SUMMARY_RE.match(text)
+        if not match or any(marker in match.group("file") for marker in LIBRARY_PATHS):
+            return text
+        line = int(match.group("line"))
+        if line not in line_map:
+            return text
+        start, end = match.span("line")
+        return text[:start] + str(line_map[line]) + text[end:]
+
+    return "\n".join(renumber(text) for text in error.split("\n"))
+
+
+def _stub(node: ast.stmt, source: List[str]) -> str:
+    """One-line signature of a definition, body replaced with ..."""
+    keyword = "class" if isinstance(node, ast.ClassDef) else (
+        "async def" if isinstance(node, ast.AsyncFunctionDef) else "def")
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(base) for base in node.bases)
+        signature = f"({bases})" if bases else ""
+    else:
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        signature = f"({ast.unparse(node.args)}){returns}"
+    return f"{keyword} {node.name}{signature}: ..."
+
+
+def restore(fixed_code: str, kept: Dict[str, str]) -> str:
+    """
+    Expand the stubs in the model's answer back into the original definitions.
+
+    Stubs the model dropped are put back after the imports, so nothing the
+    rest of the program uses goes missing.
+    """
+    if not kept:
+        return fixed_code
+    restored: Set[str] = set()
+
+    def expand(match):
+        name = match.group(1)
+        if name not in kept:
+            return match.group(0)
+        restored.add(name)
+        return kept[name]
+
+    fixed_code = STUB_RE.sub(expand, fixed_code)
+    missing = [name for name in kept if name not in restored]
+    if missing:
+        print(f"[fix_context] Restoring definitions the fix left out: {', '.join(missing)}")
+        lines = fixed_code.splitlines()
+        insert_at = _after_imports(fixed_code)
+        lines[insert_at:insert_at] = [kept[name] + "\n" for name in missing]
+        fixed_code = "\n".join(lines)
+    return fixed_code
+
+
+def _after_imports(code: str) -> int:
+    """Line index just past the leading imports (0 if the code doesn't parse)."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return 0
+    index = 0
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or (
+                isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)):
+            index = node.end_lineno
+        else:
+            break
+    return index
+
+
+def trim_middle(text: str, max_tokens: int) -> str:
+    """Keep the start and (mostly) the end of text within max_tokens - the exception line is last."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    head: List[str] = []
+    tail: List[str] = []
+    used = count_tokens("... lines omitted ...")
+    # A third of the budget for the start, the rest for the end
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens // 3:
+            break
+        head.append(line)
+        used += cost
+    for line in reversed(lines[len(head):]):
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        tail.insert(0, line)
+        used += cost
+    if not tail:
+        # One huge last line - keep its end
+        tail = [lines[-1][-max(1, max_tokens - used) * 4:]]
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"... {omitted} lines omitted ..."] + tail)
@@ -3,28 +3,254 @@ Code Fixer - Simulates CodeRabbit code review to fix errors
 
 SIMPLICITY: Just send broken code + error to LLM with "fix this" prompt
 Simulates CodeRabbit's AI code review capabilities
+
+The model comes from model_router.py: a fast tier for small first fixes,
+gpt-4o when the fast tier wrote the broken code or a fix is being retried.
+Big programs and deep tracebacks are cut down to a token budget first
+(see fix_context.py). In diff mode (FIX_MODE) the model answers with
+SEARCH/REPLACE edits that patcher.py applies locally, so a one-line fix
+doesn't pay completion tokens for the whole program; if the edits don't
+apply, the fix is asked for again as a full program. A failure that an
+earlier fix already healed (verified by re-execution) reuses that fix with
+no LLM call at all (see fix_cache.py), and mechanical failures (missing
+import, result never printed) are fixed locally by rule_fixer.py first.
 """
 
-from openai import OpenAI
-from backend import config
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from backend import config, fix_cache, fix_context, llm_client, model_router, patcher, rule_fixer
 
-# Initialize OpenAI client
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+# Shared OpenAI client - same connection pool as the generator (see llm_client.py)
+client = llm_client.get_client()
 
 # Galileo context initialized in generator.py
 # OpenAI calls are auto-instrumented - no additional setup needed here
 
-def fix_code(broken_code: str, error_message: str) -> str:
+# Added to the prompt when some definitions were replaced by stubs
+STUB_NOTE = """
+Some functions/classes that are not involved in the error are shown as one-line
+stubs ending in a `# <kept: name>` comment. Copy every stub line unchanged into
+your answer - the original definitions are restored automatically.
+"""
+
+# Diff-mode versions of the above
+DIFF_STUB_NOTE = """
+Some functions/classes that are not involved in the error are shown as one-line
+stubs ending in a `# <kept: name>` comment. Never edit or search for stub lines.
+"""
+
+DIFF_FORMAT = """Do NOT repeat the whole program. Output ONLY the changes as one or more
+SEARCH/REPLACE blocks, no explanations:
+
+<<<<<<< SEARCH
+whole lines copied exactly from the code above
+=======
+the lines that replace them
+>>>>>>> REPLACE
+
+Copy a few lines of context into each SEARCH section, one block per change, so
+that it matches only one place in the code.
+To add an import, search for the first line of the code and replace it with
+the import followed by that line.
+"""
+
+# Last line of each full-mode prompt
+FULL_FORMAT = {
+    "silent": "Output ONLY the corrected Python code with print statements, no explanations or markdown.\n",
+    "handled": "Output ONLY the corrected Python code, no explanations or markdown.\n",
+    "crash": "Output ONLY the corrected Python code, no explanations or markdown.\n",
+}
+
+def fix_code(broken_code: str, error_message: str, attempt: int = 1, failed_model: Optional[str] = None,
+             return_metrics: bool = False, use_cache: bool = True,
+             use_rules: bool = True) -> Union[str, Tuple[str, Dict]]:
     """
     Fix broken code using AI code review (simulating CodeRabbit).
 
     Args:
         broken_code: The code that failed
         error_message: The error message from execution
+        attempt: 1 for the first fix of this code, 2+ for retries
+        failed_model: Model that wrote broken_code (a fast-tier failure escalates)
+        return_metrics: Also return the call's metrics (model, tier, tokens,
+            latency_ms, estimated_cost, ... - see model_router.call_metrics;
+            pass metrics["fix_fingerprint"] to fix_cache.record_result once
+            the fix has been re-executed)
+        use_cache: Reuse a verified fix for the same failure (see fix_cache.py)
+        use_rules: Try the deterministic rule fixes first (see rule_fixer.py)
 
     Returns:
-        Fixed Python code
+        Fixed Python code, or (fixed_code, metrics) with return_metrics=True
+    """
+    ruled = _rule_fix(broken_code, error_message, use_rules)
+    if ruled:
+        return ruled if return_metrics else ruled[0]
+    key, cached = _cached_fix(broken_code, error_message, use_cache)
+    if cached:
+        return cached if return_metrics else cached[0]
+    model, reason = _route(broken_code, error_message, attempt, failed_model)
+    started = time.time()
+    context = fix_context.compress(broken_code, error_message)
+    mode = fix_mode(context.code)
+
+    # Call OpenAI
+    responses = [client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": _fix_prompt(context, mode)}]
+    )]
+    applied = _apply(responses[0], context, mode)
+    if applied is None:
+        # The edits didn't fit the code - pay for the full program after all
+        responses.append(client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": _fix_prompt(context, "full")}]
+        ))
+
+    # Note: Galileo auto-instruments OpenAI - this call is automatically logged
+
+    return _finish(responses, applied, context, model, reason, started, key, return_metrics)
+
+async def fix_code_async(broken_code: str, error_message: str, attempt: int = 1,
+                         failed_model: Optional[str] = None, return_metrics: bool = False,
+                         use_cache: bool = True, use_rules: bool = True) -> Union[str, Tuple[str, Dict]]:
+    """Awaitable fix_code on the shared AsyncOpenAI client."""
+    ruled = _rule_fix(broken_code, error_message, use_rules)
+    if ruled:
+        return ruled if return_metrics else ruled[0]
+    key, cached = _cached_fix(broken_code, error_message, use_cache)
+    if cached:
+        return cached if return_metrics else cached[0]
+    model, reason = _route(broken_code, error_message, attempt, failed_model)
+    started = time.time()
+    context = fix_context.compress(broken_code, error_message)
+    mode = fix_mode(context.code)
+    async_client = llm_client.get_async_client()
+    responses = [await async_client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": _fix_prompt(context, mode)}]
+    )]
+    applied = _apply(responses[0], context, mode)
+    if applied is None:
+        responses.append(await async_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": _fix_prompt(context, "full")}]
+        ))
+    return _finish(responses, applied, context, model, reason, started, key, return_metrics)
+
+def fix_mode(code: str) -> str:
+    """"diff" (answer with edits) or "full" (answer with the whole program) for this code."""
+    if config.FIX_MODE == "diff" and len(code.splitlines()) >= config.FIX_DIFF_MIN_LINES:
+        return "diff"
+    return "full"
+
+def _rule_fix(broken_code: str, error_message: str, use_rules: bool) -> Optional[Tuple[str, Dict]]:
+    """(fixed code, metrics) from the first rule that applies, None if none does."""
+    if not (use_rules and config.RULE_FIXER_ENABLED):
+        return None
+    result = rule_fixer.fix(broken_code, error_message)
+    if result is None:
+        return None
+    fixed_code, rule, latency_ms = result
+    metrics = _local_metrics("rules", rule, latency_ms)
+    metrics.update({"fix_mode": "rule", "rule": rule, "rules": rule_fixer.rule_stats()})
+    return fixed_code, metrics
+
+def _local_metrics(model: str, reason: str, latency_ms: float) -> Dict:
+    """Metrics of a fix made without an LLM call (same keys as an LLM fix)."""
+    return {
+        "model": model,
+        "tier": "local" if model == "rules" else model_router.tier_of(model),
+        "route_reason": reason,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "latency_ms": round(latency_ms, 2),
+        "estimated_cost": 0.0,
+        "tiers": model_router.tier_stats(),
+        "context_tokens_before": 0,
+        "context_tokens_after": 0,
+        "context_stubs": 0,
+        "patch_edits": 0,
+        "patch_fuzzy": 0,
+        "completion_tokens_full_estimate": 0,
+        "completion_tokens_saved": 0,
+        "cached": False,
+        "fix_fingerprint": None,
+        "rule": None,
+    }
+
+def _cached_fix(broken_code: str, error_message: str,
+               use_cache: bool) -> Tuple[Optional[str], Optional[Tuple[str, Dict]]]:
+    """(fingerprint, cached result) - fingerprint is None when caching is off, result None on a miss."""
+    if not (use_cache and config.FIX_CACHE_ENABLED):
+        return None, None
+    started = time.time()
+    key = fix_cache.fingerprint(broken_code, error_message)
+    entry = fix_cache.lookup(key)
+    if entry is None:
+        return key, None
+    print(f"[fixer] ✓ Reusing a verified fix ({entry['successes']} successful re-runs), skipped LLM call")
+    metrics = _local_metrics(entry["model"], "cached", (time.time() - started) * 1000)
+    metrics.update({"fix_mode": "cached", "cached": True, "fix_fingerprint": key})
+    stats = fix_cache.fix_cache_stats()
+    metrics.update({"cache_hits": stats["hits"], "cache_misses": stats["misses"]})
+    return key, (entry["fixed_code"], metrics)
+
+def _route(broken_code: str, error_message: str, attempt: int, failed_model: Optional[str]) -> Tuple[str, str]:
+    model, reason = model_router.route("fix", fix_job(broken_code, error_message), attempt, failed_model)
+    print(f"[fixer] Using {model} ({reason})")
+    return model, reason
+
+def fix_job(broken_code: str, error_message: str) -> str:
+    """The text the router classifies a fix by (pass it to model_router.record_outcome)."""
+    return f"{broken_code}\n{error_message}"
+
+def _apply(response, context: fix_context.FixContext, mode: str) -> Optional[Tuple[str, Dict]]:
+    """
+    (fixed code, patch stats) from the model's answer, None if its edits don't apply.
+
+    A diff-mode answer that is a whole program anyway is taken as it is.
     """
+    answer = response.choices[0].message.content
+    if mode != "diff" or not patcher.is_patch(answer):
+        return _strip_markdown(answer), {}
+    try:
+        return patcher.apply_patch(context.code, answer)
+    except ValueError as e:
+        print(f"[fixer] ⚠️ Edits didn't apply ({e}) - asking for the full program")
+        return None
+
+def _finish(responses: List, applied: Optional[Tuple[str, Dict]], context: fix_context.FixContext, model: str,
+            reason: str, started: float, key: Optional[str],
+            return_metrics: bool) -> Union[str, Tuple[str, Dict]]:
+    code, patch = applied if applied is not None else (_strip_markdown(responses[-1].choices[0].message.content), {})
+    # Stubbed definitions go back in as they were
+    fixed_code = fix_context.restore(code, context.kept)
+    prompt_tokens = sum(r.usage.prompt_tokens for r in responses)
+    completion_tokens = sum(r.usage.completion_tokens for r in responses)
+    metrics = model_router.call_metrics(model, reason, prompt_tokens, completion_tokens,
+                                        (time.time() - started) * 1000)
+    metrics.update(context.stats())
+    # What answering with the whole (compressed) program would have cost
+    full_tokens = fix_context.count_tokens(code) if patch or len(responses) > 1 else completion_tokens
+    metrics.update({
+        "fix_mode": "diff" if patch else ("diff_fallback" if len(responses) > 1 else "full"),
+        "patch_edits": patch.get("edits", 0),
+        "patch_fuzzy": patch.get("fuzzy", 0),
+        "completion_tokens_full_estimate": full_tokens,
+        "completion_tokens_saved": full_tokens - completion_tokens,
+        "cached": False,
+        "fix_fingerprint": key,
+        "rule": None,
+    })
+    if key:
+        # Served again only after record_result() sees it pass re-execution
+        fix_cache.store(key, fixed_code, model)
+    return (fixed_code, metrics) if return_metrics else fixed_code
+
+def _fix_prompt(context: fix_context.FixContext, mode: str = "full") -> str:
+    """CodeRabbit-style review prompt for this kind of failure ("full" program or "diff" edits)."""
+    broken_code, error_message = context.code, context.error
     # Detect error type from message
     is_silent_failure = "no output" in error_message.lower() or "silent_failure" in error_message.lower()
     is_handled_exception = "handled exception" in error_message.lower() or "cannot divide by zero" in error_message.lower()
@@ -54,8 +280,8 @@ Your task:
 Remember: In Python scripts, just writing a variable name (like `result`) doesn't print it.
 You MUST use print() to show output.
 
-Output ONLY the corrected Python code with print statements, no explanations or markdown.
 """
+        kind = "silent"
     elif is_handled_exception:
         fix_prompt = f"""You are CodeRabbit, an AI code reviewer.
 
@@ -77,8 +303,8 @@ Your task:
 2. Ensure the code produces the expected results
 3. Add print() statements to display results
 
-Output ONLY the corrected Python code, no explanations or markdown.
 """
+        kind = "handled"
     else:
         # Standard crash
         fix_prompt = f"""You are CodeRabbit, an AI code reviewer.
@@ -97,23 +323,17 @@ Error:
 Analyze the error and provide a fixed version of the code.
 Make sure the fixed code prints its results using print().
 
-Output ONLY the corrected Python code, no explanations or markdown.
 """
+        kind = "crash"
+    fix_prompt += DIFF_FORMAT if mode == "diff" else FULL_FORMAT[kind]
+    if context.kept:
+        fix_prompt += DIFF_STUB_NOTE if mode == "diff" else STUB_NOTE
+    return fix_prompt
 
-    # Call OpenAI
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": fix_prompt}]
-    )
-
-    fixed_code = response.choices[0].message.content
-
+def _strip_markdown(fixed_code: str) -> str:
     # Strip markdown if present
     if "```python" in fixed_code:
         fixed_code = fixed_code.split("```python")[1].split("```")[0].strip()
     elif "```" in fixed_code:
         fixed_code = fixed_code.split("```")[1].split("```")[0].strip()
-
-    # Note: Galileo auto-instruments OpenAI - this call is automatically logged
-
     return fixed_code
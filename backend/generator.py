@@ -3,15 +3,26 @@ Code Generator - Uses LLM to generate Python code from natural language
 
 SIMPLICITY: Just a simple system prompt + OpenAI call + Galileo monitoring
 No complex prompt engineering - keep it straightforward for hackathon demo
+
+Identical requests (same normalized prompt, system prompt, model and
+parameters) are answered from a generation cache instead of the LLM; code
+that fails when executed is dropped from it (record_result).
+Each call goes to the model model_router.py picks (a fast tier for easy
+prompts, gpt-4o for hard ones). With stream=True the code is yielded token by token, and pre-flight plus
+sandbox warm-up start the moment the stream closes. generate_candidates asks
+for several alternatives at once, to be raced through execution.
 """
 
+import hashlib
+import json
+import threading
 import time
-from typing import Tuple, Dict
-from openai import OpenAI
-from backend import config
+from typing import Any, Tuple, Dict, Iterator, List, Optional, Union
+from backend import config, executor, llm_client, model_router
+from backend.cache import TieredCache, build_cache
 
-# Initialize OpenAI client
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+# Shared OpenAI client - same connection pool as the fixer (see llm_client.py)
+client = llm_client.get_client()
 
 # Initialize Galileo context (optional - with error handling)
 GALILEO_ENABLED = False
@@ -29,65 +40,363 @@ except Exception as e:
     print(f"[galileo] ⚠️  Galileo initialization failed: {str(e)[:100]}")
     print("[galileo]    LLM monitoring will be disabled but code generation will continue")
 
-def generate_code(user_prompt: str) -> Tuple[str, Dict]:
+# Simple system prompt - no overthinking
+SYSTEM_PROMPT = (
+    "You are a Python expert. Write ONLY executable Python code. "
+    "No markdown formatting, no explanations, no comments. "
+    "Just pure Python code that can be run directly. "
+    "If you need libraries, assume they are installed."
+)
+
+# Extra chat.completions parameters (part of the cache key)
+GENERATION_PARAMS: Dict[str, Any] = {}
+
+_generation_cache: Optional[TieredCache] = None
+_cache_lock = threading.Lock()
+_cache_counts = {"hits": 0, "misses": 0}
+
+def get_generation_cache() -> TieredCache:
+    """Process-wide generation cache, built from config on first use."""
+    global _generation_cache
+    with _cache_lock:
+        if _generation_cache is None:
+            _generation_cache = build_cache(config.GENERATION_CACHE_SIZE, config.GENERATION_CACHE_TTL,
+                                            config.GENERATION_CACHE_PATH, config.GENERATION_CACHE_DISK_SIZE)
+        return _generation_cache
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace-insensitive form of a prompt ("  Sort a list\n" == "Sort a list")."""
+    return " ".join(prompt.split())
+
+def generation_cache_key(user_prompt: str, system_prompt: str = SYSTEM_PROMPT, model: Optional[str] = None,
+                         params: Optional[Dict[str, Any]] = None) -> str:
+    """Hash of everything that determines the LLM's answer (model defaults to the strong tier)."""
+    model = model or config.ROUTER_STRONG_MODEL
+    material = json.dumps([normalize_prompt(user_prompt), system_prompt, model, params or {}], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def generation_cache_stats() -> Dict[str, int]:
+    """Hits and misses of generate_code's cache since the process started."""
+    with _cache_lock:
+        return dict(_cache_counts)
+
+def _count(outcome: str) -> Dict[str, int]:
+    with _cache_lock:
+        _cache_counts[outcome] += 1
+        return {"cache_hits": _cache_counts["hits"], "cache_misses": _cache_counts["misses"]}
+
+def strip_fences(text: str) -> str:
+    """Strip markdown if LLM added it despite instructions."""
+    if "```python" in text:
+        return text.split("```python")[1].split("```")[0].strip()
+    if "```" in text:
+        return text.split("```")[1].split("```")[0].strip()
+    return text
+
+class FenceStripper:
+    """
+    Incremental strip_fences for a streamed completion.
+
+    feed() takes raw deltas and returns the code text that can be shown
+    already; only the start of a line is held back while it could still turn
+    out to be a ``` fence. The final code is strip_fences() of the whole
+    completion - this is the live preview of it.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._mid_line = False  # part of the pending line was already emitted
+        self._state = "start"   # start -> code | fenced -> done
+
+    def feed(self, text: str) -> str:
+        self._pending += text
+        out: List[str] = []
+        while "\n" in self._pending and self._state != "done":
+            line, self._pending = self._pending.split("\n", 1)
+            out.append(self._line(line, "\n"))
+        if self._state == "done":
+            self._pending = ""
+        elif self._mid_line or (self._pending.strip() and not self._pending.lstrip().startswith("`")):
+            # Can't be a fence any more - show the partial line now
+            out.append(self._pending)
+            self._pending = ""
+            self._mid_line = True
+            if self._state == "start":
+                self._state = "code"
+        return "".join(out)
+
+    def close(self) -> str:
+        """Flush what's left once the stream ends."""
+        rest, self._pending = self._pending, ""
+        if self._state == "done" or not rest:
+            return ""
+        return self._line(rest, "")
+
+    def _line(self, line: str, end: str) -> str:
+        if self._mid_line:
+            self._mid_line = False
+            return line + end
+        if line.strip().startswith("```"):
+            self._state = "done" if self._state == "fenced" else "fenced"
+            return ""
+        if self._state == "start":
+            if not line.strip():
+                return ""
+            self._state = "code"
+        return line + end
+
+def _route(user_prompt: str, model: Optional[str]) -> Tuple[str, str]:
+    """(model, reason) - an explicitly requested model bypasses the router."""
+    if model:
+        return model, "requested"
+    model, reason = model_router.route("generate", user_prompt)
+    print(f"[generator] Using {model} ({reason})")
+    return model, reason
+
+def _cached_generation(user_prompt: str, model: str, reason: str, use_cache: bool,
+                       start_time: float) -> Tuple[Optional[str], Optional[Tuple[str, Dict]]]:
+    """(cache key, cached result) - key is None when caching is off, result None on a miss."""
+    if not (use_cache and config.GENERATION_CACHE_ENABLED):
+        return None, None
+    cache_key = generation_cache_key(user_prompt, SYSTEM_PROMPT, model, GENERATION_PARAMS)
+    cached = get_generation_cache().get(cache_key)
+    if cached is None:
+        return cache_key, None
+    print("[generator] ✓ Cached generation, skipped LLM call")
+    latency_ms = round((time.time() - start_time) * 1000, 2)
+    metrics = {
+        "model": cached["model"],
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "latency_ms": latency_ms,
+        "ttft_ms": latency_ms,
+        "tokens_per_sec": None,
+        "estimated_cost": 0.0,
+        "cached": True,
+        "tier": model_router.tier_of(cached["model"]),
+        "route_reason": reason,
+        "tiers": model_router.tier_stats(),
+        "cache_key": cache_key,
+    }
+    metrics.update(_count("hits"))
+    return cache_key, (cached["code"], metrics)
+
+def _usage_metrics(model: str, reason: str, prompt_tokens: int, completion_tokens: int, latency_ms: float,
+                   ttft_ms: float, generating_ms: float) -> Dict:
+    """Metrics for one LLM call (see model_router.call_metrics) plus streaming timings."""
+    metrics = model_router.call_metrics(model, reason, prompt_tokens, completion_tokens, latency_ms)
+    # Time until the first token could be shown, and decode speed after it
+    metrics["ttft_ms"] = round(ttft_ms, 2)
+    metrics["tokens_per_sec"] = round(completion_tokens / (generating_ms / 1000), 1) if generating_ms > 0 else None
+    metrics["cached"] = False
+    return metrics
+
+def _messages(user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _finish(response, model: str, reason: str, start_time: float, cache_key: Optional[str]) -> Tuple[str, Dict]:
+    """(code, metrics) from a complete (non-streamed) response, stored in the cache."""
+    # Calculate latency - nothing can be shown before the whole response is in
+    latency_ms = (time.time() - start_time) * 1000
+
+    code = strip_fences(response.choices[0].message.content)
+
+    # Extract performance metrics
+    usage = response.usage
+    metrics = _usage_metrics(model, reason, usage.prompt_tokens, usage.completion_tokens,
+                             latency_ms, latency_ms, latency_ms)
+    _store(cache_key, code, metrics)
+    return code, metrics
+
+def _store(cache_key: Optional[str], code: str, metrics: Dict):
+    metrics["cache_key"] = cache_key
+    if cache_key:
+        get_generation_cache().set(cache_key, {"code": code, "model": metrics["model"]})
+        metrics.update(_count("misses"))
+
+def record_result(metrics: Dict, code: str, success: bool):
+    """
+    Report whether generated code ran successfully.
+
+    A failure evicts the cached generation (if it is still this code), so the
+    same prompt goes back to the LLM instead of replaying broken code.
+
+    Args:
+        metrics: The metrics generate_code returned with the code
+        code: The generated code that was executed
+        success: Whether it ran with error_type "success"
+    """
+    cache_key = metrics.get("cache_key")
+    if success or not cache_key:
+        return
+    cache = get_generation_cache()
+    cached = cache.get(cache_key)
+    if cached is not None and cached["code"] == code:
+        cache.delete(cache_key)
+        print(f"[generator] Dropped cached generation {cache_key[:8]} - its code failed")
+
+def generate_code(user_prompt: str, use_cache: bool = True, stream: bool = False,
+                  model: Optional[str] = None) -> Union[Tuple[str, Dict], Iterator[Tuple[str, Any]]]:
     """
     Generate Python code from a natural language prompt.
 
     Args:
         user_prompt: What the user wants the code to do
+        use_cache: Answer repeated prompts from the generation cache
+        stream: Return an iterator of events instead (see _generate_stream)
+        model: Use this model instead of the one the router picks
 
     Returns:
         Tuple of (generated_code: str, metrics: dict)
-        metrics contains: model, tokens, latency_ms, estimated_cost
+        metrics contains: model, tier ("fast"/"strong"), route_reason, tokens,
+        latency_ms, ttft_ms, tokens_per_sec, estimated_cost, cached (True on a
+        cache hit - no tokens, no cost), tiers (per-tier totals so far) and
+        the process-wide cache_hits / cache_misses counters, and cache_key.
+        Report whether the code ran with record_result (a failed generation
+        leaves the cache) and model_router.record_outcome.
     """
-    # Simple system prompt - no overthinking
-    system_prompt = (
-        "You are a Python expert. Write ONLY executable Python code. "
-        "No markdown formatting, no explanations, no comments. "
-        "Just pure Python code that can be run directly. "
-        "If you need libraries, assume they are installed."
-    )
+    if stream:
+        return _generate_stream(user_prompt, use_cache, model)
 
     # Start timing
     start_time = time.time()
 
+    model, reason = _route(user_prompt, model)
+    cache_key, hit = _cached_generation(user_prompt, model, reason, use_cache, start_time)
+    if hit:
+        return hit
+
     # Call OpenAI
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+    response = client.chat.completions.create(model=model, messages=_messages(user_prompt), **GENERATION_PARAMS)
+
+    # Note: Galileo auto-instruments OpenAI when galileo_context.init() is called
+    # No manual logging needed - traces are automatically captured!
+
+    return _finish(response, model, reason, start_time, cache_key)
+
+async def generate_code_async(user_prompt: str, use_cache: bool = True,
+                              model: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Awaitable generate_code (same routing, cache and result) on the shared AsyncOpenAI client.
+    """
+    start_time = time.time()
+
+    model, reason = _route(user_prompt, model)
+    cache_key, hit = _cached_generation(user_prompt, model, reason, use_cache, start_time)
+    if hit:
+        return hit
+
+    response = await llm_client.get_async_client().chat.completions.create(
+        model=model, messages=_messages(user_prompt), **GENERATION_PARAMS
     )
+    return _finish(response, model, reason, start_time, cache_key)
 
-    # Calculate latency
-    latency_ms = (time.time() - start_time) * 1000
+def generate_candidates(user_prompt: str, n: int = None, model: Optional[str] = None) -> Tuple[List[str], Dict]:
+    """
+    Generate several alternative programs in one request (the API's `n`).
 
-    code = response.choices[0].message.content
+    The prompt is billed once; output tokens scale with n. Meant to be raced
+    with executor.execute_first_success so a failing first draft costs no
+    fix round trip. Not cached - the point is getting different answers.
 
-    # Strip markdown if LLM added it despite instructions
-    if "```python" in code:
-        code = code.split("```python")[1].split("```")[0].strip()
-    elif "```" in code:
-        code = code.split("```")[1].split("```")[0].strip()
+    Args:
+        user_prompt: What the user wants the code to do
+        n: Number of candidates (default config.GENERATION_CANDIDATES)
+        model: Use this model instead of the one the router picks
+
+    Returns:
+        Tuple of (distinct candidates: list, metrics: dict) - metrics as in
+        generate_code, for all candidates together, plus candidates (count)
+    """
+    n = max(1, n or config.GENERATION_CANDIDATES)
+    start_time = time.time()
+    model, reason = _route(user_prompt, model)
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=_messages(user_prompt),
+        n=n,
+        **GENERATION_PARAMS
+    )
+    latency_ms = (time.time() - start_time) * 1000
+
+    # Identical candidates would just race themselves
+    candidates = list(dict.fromkeys(strip_fences(choice.message.content) for choice in response.choices))
 
-    # Extract performance metrics
     usage = response.usage
-    metrics = {
-        "model": "gpt-4o",
-        "prompt_tokens": usage.prompt_tokens,
-        "completion_tokens": usage.completion_tokens,
-        "total_tokens": usage.total_tokens,
-        "latency_ms": round(latency_ms, 2),
-        # GPT-4o pricing: $2.50 per 1M input tokens, $10.00 per 1M output tokens
-        "estimated_cost": round(
-            (usage.prompt_tokens / 1_000_000 * 2.50) +
-            (usage.completion_tokens / 1_000_000 * 10.00),
-            4
+    metrics = _usage_metrics(model, reason, usage.prompt_tokens, usage.completion_tokens,
+                             latency_ms, latency_ms, latency_ms)
+    metrics["candidates"] = len(candidates)
+    print(f"[generator] ✓ Generated {len(candidates)} distinct candidate(s) of {n}")
+    return candidates, metrics
+
+def _generate_stream(user_prompt: str, use_cache: bool, model: Optional[str]) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming generate_code.
+
+    Yields:
+        ("token", text) with fence-stripped code as it arrives, then
+        ("result", (generated_code, metrics)). metrics additionally holds
+        streamed=True and the pre-flight verdict (preflight_ms, and
+        preflight_issue = error_type or None) - pre-flight and backend
+        warm-up start as soon as the stream closes (executor.prepare_run)
+    """
+    start_time = time.time()
+
+    model, reason = _route(user_prompt, model)
+    cache_key, hit = _cached_generation(user_prompt, model, reason, use_cache, start_time)
+    if hit:
+        code, metrics = hit
+        yield "token", code
+    else:
+        response = client.chat.completions.create(
+            model=model,
+            messages=_messages(user_prompt),
+            stream=True,
+            stream_options={"include_usage": True},
+            **GENERATION_PARAMS
         )
-    }
 
-    # Note: Galileo auto-instruments OpenAI when galileo_context.init() is called
-    # No manual logging needed - traces are automatically captured!
+        stripper = FenceStripper()
+        raw: List[str] = []
+        first_token_at = None
+        chunks = 0
+        usage = None
+        for chunk in response:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.time()
+            chunks += 1
+            raw.append(delta)
+            visible = stripper.feed(delta)
+            if visible:
+                yield "token", visible
+        visible = stripper.close()
+        if visible:
+            yield "token", visible
 
-    return code, metrics
+        finished_at = time.time()
+        first_token_at = first_token_at or finished_at
+        code = strip_fences("".join(raw))
+        # Each content chunk is one token when the API doesn't report usage
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else chunks
+        metrics = _usage_metrics(model, reason, prompt_tokens, completion_tokens, (finished_at - start_time) * 1000,
+                                 (first_token_at - start_time) * 1000, (finished_at - first_token_at) * 1000)
+        _store(cache_key, code, metrics)
+
+    # Stream closed - check the code and warm a sandbox while the caller renders it
+    preflight_started = time.time()
+    problem = executor.prepare_run(code)
+    metrics["streamed"] = True
+    metrics["preflight_ms"] = round((time.time() - preflight_started) * 1000, 2)
+    metrics["preflight_issue"] = problem[0] if problem else None
+    yield "result", (code, metrics)
@@ -0,0 +1,462 @@
+"""
+Kernel - A resident fork-server that runs wrappers without re-importing
+
+Every run used to start a fresh interpreter, so a script importing pandas
+paid seconds of import time on every execution. The kernel is a long-lived
+Python process (one per pooled sandbox, one for the local backend) that
+pre-imports config.KERNEL_PRELOAD and then, per job, forks a copy-on-write
+child that runs the wrapper and exits - nothing a job does survives into the
+next one, and the child starts with everything already imported.
+
+Jobs reach the kernel over a Unix socket:
+    request:  one JSON line {"source", "cwd", "timeout", "limits", "env"}
+    response: "<child pid>\\n", the child's raw stdout+stderr, then
+              EXIT_MARKER + "<exit status>\\n" once the child has been reaped
+
+In a sandbox the wrapper is replaced by client_program(), a small script
+that forwards the wrapper to the kernel and relays its output - or runs it
+in-process when no kernel is listening, so a missing kernel only costs the
+speed-up. Locally the backend talks to the socket directly.
+
+SIMPLICITY: the kernel parent never runs user code and never blocks: it
+forks on accept, the child reads the request, and SIGCHLD (via a wake-up
+pipe) tells the parent when to send the exit status.
+"""
+
+import atexit
+import codecs
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Kernel files in a sandbox - outside the job dir, so a scrub doesn't remove them
+SANDBOX_KERNEL_DIR = "/tmp/codephoenix-kernel"
+SANDBOX_SOCKET = f"{SANDBOX_KERNEL_DIR}/kernel.sock"
+
+# Precedes the exit status at the end of a response (NUL never appears in text output)
+EXIT_MARKER = "\0__KERNEL_EXIT__:"
+
+# The fork-server. argv: socket path, comma-separated modules to preload.
+# Prints READY once it is listening.
+KERNEL_SOURCE = r'''
+import builtins
+import io
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+EXIT_MARKER = %(marker)r
+socket_path, preload = sys.argv[1], [name for name in sys.argv[2].split(',') if name]
+
+loaded, missing = [], []
+for name in preload:
+    try:
+        __import__(name)
+        loaded.append(name)
+    except ModuleNotFoundError:
+        missing.append(name)
+    except Exception as e:
+        print(f"[kernel] Could not preload {name}: {type(e).__name__}: {e}")
+print(f"[kernel] Preloaded: {', '.join(loaded) or 'nothing'}"
+      + (f" (not installed: {', '.join(missing)})" if missing else ""))
+
+
+def vm_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def run_job(conn):
+    # Child: own session (so a timeout kills everything it spawns), stdio on the connection
+    os.setsid()
+    for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    request = json.loads(conn.makefile('rb').readline())
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(conn.fileno(), 1)
+    os.dup2(conn.fileno(), 2)
+    os.write(1, f"{os.getpid()}\n".encode())
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, 'r', closefd=False), encoding='utf-8')
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, 'w', closefd=False), encoding='utf-8', write_through=True)
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, 'w', closefd=False), encoding='utf-8',
+                                  errors='backslashreplace', write_through=True)
+
+    limits = request.get('limits')
+    if limits and resource is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['cpu_seconds'], limits['cpu_seconds'] + 1))
+        # The budget is on top of what the kernel already has mapped
+        memory = vm_bytes() + limits['memory_bytes']
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits['file_size_bytes'], limits['file_size_bytes']))
+    if request.get('timeout'):
+        signal.signal(signal.SIGALRM, lambda *_: os.killpg(0, signal.SIGKILL))
+        signal.alarm(int(request['timeout']) + 1)
+
+    os.environ.update(request.get('env') or {})
+    os.chdir(request['cwd'])
+    sys.argv = ['wrapper.py']
+    code = 0
+    try:
+        exec(compile(request['source'], 'wrapper.py', 'exec'), {'__name__': '__main__', '__builtins__': builtins})
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    os._exit(code)
+
+
+if os.path.exists(socket_path):
+    os.unlink(socket_path)
+listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+listener.bind(socket_path)
+listener.listen(64)
+
+wake_r, wake_w = os.pipe()
+os.set_blocking(wake_r, False)
+os.set_blocking(wake_w, False)
+signal.set_wakeup_fd(wake_w)
+signal.signal(signal.SIGCHLD, lambda *_: None)
+
+selector = selectors.DefaultSelector()
+selector.register(listener, selectors.EVENT_READ)
+selector.register(wake_r, selectors.EVENT_READ)
+jobs = {}
+print('READY', flush=True)
+
+while True:
+    for key, _ in selector.select():
+        if key.fileobj is listener:
+            conn, _ = listener.accept()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                selector.close()
+                os.close(wake_r)
+                os.close(wake_w)
+                try:
+                    run_job(conn)
+                finally:
+                    os._exit(1)
+            jobs[pid] = conn
+            continue
+
+        try:
+            os.read(wake_r, 4096)
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            conn = jobs.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.sendall(f"{EXIT_MARKER}{os.waitstatus_to_exitcode(status)}\n".encode())
+                except OSError:
+                    pass
+                conn.close()
+'''
+
+# Replaces the wrapper in a sandbox: forwards it to the kernel and relays the
+# output live, or runs it right here if no kernel is listening
+CLIENT_TEMPLATE = r'''
+import json
+import os
+import socket
+import sys
+
+_SOURCE = %(source)r
+_MARKER = %(marker)r.encode()
+
+try:
+    _conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    _conn.connect(%(socket)r)
+except OSError:
+    _conn = None
+
+if _conn is None:
+    exec(compile(_SOURCE, 'wrapper.py', 'exec'), {'__name__': '__main__'})
+else:
+    _conn.sendall(json.dumps({'source': _SOURCE, 'cwd': %(cwd)r, 'timeout': %(timeout)d}).encode() + b'\n')
+    _out = sys.stdout.buffer
+    _buffer = b''
+    _pid = None
+    while True:
+        _chunk = _conn.recv(65536)
+        if not _chunk:
+            break
+        _buffer += _chunk
+        if _pid is None:
+            if b'\n' not in _buffer:
+                continue
+            _pid, _buffer = _buffer.split(b'\n', 1)
+        # Hold back enough to never relay part of the exit marker
+        _keep = len(_MARKER) + 16
+        if len(_buffer) > _keep:
+            _out.write(_buffer[:-_keep])
+            _out.flush()
+            _buffer = _buffer[-_keep:]
+    _at = _buffer.rfind(_MARKER)
+    if _at < 0:
+        _out.write(_buffer + b'\nKernel job ended without reporting an exit status\n')
+        _out.flush()
+        sys.exit(1)
+    _out.write(_buffer[:_at])
+    _out.flush()
+    _code = int(_buffer[_at + len(_MARKER):].strip() or 1)
+    if _code < 0:
+        # Mirror a process killed by that signal
+        os.kill(os.getpid(), -_code)
+    sys.exit(_code)
+'''
+
+
+def kernel_program() -> str:
+    """Source of the fork-server (run as: python3 -u kernel.py <socket> <preload,...>)."""
+    return KERNEL_SOURCE % {"marker": EXIT_MARKER}
+
+
+def client_program(wrapper: str, cwd: str, timeout: int, socket_path: str = SANDBOX_SOCKET) -> str:
+    """
+    Wrap a rendered wrapper so it runs in the sandbox's kernel.
+
+    Args:
+        wrapper: Wrapper source (as returned by build_wrapper & co.)
+        cwd: Job directory the child should run in
+        timeout: Wall-clock limit; the child kills its process group after it
+        socket_path: Kernel socket inside the sandbox
+
+    Returns:
+        Python source to run instead of the wrapper (same output, same exit code)
+    """
+    return CLIENT_TEMPLATE % {
+        "source": wrapper, "marker": EXIT_MARKER, "socket": socket_path, "cwd": cwd, "timeout": timeout,
+    }
+
+
+def start_in_sandbox(sandbox, preload: List[str]):
+    """
+    Upload and launch the kernel in a sandbox (returns at once; it starts
+    accepting jobs when its preloads are imported).
+    """
+    from daytona import SessionExecuteRequest
+
+    sandbox.process.exec(f"mkdir -p {SANDBOX_KERNEL_DIR}", timeout=30)
+    sandbox.fs.upload_file(kernel_program().encode("utf-8"), f"{SANDBOX_KERNEL_DIR}/kernel.py")
+    session_id = "codephoenix-kernel"
+    sandbox.process.create_session(session_id)
+    sandbox.process.execute_session_command(session_id, SessionExecuteRequest(
+        command=(f"python3 -u {SANDBOX_KERNEL_DIR}/kernel.py {SANDBOX_SOCKET} {','.join(preload) or ','} "
+                 f"> {SANDBOX_KERNEL_DIR}/kernel.log 2>&1"),
+        run_async=True,
+    ))
+
+
+class KernelJob:
+    """
+    One job running in a kernel: iterate it for output text as it arrives,
+    then read exit_code (negative = killed by that signal).
+    """
+
+    kind = "kernel"
+
+    def __init__(self, conn: socket.socket, timeout: float):
+        self._conn = conn
+        self._timeout = timeout
+        self._deadline = time.time() + timeout
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+
+    def __iter__(self) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        marker = EXIT_MARKER.encode()
+        keep = len(marker) + 16
+        buffer = b""
+        finished = False
+        try:
+            while True:
+                chunk = self._recv()
+                if not chunk:
+                    finished = True
+                    break
+                buffer += chunk
+                if self.pid is None:
+                    if b"\n" not in buffer:
+                        continue
+                    pid, buffer = buffer.split(b"\n", 1)
+                    self.pid = int(pid)
+                if len(buffer) > keep:
+                    text = decoder.decode(buffer[:-keep])
+                    buffer = buffer[-keep:]
+                    if text:
+                        yield text
+        finally:
+            if not finished:
+                # Timed out, or the consumer stopped early - don't leave the script running
+                self.kill()
+            self._conn.close()
+
+        at = buffer.rfind(marker)
+        if at < 0:
+            self.exit_code = 1
+            yield decoder.decode(buffer, final=True) + "\nKernel job ended without reporting an exit status\n"
+            return
+        self.exit_code = int(buffer[at + len(marker):].strip() or 1)
+        tail = decoder.decode(buffer[:at], final=True)
+        if tail:
+            yield tail
+
+    def _recv(self) -> bytes:
+        remaining = self._deadline - time.time()
+        if remaining <= 0:
+            raise TimeoutError(f"Script exceeded wall-clock limit of {self._timeout}s")
+        self._conn.settimeout(remaining)
+        try:
+            return self._conn.recv(65536)
+        except socket.timeout:
+            raise TimeoutError(f"Script exceeded wall-clock limit of {self._timeout}s")
+
+    def kill(self):
+        """Kill the job and anything it spawned."""
+        if self.pid is None:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class LocalKernel:
+    """
+    A kernel process on this machine for the local backend.
+
+    Args:
+        preload: Modules to import before forking jobs
+        env: Environment the kernel (and so every job) runs with
+    """
+
+    def __init__(self, preload: List[str], env: Dict[str, str]):
+        self.preload = preload
+        self.env = env
+        self._dir = tempfile.mkdtemp(prefix="codephoenix_kernel_")
+        self.socket_path = os.path.join(self._dir, "kernel.sock")
+        self._proc: Optional[subprocess.Popen] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Launch the kernel in the background; ready turns True once it is listening."""
+        self._proc = subprocess.Popen(
+            [sys.executable, "-I", "-u", "-", self.socket_path, ",".join(self.preload) or ","],
+            cwd=self._dir,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=True,
+        )
+        self._proc.stdin.write(kernel_program())
+        self._proc.stdin.close()
+        threading.Thread(target=self._watch, name="local-kernel", daemon=True).start()
+
+    def submit(self, source: str, cwd: str, timeout: float, limits: Optional[Dict[str, int]] = None,
+               env: Optional[Dict[str, str]] = None) -> KernelJob:
+        """
+        Fork a child to run a wrapper.
+
+        Args:
+            source: Wrapper source
+            cwd: Job directory
+            timeout: Wall-clock limit; iterating the job raises TimeoutError after it
+            limits: {"cpu_seconds", "memory_bytes", "file_size_bytes"} rlimits for the child
+            env: Extra environment variables for the child
+        """
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.socket_path)
+        request = {"source": source, "cwd": cwd, "timeout": timeout, "limits": limits, "env": env}
+        conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        return KernelJob(conn, timeout)
+
+    def stop(self):
+        if self._proc is not None and self._proc.poll() is None:
+            try:
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self._proc.kill()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def _watch(self):
+        """Wait for READY, then keep draining (and echoing) the kernel's own log."""
+        for line in self._proc.stdout:
+            line = line.rstrip("\n")
+            if line == "READY":
+                self._ready.set()
+                print("[kernel] ✓ Local kernel ready")
+            elif line:
+                print(line)
+        self._ready.clear()
+
+
+_local_kernel: Optional[LocalKernel] = None
+_local_lock = threading.Lock()
+
+
+def get_local_kernel(preload: List[str], env: Dict[str, str]) -> LocalKernel:
+    """
+    Return the process-wide local kernel, (re)starting it if it isn't running.
+
+    Returns immediately - check .ready before submitting jobs.
+    """
+    global _local_kernel
+    with _local_lock:
+        kernel = _local_kernel
+        if kernel is None or (kernel._proc is not None and kernel._proc.poll() is not None):
+            if kernel is not None:
+                print("[kernel] Local kernel exited, restarting")
+                kernel.stop()
+            kernel = LocalKernel(preload, env)
+            kernel.start()
+            if _local_kernel is None:
+                atexit.register(lambda: _local_kernel and _local_kernel.stop())
+            _local_kernel = kernel
+        return kernel
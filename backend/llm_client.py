@@ -0,0 +1,83 @@
+"""
+LLM Client - One shared OpenAI client (sync and async) per process
+
+generator.py and fixer.py used to build their own OpenAI client at import,
+each with its own connection pool, and neither could be awaited. This module
+hands both the same clients: a sync OpenAI for the blocking calls and an
+AsyncOpenAI for the awaitable ones, on an httpx pool sized by config, with
+long keep-alive and HTTP/2 so concurrent generate and fix calls multiplex
+over a few warm connections instead of opening new ones. HTTP/2 needs h2
+(httpx[http2] in requirements.txt); without it a warning is printed and
+httpx falls back to HTTP/1.1.
+
+SIMPLICITY: same registry shape as daytona_client.py. The async client is
+kept per event loop - httpx async connections can't be shared across loops
+(every asyncio.run() is a new one).
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from backend import config
+
+try:
+    import h2  # noqa: F401 - httpx's optional HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+    if config.LLM_HTTP2:
+        print("[llm_client] ⚠️ h2 is not installed - LLM calls fall back to HTTP/1.1 "
+              "(pip install 'httpx[http2]')")
+
+_client: Optional[OpenAI] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _http_options() -> dict:
+    """Connection limits / protocol for both the sync and the async pool."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+        ),
+        "http2": config.LLM_HTTP2 and HTTP2_AVAILABLE,
+    }
+
+
+def get_client() -> OpenAI:
+    """Return the shared sync OpenAI client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = OpenAI(api_key=config.OPENAI_API_KEY, http_client=DefaultHttpxClient(**_http_options()))
+        return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client for the running event loop.
+
+    Must be called from a coroutine; every call on the same loop gets the
+    same client (and connection pool).
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(api_key=config.OPENAI_API_KEY,
+                                 http_client=DefaultAsyncHttpxClient(**_http_options()))
+            _async_clients[loop] = client
+        return client
+
+
+def reset_clients():
+    """Forget the shared clients (e.g. after rotating credentials)."""
+    global _client
+    with _lock:
+        _client = None
+        _async_clients.clear()
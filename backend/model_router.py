@@ -0,0 +1,191 @@
+"""
+Model Router - Picks the cheapest model likely to get a job right
+
+Generation and fixing used to go to gpt-4o every time, even for "print hello
+world". The router sends easy jobs to a fast, cheap tier and keeps the
+strong tier for:
+
+1. Hard-looking jobs - long prompts/code or keywords that usually need more
+   reasoning (algorithms, concurrency, parsing, ...)
+2. Escalations - the fast tier's code failed execution, or a fix is being
+   retried
+3. Past outcomes - the fast tier failed this exact prompt recently, or its
+   recent success rate for the task is too low
+
+Callers report execution outcomes with record_outcome; every call's latency
+and cost is tallied per tier (see tier_stats).
+
+SIMPLICITY: keyword + length heuristics and in-memory counters, no learned
+classifier. Turn it off with ROUTER_ENABLED=false to always use the strong tier.
+"""
+
+import hashlib
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from backend import config
+from backend.cache import MemoryCache
+
+# USD per 1M tokens (input, output)
+PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Prompt words that usually mean a job the fast tier gets wrong
+HARD_KEYWORDS = (
+    "algorithm", "optimiz", "concurren", "thread", "async", "parallel", "regex", "regular expression",
+    "parse", "parser", "dynamic programming", "recurs", "graph", "matrix", "machine learning", "neural",
+    "scrape", "database", "sql", "encrypt", "compiler", "interpreter", "simulat",
+)
+
+_lock = threading.Lock()
+# Recent fast-tier outcomes per task ("generate" / "fix"): True = the code ran successfully
+_fast_outcomes: Dict[str, Deque[bool]] = {}
+# Jobs the fast tier already failed - retried on the strong tier straight away
+_fast_failures = MemoryCache(max_entries=1024, ttl=24 * 3600)
+_tiers: Dict[str, Dict[str, float]] = {}
+
+
+def tier_of(model: str) -> str:
+    """Tier name of a model: "fast" or "strong"."""
+    return "fast" if model == config.ROUTER_FAST_MODEL and model != config.ROUTER_STRONG_MODEL else "strong"
+
+
+def route(task: str, text: str, attempt: int = 1, failed_model: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Pick the model for a generate or fix call.
+
+    Args:
+        task: "generate" or "fix"
+        text: The prompt (generate) or the broken code + error (fix)
+        attempt: 1 for the first try, 2+ for a repeated fix
+        failed_model: Model whose code is being fixed, if known
+
+    Returns:
+        Tuple of (model, reason)
+    """
+    strong = config.ROUTER_STRONG_MODEL
+    if not config.ROUTER_ENABLED:
+        return strong, "router disabled"
+    if failed_model and tier_of(failed_model) == "fast":
+        return strong, "escalated: fast tier's code failed"
+    if attempt > 1:
+        return strong, f"escalated: fix attempt {attempt}"
+    if _fast_failures.get(_job_key(task, text)):
+        return strong, "fast tier failed this job before"
+
+    hard = difficulty_reason(task, text)
+    if hard:
+        return strong, hard
+
+    with _lock:
+        outcomes = list(_fast_outcomes.get(task, ()))
+    if len(outcomes) >= config.ROUTER_MIN_SAMPLES:
+        rate = sum(outcomes) / len(outcomes)
+        if rate < config.ROUTER_MIN_FAST_SUCCESS:
+            return strong, f"fast tier success rate {rate:.0%}"
+    return config.ROUTER_FAST_MODEL, "easy"
+
+
+def difficulty_reason(task: str, text: str) -> Optional[str]:
+    """Why a job looks too hard for the fast tier, or None if it looks easy."""
+    if task == "fix":
+        lines = text.count("\n") + 1
+        if lines > config.ROUTER_HARD_FIX_LINES:
+            return f"long code ({lines} lines)"
+    else:
+        words = len(text.split())
+        if words > config.ROUTER_HARD_PROMPT_WORDS:
+            return f"long prompt ({words} words)"
+    lowered = text.lower()
+    for keyword in HARD_KEYWORDS:
+        if keyword in lowered:
+            return f"keyword '{keyword}'"
+    return None
+
+
+def record_outcome(task: str, text: str, model: str, success: bool):
+    """
+    Report whether a model's code ran successfully (same task/text as route).
+
+    Fast-tier failures send that job straight to the strong tier next time
+    and count against the fast tier's success rate.
+    """
+    tier = tier_of(model)
+    with _lock:
+        stats = _tiers.setdefault(tier, _empty_stats())
+        stats["executed"] += 1
+        stats["succeeded"] += int(success)
+        if tier == "fast":
+            _fast_outcomes.setdefault(task, deque(maxlen=config.ROUTER_WINDOW)).append(success)
+    if tier == "fast" and not success:
+        _fast_failures.set(_job_key(task, text), True)
+
+
+def call_metrics(model: str, reason: str, prompt_tokens: int, completion_tokens: int, latency_ms: float) -> Dict:
+    """
+    Tally one LLM call against its tier and return its metrics: model, tier,
+    route_reason, tokens, latency_ms, estimated_cost and tiers (tier_stats).
+    """
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    record_call(model, latency_ms, cost)
+    return {
+        "model": model,
+        "tier": tier_of(model),
+        "route_reason": reason,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "latency_ms": round(latency_ms, 2),
+        "estimated_cost": round(cost, 6),
+        "tiers": tier_stats(),
+    }
+
+
+def record_call(model: str, latency_ms: float, cost: float):
+    """Tally one LLM call's latency and cost against its tier."""
+    with _lock:
+        stats = _tiers.setdefault(tier_of(model), _empty_stats())
+        stats["calls"] += 1
+        stats["latency_ms"] += latency_ms
+        stats["cost"] += cost
+
+
+def tier_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-tier totals since the process started: calls, avg_latency_ms,
+    cost (USD) and success_rate of the executed code (None until reported).
+    """
+    with _lock:
+        summary = {}
+        for tier, stats in _tiers.items():
+            summary[tier] = {
+                "calls": int(stats["calls"]),
+                "avg_latency_ms": round(stats["latency_ms"] / stats["calls"], 2) if stats["calls"] else None,
+                "cost": round(stats["cost"], 6),
+                "success_rate": round(stats["succeeded"] / stats["executed"], 3) if stats["executed"] else None,
+            }
+        return summary
+
+
+def reset_stats():
+    """Forget past outcomes and per-tier totals."""
+    with _lock:
+        _fast_outcomes.clear()
+        _tiers.clear()
+    _fast_failures.clear()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of a call (unknown models are priced like the strong tier's gpt-4o)."""
+    input_price, output_price = PRICING.get(model, PRICING["gpt-4o"])
+    return prompt_tokens / 1_000_000 * input_price + completion_tokens / 1_000_000 * output_price
+
+
+def _job_key(task: str, text: str) -> str:
+    return hashlib.sha256(f"{task}\0{' '.join(text.split())}".encode("utf-8")).hexdigest()
+
+
+def _empty_stats() -> Dict[str, float]:
+    return {"calls": 0, "latency_ms": 0.0, "cost": 0.0, "executed": 0, "succeeded": 0}
@@ -0,0 +1,220 @@
+"""
+Patcher - Apply a model's edits to the broken code instead of a full rewrite
+
+In diff mode (config.FIX_MODE) the fixer asks for the change only, so a one
+line fix costs a few dozen completion tokens instead of the whole program.
+Two answer formats are understood:
+
+1. SEARCH/REPLACE blocks (what the prompt asks for):
+
+       <<<<<<< SEARCH
+           return total / len(values)
+       =======
+           return total / len(values) if values else 0
+       >>>>>>> REPLACE
+
+2. Unified diff hunks (`@@ -12,3 +12,4 @@` with ' ', '-' and '+' lines) -
+   each hunk becomes a search (context + removed) / replace (context + added)
+   pair, with the hunk's line number as a hint
+
+Each search text is located, as whole lines, with increasing tolerance: the
+exact lines, then the same lines ignoring indentation/trailing whitespace
+(the replacement is re-indented to match), then the most similar window of lines
+(difflib ratio >= FIX_PATCH_MIN_SIMILARITY). Anything that can't be placed,
+or fits several places with no line hint to choose between them, raises
+ValueError and the fixer falls back to a full rewrite.
+
+SIMPLICITY: edits are applied one after another to the running result;
+no three-way merge, no conflict resolution.
+"""
+
+import difflib
+import re
+from typing import Dict, List, Optional, Tuple
+from backend import config
+
+SEARCH_MARK = re.compile(r"^\s*<{5,}\s*SEARCH\s*$")
+DIVIDER_MARK = re.compile(r"^\s*={5,}\s*$")
+REPLACE_MARK = re.compile(r"^\s*>{5,}\s*REPLACE\s*$")
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+# Edit = (search text, replacement text, 1-based line hint or None)
+Edit = Tuple[str, str, Optional[int]]
+
+
+def is_patch(text: str) -> bool:
+    """True if the answer contains SEARCH/REPLACE blocks or diff hunks."""
+    return any(SEARCH_MARK.match(line) or HUNK_RE.match(line) for line in text.splitlines())
+
+
+def parse_patch(text: str) -> List[Edit]:
+    """
+    Edits from a model answer (SEARCH/REPLACE blocks, else unified diff hunks).
+
+    Returns:
+        List of (search, replace, line_hint) - empty if the answer has neither
+    """
+    lines = _strip_fences(text).splitlines()
+    edits = _parse_search_replace(lines)
+    return edits if edits else _parse_unified_diff(lines)
+
+
+def apply_patch(code: str, patch: str) -> Tuple[str, Dict]:
+    """
+    Apply a model's edits to code.
+
+    Args:
+        code: The code the model was shown
+        patch: The model's answer
+
+    Returns:
+        Tuple of (patched code, stats) - stats has edits, exact, fuzzy
+
+    Raises:
+        ValueError: No edits in the answer, or an edit that can't be placed
+    """
+    edits = parse_patch(patch)
+    if not edits:
+        raise ValueError("answer contains no SEARCH/REPLACE blocks or diff hunks")
+    stats = {"edits": len(edits), "exact": 0, "fuzzy": 0}
+    for number, (search, replace, hint) in enumerate(edits, 1):
+        code, how = apply_edit(code, search, replace, hint)
+        if how is None:
+            raise ValueError(f"edit {number} of {len(edits)} doesn't match exactly one place in the code: "
+                             f"{search.strip()[:80]!r}")
+        stats["exact" if how == "exact" else "fuzzy"] += 1
+    return code, stats
+
+
+def apply_edit(code: str, search: str, replace: str, hint: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """
+    Replace one occurrence of search in code, as tolerantly as needed.
+
+    Search text is matched as whole lines only (a `x = 1` search never edits
+    `max = 10`). If it fits in several places, the one nearest the line hint
+    is taken - without a hint the edit is ambiguous and isn't applied.
+
+    Returns:
+        Tuple of (new code, how it matched: "exact", "whitespace", "similar"
+        or None if it couldn't be placed or is ambiguous - code unchanged)
+    """
+    if not search.strip():
+        # Pure insertion: at the hint, or at the end
+        lines = code.splitlines()
+        at = min(max(hint - 1, 0), len(lines)) if hint else len(lines)
+        lines[at:at] = replace.splitlines()
+        return _join(lines, code), "exact"
+
+    lines = code.splitlines()
+    wanted = search.splitlines()
+    while wanted and not wanted[0].strip():
+        wanted.pop(0)
+    while wanted and not wanted[-1].strip():
+        wanted.pop()
+    size = len(wanted)
+    if not size or size > len(lines):
+        return code, None
+    windows = range(len(lines) - size + 1)
+
+    # 1. The same whole lines, character for character
+    matches = [i for i in windows if lines[i:i + size] == wanted]
+    how = "exact"
+    if not matches:
+        # 2. Same lines, indentation and trailing whitespace ignored
+        matches = [i for i in windows
+                   if all(lines[i + k].strip() == wanted[k].strip() for k in range(size))]
+        how = "whitespace"
+    if not matches:
+        # 3. Most similar window of the same length
+        target = "\n".join(line.strip() for line in wanted)
+        best, best_ratio = None, config.FIX_PATCH_MIN_SIMILARITY
+        for i in windows:
+            ratio = difflib.SequenceMatcher(
+                None, target, "\n".join(line.strip() for line in lines[i:i + size])).ratio()
+            if ratio > best_ratio or (best is not None and ratio == best_ratio and hint
+                                      and abs(i + 1 - hint) < abs(best + 1 - hint)):
+                best, best_ratio = i, ratio
+        if best is None:
+            return code, None
+        matches, how = [best], "similar"
+    if len(matches) > 1 and not hint:
+        # Several places fit and nothing says which one was meant
+        return code, None
+
+    at = min(matches, key=lambda i: abs(i + 1 - hint)) if hint else matches[0]
+    replacement = _reindent(replace.splitlines(), wanted[0], lines[at])
+    lines[at:at + size] = replacement
+    return _join(lines, code), how
+
+
+def _reindent(replacement: List[str], searched_first: str, found_first: str) -> List[str]:
+    """Shift the replacement by the indentation difference between the search and the code."""
+    shift = _indent(found_first) - _indent(searched_first)
+    if shift > 0:
+        return [" " * shift + line if line.strip() else line for line in replacement]
+    if shift < 0:
+        return [line[min(-shift, _indent(line)):] for line in replacement]
+    return replacement
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _join(lines: List[str], original: str) -> str:
+    return "\n".join(lines) + ("\n" if original.endswith("\n") else "")
+
+
+def _strip_fences(text: str) -> str:
+    return "\n".join(line for line in text.splitlines() if not line.strip().startswith("```"))
+
+
+def _parse_search_replace(lines: List[str]) -> List[Edit]:
+    edits: List[Edit] = []
+    search: Optional[List[str]] = None
+    replace: Optional[List[str]] = None
+    for line in lines:
+        if SEARCH_MARK.match(line):
+            search, replace = [], None
+        elif search is not None and replace is None and DIVIDER_MARK.match(line):
+            replace = []
+        elif replace is not None and REPLACE_MARK.match(line):
+            edits.append(("\n".join(search), "\n".join(replace), None))
+            search, replace = None, None
+        elif replace is not None:
+            replace.append(line)
+        elif search is not None:
+            search.append(line)
+    return edits
+
+
+def _parse_unified_diff(lines: List[str]) -> List[Edit]:
+    edits: List[Edit] = []
+    hunk: Optional[Tuple[int, List[str], List[str]]] = None
+    for line in lines:
+        match = HUNK_RE.match(line)
+        if match:
+            if hunk:
+                edits.append(_hunk_edit(hunk))
+            hunk = (int(match.group(1)), [], [])
+        elif hunk is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line.startswith("-"):
+            hunk[1].append(line[1:])
+        elif line.startswith("+"):
+            hunk[2].append(line[1:])
+        else:
+            # Context line (models often drop the leading space of blank lines)
+            hunk[1].append(line[1:] if line.startswith(" ") else line)
+            hunk[2].append(line[1:] if line.startswith(" ") else line)
+    if hunk:
+        edits.append(_hunk_edit(hunk))
+    return edits
+
+
+def _hunk_edit(hunk: Tuple[int, List[str], List[str]]) -> Edit:
+    start, old, new = hunk
+    if not any(line.strip() for line in old):
+        # Insertion without context - new lines go before line `start + 1`
+        return "", "\n".join(new), start + 1
+    return "\n".join(old), "\n".join(new), start
@@ -0,0 +1,221 @@
+"""
+Pre-flight - Catch doomed scripts locally before they reach a sandbox
+
+A SyntaxError, a misspelled name or a forgotten import costs a full sandbox
+create/run/delete before the traceback comes back, and define-only code that
+never prints is guaranteed to come back as a silent failure. These checks
+run in-process in a few milliseconds:
+
+1. compile() - syntax errors, exactly as the interpreter reports them
+2. Scope analysis - names that are loaded but never bound anywhere, with an
+   import suggestion when the name is a module ("math", "np", ...)
+3. Output heuristic - define-only code: the module level only imports,
+   defines functions/classes and binds literals, so nothing ever runs
+
+SIMPLICITY: deliberately conservative. A name counts as defined if it is
+bound anywhere in the file, and anything dynamic (star imports, exec,
+globals(), unknown libraries) switches the affected check off. A false
+alarm would send working code to the fixer; a miss only costs the sandbox
+run we'd have paid anyway.
+"""
+
+import ast
+import builtins
+import sys
+import traceback
+from typing import List, Optional, Set, Tuple
+
+# Implicit module-level names (and __class__ inside methods)
+MODULE_NAMES = {"__name__", "__file__", "__doc__", "__spec__", "__loader__", "__package__",
+                "__builtins__", "__annotations__", "__dict__", "__class__", "__path__", "__cached__"}
+
+# Using any of these can bind names the AST doesn't show - skip the scope check
+DYNAMIC_NAMES = {"globals", "locals", "vars", "exec", "eval", "__import__", "setattr", "builtins"}
+
+# Conventional aliases -> the import statement they need
+IMPORT_ALIASES = {
+    "np": "import numpy as np",
+    "pd": "import pandas as pd",
+    "plt": "import matplotlib.pyplot as plt",
+    "sns": "import seaborn as sns",
+    "tf": "import tensorflow as tf",
+    "sp": "import scipy as sp",
+    "nx": "import networkx as nx",
+    "dt": "import datetime as dt",
+}
+
+# Stdlib modules that print nothing when imported
+SILENT_MODULES = {
+    "abc", "array", "bisect", "collections", "copy", "dataclasses", "datetime", "decimal",
+    "enum", "fractions", "functools", "hashlib", "heapq", "itertools", "json", "math",
+    "numbers", "operator", "random", "re", "statistics", "string", "textwrap", "typing",
+}
+
+_BUILTIN_NAMES = set(dir(builtins))
+
+
+def check_code(code: str, filename: str = "generated_script.py") -> Optional[Tuple[str, str]]:
+    """
+    Run every pre-flight check on a script.
+
+    Args:
+        code: Python code about to be executed
+        filename: Name the script will run under (used in the error message)
+
+    Returns:
+        None if nothing is known to be wrong, otherwise (error_type, error)
+        where error_type is "crash" (would raise) or "silent_failure" (would
+        print nothing) - the same classification execute_code uses
+    """
+    try:
+        tree = ast.parse(code, filename)
+        compile(tree, filename, "exec")
+    except (SyntaxError, ValueError) as e:
+        return "crash", _report(traceback.format_exception_only(type(e), e))
+
+    undefined = undefined_names(tree)
+    if undefined:
+        name, lineno = undefined[0]
+        hint = import_hint(name)
+        message = f"NameError: name '{name}' is not defined"
+        if hint:
+            message += f". Did you forget to import it? ({hint})"
+        lines = [f'  File "{filename}", line {lineno}\n', f"    {_source_line(code, lineno)}\n", f"{message}\n"]
+        others = sorted({other for other, _ in undefined[1:] if other != name})
+        if others:
+            lines.append(f"Also undefined: {', '.join(others)}\n")
+        return "crash", _report(lines)
+
+    if not produces_output(tree):
+        return "silent_failure", (
+            "Pre-flight check: this code produces no output - it only defines functions, "
+            "classes or values and never calls anything or prints, so running it would "
+            "print nothing (silent_failure). It was not executed.\n"
+        )
+    return None
+
+
+def undefined_names(tree: ast.AST) -> List[Tuple[str, int]]:
+    """
+    Names the code loads that are neither builtins nor bound anywhere in it.
+
+    Returns:
+        (name, line) per use, in source order; empty if the code binds names
+        dynamically (star import, exec, globals(), ...)
+    """
+    bound: Set[str] = set()
+    skipped: Set[int] = set()
+    loads = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            return []
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                if node.id in DYNAMIC_NAMES:
+                    return []
+                loads.append(node)
+            else:
+                bound.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif isinstance(getattr(node, "name", None), str) and not isinstance(node, ast.alias):
+            # except ... as name, match captures, type parameters
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+
+        # Annotations aren't always evaluated (from __future__ import annotations)
+        for annotation in (getattr(node, "annotation", None), getattr(node, "returns", None)):
+            if annotation is not None:
+                skipped.update(id(child) for child in ast.walk(annotation))
+
+    missing = [(node.id, node.lineno) for node in loads
+               if id(node) not in skipped and node.id not in bound
+               and node.id not in _BUILTIN_NAMES and node.id not in MODULE_NAMES]
+    return sorted(missing, key=lambda item: item[1])
+
+
+def import_hint(name: str) -> Optional[str]:
+    """Import statement that would define an undefined name, if it looks like a module."""
+    if name in IMPORT_ALIASES:
+        return IMPORT_ALIASES[name]
+    if name in sys.stdlib_module_names and not name.startswith("_"):
+        return f"import {name}"
+    return None
+
+
+def produces_output(tree: ast.Module) -> bool:
+    """
+    Whether the code might write anything when run (including a traceback).
+
+    False only for define-only code: the module level imports silent stdlib
+    modules, defines functions/classes and binds literals, but never calls
+    anything - so no function body ever runs and nothing can print or raise.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] not in SILENT_MODULES for alias in node.names):
+                return True
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or "").split(".")[0] not in SILENT_MODULES:
+                return True
+    return not _define_only(tree.body)
+
+
+def _define_only(body: List[ast.stmt]) -> bool:
+    """Whether statements only import, define and bind literals (what runs at definition time)."""
+    for stmt in body:
+        if isinstance(stmt, (ast.Import, ast.ImportFrom, ast.Pass)):
+            continue
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            defaults = stmt.args.defaults + [d for d in stmt.args.kw_defaults if d is not None]
+            if all(_plain(node) for node in defaults + stmt.decorator_list):
+                continue
+        elif isinstance(stmt, ast.ClassDef):
+            if (all(_plain(node) for node in stmt.bases + stmt.decorator_list)
+                    and not stmt.keywords and _define_only(stmt.body)):
+                continue
+        elif isinstance(stmt, ast.Expr):
+            if _plain(stmt.value):
+                continue
+        elif isinstance(stmt, ast.Assign):
+            if _plain(stmt.value) and all(isinstance(target, ast.Name) for target in stmt.targets):
+                continue
+        elif isinstance(stmt, ast.AnnAssign):
+            if isinstance(stmt.target, ast.Name) and (stmt.value is None or _plain(stmt.value)):
+                continue
+        elif (isinstance(stmt, ast.If) and isinstance(stmt.test, ast.Compare)
+              and isinstance(stmt.test.left, ast.Name) and stmt.test.left.id == "__name__"):
+            # if __name__ == "__main__": with an equally inert body
+            if _define_only(stmt.body) and _define_only(stmt.orelse):
+                continue
+        return False
+    return True
+
+
+def _plain(node: ast.expr) -> bool:
+    """Literals, names and dotted names - expressions that run no code."""
+    if isinstance(node, (ast.Constant, ast.Name, ast.Lambda)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _plain(node.value)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return all(_plain(element) for element in node.elts)
+    if isinstance(node, ast.Dict):
+        return all(_plain(part) for part in node.keys + node.values if part is not None)
+    return False
+
+
+def _report(lines: List[str]) -> str:
+    return "Pre-flight check failed - the code was not executed:\n" + "".join(lines)
+
+
+def _source_line(code: str, lineno: int) -> str:
+    lines = code.splitlines()
+    return lines[lineno - 1].strip() if 0 < lineno <= len(lines) else ""
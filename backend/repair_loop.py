@@ -0,0 +1,182 @@
+"""
+Repair Loop - Fix and re-run until the code works or a budget runs out
+
+One fix + one re-run gives up on anything the first fix doesn't solve, and
+an unbounded loop can burn calls on a fixer that keeps handing back the same
+code. repair() alternates fix_code and execution with three budgets
+(iterations, LLM tokens, wall-clock seconds) and:
+
+- carries the history of failed attempts into each fix prompt
+- hashes every candidate's normalized AST (code_analysis.code_hash): a fix
+  that is identical to the code it fixed, or to any earlier version, is not
+  executed again - the fixer is told to try something else, and two repeats
+  in a row stop the loop
+- escalates like a retry: attempt N > 1 and the failing model go to the
+  router, so later attempts move to the strong tier
+- reports each re-execution to fix_cache (so fixes that work are reused) or,
+  for a rule fix, to rule_fixer's per-rule success rate
+- reports per-iteration fix/execute timing, tokens and cost for tuning the budgets
+
+SIMPLICITY: sequential - one candidate per iteration, and budgets are checked
+between steps (a running fix or execution is never interrupted).
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from backend import config, fix_cache, model_router, rule_fixer
+from backend.code_analysis import code_hash
+from backend.executor import execute_code
+from backend.fixer import fix_code, fix_job
+
+# (success, output, error, error_type) - what execute_code returns
+Result = Tuple[bool, str, str, str]
+
+
+def repair(code: str, error: str, error_type: str, output: str = "",
+           failed_model: Optional[str] = None,
+           execute: Optional[Callable[[str, str], Result]] = None,
+           fix: Optional[Callable] = None,
+           max_iterations: Optional[int] = None, max_tokens: Optional[int] = None,
+           max_seconds: Optional[float] = None,
+           on_fix: Optional[Callable[[int, str, Dict], None]] = None,
+           on_result: Optional[Callable[[Dict, Result], None]] = None,
+           filename_prefix: str = "fixed") -> Dict:
+    """
+    Repair failing code with repeated fix + re-execution.
+
+    Args:
+        code: The code that failed
+        error: Its error text (stderr / exception summary)
+        error_type: Its error type ("crash", "silent_failure", "handled_exception")
+        output: Its stdout
+        failed_model: Model that wrote the code (a fast-tier failure escalates)
+        execute: Runs (code, filename) -> (success, output, error, error_type);
+            default executor.execute_code
+        fix: Same signature as fixer.fix_code (default)
+        max_iterations / max_tokens / max_seconds: Budgets (default config.REPAIR_*)
+        on_fix: Called with (iteration, fixed code, fix metrics) before the fix runs
+        on_result: Called with (iteration record, result) after each iteration
+        filename_prefix: Fixed versions are saved as <prefix>_<iteration>.py
+
+    Returns:
+        Dict with success, code, output, error, error_type of the last version
+        run, stop_reason ("success", "max_iterations", "token_budget",
+        "time_budget", "oscillation"), iterations (one record each: iteration,
+        model, tier, fix_mode, cached, tokens, cost, fix_ms, execute_ms, outcome,
+        repeat_of), total_tokens, total_cost, elapsed_ms
+    """
+    execute = execute or (lambda source, filename: execute_code(source, filename))
+    fix = fix or fix_code
+    max_iterations = config.REPAIR_MAX_ITERATIONS if max_iterations is None else max_iterations
+    max_tokens = config.REPAIR_MAX_TOKENS if max_tokens is None else max_tokens
+    max_seconds = config.REPAIR_MAX_SECONDS if max_seconds is None else max_seconds
+
+    started = time.time()
+    # Every version seen so far: normalized hash -> iteration (0 = the original)
+    seen = {code_hash(code): 0}
+    history: List[str] = []
+    iterations: List[Dict] = []
+    current = {"success": False, "code": code, "output": output, "error": error, "error_type": error_type}
+    tokens = 0
+    cost = 0.0
+    repeats = 0
+    stop_reason = "max_iterations"
+
+    for iteration in range(1, max_iterations + 1):
+        if tokens >= max_tokens:
+            stop_reason = "token_budget"
+            break
+        if time.time() - started >= max_seconds:
+            stop_reason = "time_budget"
+            break
+
+        error_detail = current["error"] or (f"Code produced no output. Type: {current['error_type']}. "
+                                            f"Output: {current['output']}")
+        fix_started = time.time()
+        fixed_code, metrics = fix(current["code"], _with_history(error_detail, history), attempt=iteration,
+                                  failed_model=failed_model, return_metrics=True)
+        record = {
+            "iteration": iteration,
+            "model": metrics["model"],
+            "tier": metrics["tier"],
+            "fix_mode": metrics.get("fix_mode", "full"),
+            "cached": metrics.get("cached", False),
+            "tokens": metrics["total_tokens"],
+            "cost": metrics["estimated_cost"],
+            "fix_ms": round((time.time() - fix_started) * 1000, 2),
+            "execute_ms": 0.0,
+            "outcome": None,
+            "repeat_of": None,
+        }
+        tokens += metrics["total_tokens"]
+        cost += metrics["estimated_cost"]
+        failed_model = metrics["model"]
+        iterations.append(record)
+        if on_fix:
+            on_fix(iteration, fixed_code, metrics)
+
+        digest = code_hash(fixed_code)
+        if digest in seen:
+            # No-op or oscillation - the result is already known, don't run it
+            record["outcome"] = "repeat"
+            record["repeat_of"] = seen[digest]
+            repeats += 1
+            version = "the code it was fixing" if digest == code_hash(current["code"]) else (
+                "the original code" if seen[digest] == 0 else f"the code from attempt {seen[digest]}")
+            history.append(f"Attempt {iteration} returned {version} again - it still fails, "
+                           f"try a different approach")
+            print(f"[repair_loop] Attempt {iteration} repeats {version} - skipped execution")
+            if on_result:
+                on_result(record, (False, current["output"], current["error"], current["error_type"]))
+            if repeats >= 2:
+                stop_reason = "oscillation"
+                break
+            continue
+        repeats = 0
+        seen[digest] = iteration
+
+        execute_started = time.time()
+        result = execute(fixed_code, f"{filename_prefix}_{iteration}.py")
+        record["execute_ms"] = round((time.time() - execute_started) * 1000, 2)
+        success, run_output, run_error, run_type = result
+        record["outcome"] = run_type
+        if metrics.get("fix_fingerprint"):
+            # A fix that passed is reused for the same failure next time (see fix_cache.py)
+            fix_cache.record_result(metrics["fix_fingerprint"], fixed_code, run_type == "success", metrics["model"])
+        if metrics.get("rule"):
+            rule_fixer.record_result(metrics["rule"], run_type == "success")
+        elif not metrics.get("cached"):
+            model_router.record_outcome("fix", fix_job(current["code"], error_detail), metrics["model"],
+                                        run_type == "success")
+        current = {"success": run_type == "success", "code": fixed_code, "output": run_output,
+                   "error": run_error, "error_type": run_type}
+        print(f"[repair_loop] Attempt {iteration} ({metrics['model']}): {run_type} "
+              f"in {record['fix_ms'] + record['execute_ms']:.0f} ms")
+        if on_result:
+            on_result(record, result)
+        if current["success"]:
+            stop_reason = "success"
+            break
+        history.append(f"Attempt {iteration} -> {run_type.replace('_', ' ')}: {_last_line(run_error or run_output)}")
+
+    current.update({
+        "stop_reason": stop_reason,
+        "iterations": iterations,
+        "total_tokens": tokens,
+        "total_cost": round(cost, 6),
+        "elapsed_ms": round((time.time() - started) * 1000, 2),
+    })
+    return current
+
+
+def _with_history(error: str, history: List[str]) -> str:
+    """Error text for the fixer, preceded by what earlier attempts ran into."""
+    if not history:
+        return error
+    return "Earlier fix attempts that did not work:\n" + "\n".join(f"- {line}" for line in history) + \
+        f"\n\nCurrent error:\n{error}"
+
+
+def _last_line(text: str) -> str:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[-1][:200] if lines else "(nothing printed)"
@@ -0,0 +1,226 @@
+"""
+Rule Fixer - Deterministic AST fixes for mechanical failures, before any LLM call
+
+Much of what reaches fix_code needs no model: a forgotten stdlib import, a
+script that computes a result and never prints it, functions that are
+defined but never called. Each rule recognizes one failure class from the
+error text, rewrites the code locally in about a millisecond, and only
+counts as a fix if the result passes preflight.check_code:
+
+- missing_import: NameError for names that are modules ("math", "np", ...)
+  -> the import statements are added after the leading imports
+- print_result: silent failure whose last statement is a bare expression or
+  an assignment -> the value is printed
+- call_functions: silent failure from define-only code -> a __main__ block
+  calls main(), or else every public function that takes no arguments,
+  printing what it returns
+
+No rule applies -> fix_code goes on to the fix cache and the LLM.
+rule_stats() has the per-rule hit rate, latency, and how often a rule's fix
+passed re-execution (reported by the repair loop via record_result).
+
+SIMPLICITY: a few conservative rules; anything ambiguous (functions that need
+arguments, names that aren't modules) is left to the LLM.
+"""
+
+import ast
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from backend import preflight
+
+_lock = threading.Lock()
+# rule name -> attempts, hits, latency_ms, executed, succeeded
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def is_silent_failure(error: str) -> bool:
+    """Same test the fixer's prompt uses for "ran but printed nothing"."""
+    return "no output" in error.lower() or "silent_failure" in error.lower()
+
+
+def missing_import(code: str, error: str) -> Optional[str]:
+    """Add imports for undefined names that are modules; None unless all of them are."""
+    if "NameError" not in error:
+        return None
+    tree = ast.parse(code)
+    names = sorted({name for name, _ in preflight.undefined_names(tree)})
+    hints = [preflight.import_hint(name) for name in names]
+    if not names or None in hints:
+        return None
+    lines = code.splitlines()
+    at = _after_imports(tree)
+    lines[at:at] = sorted(set(hints))
+    return "\n".join(lines) + "\n"
+
+
+def print_result(code: str, error: str) -> Optional[str]:
+    """Print the value of the last statement if it is a bare expression or an assignment."""
+    if not is_silent_failure(error):
+        return None
+    tree = ast.parse(code)
+    if not tree.body:
+        return None
+    last = tree.body[-1]
+    lines = code.splitlines()
+    if isinstance(last, ast.Expr) and not isinstance(last.value, ast.Constant) and not _calls_print(last.value):
+        if isinstance(last.value, ast.Call) and _returns_nothing(tree, last.value):
+            return None
+        indent = lines[last.lineno - 1][:last.col_offset]
+        lines[last.lineno - 1:last.end_lineno] = [f"{indent}print({ast.get_source_segment(code, last.value)})"]
+        return "\n".join(lines) + "\n"
+    if isinstance(last, (ast.Assign, ast.AnnAssign)):
+        targets = last.targets if isinstance(last, ast.Assign) else [last.target]
+        if isinstance(last.value, ast.Call) and _returns_nothing(tree, last.value):
+            return None
+        if len(targets) == 1 and isinstance(targets[0], ast.Name):
+            return "\n".join(lines + [f"print({targets[0].id})"]) + "\n"
+    return None
+
+
+def call_functions(code: str, error: str) -> Optional[str]:
+    """Call main(), or every argument-free public function, from a __main__ block."""
+    if not is_silent_failure(error):
+        return None
+    tree = ast.parse(code)
+    if preflight.produces_output(tree):
+        return None
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    main = [node for node in functions if node.name == "main"]
+    candidates = main or [node for node in functions if not node.name.startswith("_") and _no_arguments(node)]
+    if not candidates or any(isinstance(node, ast.AsyncFunctionDef) for node in candidates) \
+            or not _no_arguments(candidates[0]):
+        return None
+    calls = []
+    for node in candidates:
+        if _has_return_value(node):
+            calls.append(f"    print({node.name}())")
+        else:
+            calls.append(f"    {node.name}()")
+    return code.rstrip("\n") + '\n\n\nif __name__ == "__main__":\n' + "\n".join(calls) + "\n"
+
+
+# Tried in order; the first valid fix wins
+RULES: List[Tuple[str, Callable[[str, str], Optional[str]]]] = [
+    ("missing_import", missing_import),
+    ("print_result", print_result),
+    ("call_functions", call_functions),
+]
+
+
+def fix(code: str, error: str) -> Optional[Tuple[str, str, float]]:
+    """
+    Try every rule on a failure.
+
+    Args:
+        code: The code that failed
+        error: Its error text
+
+    Returns:
+        (fixed code, rule name, latency_ms) from the first rule whose result
+        passes pre-flight, or None if no rule applies
+    """
+    try:
+        ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    for name, rule in RULES:
+        started = time.perf_counter()
+        fixed = rule(code, error)
+        if fixed is not None and preflight.check_code(fixed) is not None:
+            fixed = None
+        latency_ms = (time.perf_counter() - started) * 1000
+        _record(name, fixed is not None, latency_ms)
+        if fixed is not None:
+            print(f"[rule_fixer] ✓ Fixed by rule '{name}' in {latency_ms:.2f} ms, skipped LLM call")
+            return fixed, name, latency_ms
+    return None
+
+
+def record_result(rule: str, success: bool):
+    """Record whether a rule's fix passed re-execution."""
+    with _lock:
+        stats = _stats.setdefault(rule, _empty_stats())
+        stats["executed"] += 1
+        stats["succeeded"] += int(success)
+
+
+def rule_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-rule totals since the process started: attempts, hits, hit_rate,
+    avg_latency_ms and success_rate of the executed fixes (None until reported).
+    """
+    with _lock:
+        summary = {}
+        for rule, stats in _stats.items():
+            summary[rule] = {
+                "attempts": int(stats["attempts"]),
+                "hits": int(stats["hits"]),
+                "hit_rate": round(stats["hits"] / stats["attempts"], 3) if stats["attempts"] else None,
+                "avg_latency_ms": round(stats["latency_ms"] / stats["attempts"], 3) if stats["attempts"] else None,
+                "success_rate": round(stats["succeeded"] / stats["executed"], 3) if stats["executed"] else None,
+            }
+        return summary
+
+
+def reset_stats():
+    """Forget the per-rule totals."""
+    with _lock:
+        _stats.clear()
+
+
+def _record(rule: str, hit: bool, latency_ms: float):
+    with _lock:
+        stats = _stats.setdefault(rule, _empty_stats())
+        stats["attempts"] += 1
+        stats["hits"] += int(hit)
+        stats["latency_ms"] += latency_ms
+
+
+def _empty_stats() -> Dict[str, float]:
+    return {"attempts": 0, "hits": 0, "latency_ms": 0.0, "executed": 0, "succeeded": 0}
+
+
+def _after_imports(tree: ast.Module) -> int:
+    """Line index just past the module docstring and leading imports."""
+    index = 0
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or (
+                isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)):
+            index = node.end_lineno
+        else:
+            break
+    return index
+
+
+def _calls_print(node: ast.expr) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print"
+
+
+def _no_arguments(node: ast.FunctionDef) -> bool:
+    """Callable with no arguments (every parameter has a default)."""
+    args = node.args
+    required = len(args.posonlyargs) + len(args.args) - len(args.defaults)
+    return required == 0 and all(default is not None for default in args.kw_defaults)
+
+
+def _has_return_value(node: ast.FunctionDef) -> bool:
+    """Whether the function has a `return <value>` (nested functions excluded)."""
+    stack = list(node.body)
+    while stack:
+        child = stack.pop()
+        if isinstance(child, ast.Return) and child.value is not None:
+            return True
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            stack.extend(ast.iter_child_nodes(child))
+    return False
+
+
+def _returns_nothing(tree: ast.Module, call: ast.Call) -> bool:
+    """A call to a function defined in this module that never returns a value."""
+    if not isinstance(call.func, ast.Name):
+        return False
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == call.func.id:
+            return not _has_return_value(node)
+    return False
@@ -0,0 +1,295 @@
+"""
+Sandbox Lifecycle - Off-the-critical-path teardown and leak reaping
+
+Deleting a sandbox takes a round trip and sometimes fails. Instead of doing
+it inline (the user waits) or once (a failure leaks the sandbox), retired
+sandboxes are handed to this manager:
+
+- A worker thread deletes them in the background and retries failures with
+  exponential backoff
+- Every sandbox we create carries LABELS, so anything we lost track of can
+  be found again
+- A reaper thread periodically deletes labelled sandboxes that have been
+  inactive for longer than config.SANDBOX_ORPHAN_TTL and whose owner is gone:
+  this process's own (deletes that ran out of retries) and those of a
+  process on this host that no longer runs (crashes). Another host's
+  sandboxes can't be checked, so they are only reaped once inactive for
+  config.SANDBOX_FOREIGN_ORPHAN_TTL - several app processes can share one
+  Daytona account without reaping each other's idle pools.
+
+SIMPLICITY: one queue, one worker, one reaper; retries are timers that put
+the sandbox back on the queue. Owners are told apart by labels (instance id,
+host name, pid), so a reused pid keeps a crashed process's sandboxes until
+the foreign TTL.
+"""
+
+import atexit
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Set
+from backend import config
+
+# Identifies this process's sandboxes among the ones the label selects
+INSTANCE_ID = uuid.uuid4().hex[:12]
+HOSTNAME = socket.gethostname()
+
+# Labels put on every sandbox we create (the reaper selects on "app")
+LABELS = {"app": "codephoenix"}
+INSTANCE_LABEL = "codephoenix-instance"
+HOST_LABEL = "codephoenix-host"
+PID_LABEL = "codephoenix-pid"
+
+
+def sandbox_labels() -> Dict[str, str]:
+    """Labels for a sandbox created by this process."""
+    return dict(LABELS, **{INSTANCE_LABEL: INSTANCE_ID, HOST_LABEL: HOSTNAME, PID_LABEL: str(os.getpid())})
+
+
+def owner_gone(labels: Dict[str, str]) -> bool:
+    """
+    Whether the process that created a sandbox is known to be gone (or is us).
+
+    Only processes on this host can be checked; anything else is presumed alive.
+    """
+    if labels.get(INSTANCE_LABEL) == INSTANCE_ID:
+        return True
+    if labels.get(HOST_LABEL) != HOSTNAME or not labels.get(PID_LABEL, "").isdigit():
+        return False
+    try:
+        os.kill(int(labels[PID_LABEL]), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        # Exists but belongs to another user
+        return False
+    return False
+
+
+class LifecycleManager:
+    """
+    Background deleter with retries plus a periodic orphan reaper.
+
+    Args:
+        client_factory: Callable returning a Daytona client (used by the reaper)
+        max_attempts: Delete attempts per sandbox before leaving it to the reaper
+        retry_delay: Seconds before the first retry (doubles on every attempt)
+        orphan_ttl: Labelled sandboxes of a gone owner inactive for longer are reaped (0 = no reaper)
+        reap_interval: Seconds between reaper passes
+        foreign_ttl: Sandboxes whose owner can't be checked are reaped after this much inactivity
+    """
+
+    def __init__(self, client_factory: Callable, max_attempts: int = 4, retry_delay: float = 2,
+                 orphan_ttl: float = 3600, reap_interval: float = 600, foreign_ttl: float = 24 * 3600):
+        self._client_factory = client_factory
+        self._client = None
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.orphan_ttl = orphan_ttl
+        self.reap_interval = reap_interval
+        self.foreign_ttl = max(foreign_ttl, orphan_ttl)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._live: Set[str] = set()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+        self.deleted = 0
+        self.failed = 0
+        self.reaped = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the delete worker and (if enabled) the reaper (idempotent)."""
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._delete_loop, name="sandbox-teardown", daemon=True))
+        if self.orphan_ttl > 0:
+            self._threads.append(threading.Thread(target=self._reap_loop, name="sandbox-reaper", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def track(self, sandbox):
+        """Mark a sandbox as in use by this process (the reaper leaves it alone)."""
+        with self._cond:
+            self._live.add(sandbox.id)
+
+    def retire(self, sandbox):
+        """Queue a sandbox for deletion and return immediately."""
+        with self._cond:
+            self._pending += 1
+        self._queue.put((sandbox, 1))
+
+    def drain(self, timeout: float = 30) -> bool:
+        """
+        Wait until every retired sandbox is deleted or gave up (e.g. at exit).
+
+        Returns:
+            True if nothing is left pending
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._pending > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    print(f"[lifecycle] Warning: {self._pending} sandbox(es) still pending deletion")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"pending": self._pending, "live": len(self._live), "deleted": self.deleted,
+                    "failed": self.failed, "reaped": self.reaped}
+
+    def reap_orphans(self) -> int:
+        """
+        Delete labelled sandboxes inactive for longer than orphan_ttl that
+        this process isn't using and whose owner is gone (see owner_gone), or
+        inactive for longer than foreign_ttl whoever owns them.
+
+        Returns:
+            Number of sandboxes queued for deletion
+        """
+        from daytona import ListSandboxesQuery
+
+        now = datetime.now(timezone.utc)
+        query = ListSandboxesQuery(labels=dict(LABELS), last_activity_before=now - timedelta(seconds=self.orphan_ttl))
+        foreign_cutoff = now - timedelta(seconds=self.foreign_ttl)
+        count = 0
+        for sandbox in self.client.list(query):
+            if not owner_gone(getattr(sandbox, "labels", None) or {}):
+                last_activity = _parse_time(getattr(sandbox, "last_activity_at", None))
+                if last_activity is None or last_activity > foreign_cutoff:
+                    continue
+            with self._cond:
+                if sandbox.id in self._live:
+                    continue
+                # Claim it so the next pass doesn't queue it again
+                self._live.add(sandbox.id)
+                self.reaped += 1
+            print(f"[lifecycle] Reaping orphaned sandbox {sandbox.id}")
+            self.retire(sandbox)
+            count += 1
+        return count
+
+    def stop(self):
+        """Stop the background threads (pending deletes are abandoned)."""
+        self._stopped.set()
+        self._queue.put(None)
+
+    # ------------------------------------------------------------------
+    # Background threads
+    # ------------------------------------------------------------------
+
+    def _delete_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            sandbox, attempt = item
+            try:
+                sandbox.delete()
+            except Exception as e:
+                if not _already_gone(e):
+                    self._retry_later(sandbox, attempt, e)
+                    continue
+            self._finish(sandbox, deleted=True)
+
+    def _retry_later(self, sandbox, attempt: int, error: Exception):
+        if attempt >= self.max_attempts or self._stopped.is_set():
+            print(f"[lifecycle] Warning: Giving up deleting sandbox {sandbox.id} after {attempt} attempts "
+                  f"({error}) - the reaper will retry")
+            self._finish(sandbox, deleted=False)
+            return
+        delay = self.retry_delay * 2 ** (attempt - 1)
+        print(f"[lifecycle] Delete of sandbox {sandbox.id} failed ({error}), retrying in {delay:.0f}s")
+        timer = threading.Timer(delay, self._queue.put, args=((sandbox, attempt + 1),))
+        timer.daemon = True
+        timer.start()
+
+    def _finish(self, sandbox, deleted: bool):
+        with self._cond:
+            self._pending -= 1
+            if deleted:
+                self.deleted += 1
+            else:
+                self.failed += 1
+            # Untracked either way: a failed delete becomes fair game for the reaper
+            self._live.discard(sandbox.id)
+            self._cond.notify_all()
+        if deleted:
+            print(f"[lifecycle] ✓ Sandbox {sandbox.id} deleted")
+
+    def _reap_loop(self):
+        # First pass right away - it catches whatever a crashed previous run leaked
+        while True:
+            try:
+                self.reap_orphans()
+            except Exception as e:
+                print(f"[lifecycle] Warning: Orphan reaper pass failed: {e}")
+            if self._stopped.wait(self.reap_interval):
+                return
+
+
+def _parse_time(value) -> Optional[datetime]:
+    """A timestamp from the API (ISO string or datetime), None if there is none."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _already_gone(error: Exception) -> bool:
+    try:
+        from daytona import DaytonaNotFoundError
+    except ImportError:
+        return False
+    return isinstance(error, DaytonaNotFoundError)
+
+
+_manager: Optional[LifecycleManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager(client_factory: Callable) -> LifecycleManager:
+    """
+    Return the process-wide lifecycle manager, creating and starting it on first use.
+
+    Args:
+        client_factory: Callable returning a Daytona client
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            manager = LifecycleManager(
+                client_factory,
+                max_attempts=config.SANDBOX_DELETE_ATTEMPTS,
+                retry_delay=config.SANDBOX_DELETE_RETRY_DELAY,
+                orphan_ttl=config.SANDBOX_ORPHAN_TTL,
+                reap_interval=config.SANDBOX_REAP_INTERVAL,
+                foreign_ttl=config.SANDBOX_FOREIGN_ORPHAN_TTL,
+            )
+            manager.start()
+            # Registered before any pool's shutdown, so it runs after them
+            # (atexit is LIFO) and waits for their deletes to go through
+            atexit.register(manager.drain)
+            _manager = manager
+        return _manager
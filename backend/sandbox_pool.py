@@ -0,0 +1,394 @@
+"""
+Sandbox Pool - Keeps pre-warmed Daytona sandboxes ready for execute_code
+
+Sandbox cold-start is most of the end-to-end latency, and a self-healing run
+pays it twice. Instead of create -> run -> delete per call, execute_code leases
+a ready sandbox from this pool, and the pool scrubs it and takes it back.
+
+SIMPLICITY: One lock + condition variable, one background thread that keeps
+the pool topped up to min_size and health-checks idle sandboxes. Scripts with
+third-party imports get a separate pool per dependency snapshot (see
+dependencies.py); those start empty and keep sandboxes warm once used. Scrubs
+run on a background thread and deletes go through sandbox_lifecycle.py, so
+neither blocks a caller. Each sandbox runs
+a kernel (kernel.py) so jobs skip interpreter startup and heavy imports.
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from backend import config, kernel, sandbox_lifecycle
+
+# Every job runs inside this directory so a scrub is a single rm -rf
+WORK_DIR = "/tmp/codephoenix"
+
+# Between leases: kill whatever a job left running (every job and its children
+# start in WORK_DIR), then wipe the directory. A process that changed to another
+# directory, or files written outside WORK_DIR, survive the scrub - pooled
+# sandboxes isolate jobs from the host, not fully from the job before them
+# (SANDBOX_POOL_MAX_USES bounds how many share a sandbox). KILL_COMMAND alone
+# also stops a job that is still running once its result is no longer wanted.
+KILL_COMMAND = (
+    "for proc in /proc/[0-9]*; do case \"$(readlink $proc/cwd 2>/dev/null)\" in "
+    f"{WORK_DIR}|{WORK_DIR}/*) kill -9 ${{proc#/proc/}} 2>/dev/null;; esac; done"
+)
+SCRUB_COMMAND = f"{KILL_COMMAND}; rm -rf {WORK_DIR} && mkdir -p {WORK_DIR}"
+
+
+class PooledSandbox:
+    """A sandbox plus the bookkeeping the pool needs to decide when to retire it."""
+
+    def __init__(self, sandbox):
+        self.sandbox = sandbox
+        self.created_at = time.time()
+        self.last_checked = self.created_at
+        self.uses = 0
+
+
+class SandboxPool:
+    """
+    Pool of pre-warmed sandboxes with reuse limits and background replenishment.
+
+    Args:
+        client_factory: Callable returning a Daytona client (called once)
+        image: Image every pooled sandbox is created from
+        snapshot: Snapshot to create sandboxes from instead of the image
+        min_size: Idle sandboxes the background thread keeps ready
+        max_size: Hard cap on this pool's sandboxes alive at once (idle + leased +
+            scrubbing + creating); each dependency-snapshot pool has its own
+        max_uses: Jobs a sandbox may run before it is retired
+        health_interval: Seconds between health checks of an idle sandbox
+        lifecycle: Deletes retired sandboxes in the background (None = delete inline)
+    """
+
+    def __init__(self, client_factory: Callable, image: str, min_size: int = 1,
+                 max_size: int = 4, max_uses: int = 20, health_interval: float = 30,
+                 snapshot: Optional[str] = None,
+                 lifecycle: Optional[sandbox_lifecycle.LifecycleManager] = None):
+        self._client_factory = client_factory
+        self._client = None
+        self.image = image
+        self.snapshot = snapshot
+        self.lifecycle = lifecycle
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_uses = max(1, max_uses)
+        self.health_interval = health_interval
+
+        self._idle: List[PooledSandbox] = []
+        self._leased = 0
+        self._creating = 0
+        # Released sandboxes being scrubbed before they go back to _idle
+        self._scrubbing = 0
+        # Creations headed for the idle list, and leases waiting on one of them
+        self._warming = 0
+        self._claims = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background replenisher (idempotent)."""
+        # Build the client eagerly so a missing API key surfaces to the caller
+        _ = self.client
+        if self._thread is None and self.min_size > 0:
+            self._thread = threading.Thread(target=self._replenish_loop, name="sandbox-pool", daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def lease(self, timeout: float = 150):
+        """
+        Lease a ready sandbox for one job.
+
+        The sandbox goes back to the pool when the block exits normally and is
+        retired if the block raised (it may still be running the failed job).
+        """
+        pooled = self._acquire(timeout)
+        healthy = False
+        try:
+            yield pooled.sandbox
+            healthy = True
+        finally:
+            self._release(pooled, healthy)
+
+    def warm(self):
+        """
+        Start creating a sandbox for a lease that's about to happen, unless
+        one is already idle or on its way. Returns immediately.
+        """
+        with self._cond:
+            if self._stopped or self._idle or self._warming or self._total() >= self.max_size:
+                return
+            self._creating += 1
+            self._warming += 1
+        threading.Thread(target=self._create_idle, name="sandbox-warm", daemon=True).start()
+
+    def stats(self) -> dict:
+        """Snapshot of pool occupancy (for logging / debugging)."""
+        with self._cond:
+            return {"idle": len(self._idle), "leased": self._leased, "scrubbing": self._scrubbing,
+                    "creating": self._creating}
+
+    def shutdown(self):
+        """Stop replenishing and delete every idle sandbox."""
+        with self._cond:
+            self._stopped = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+
+    # ------------------------------------------------------------------
+    # Lease / release
+    # ------------------------------------------------------------------
+
+    def _acquire(self, timeout: float) -> PooledSandbox:
+        deadline = time.time() + timeout
+        while True:
+            with self._cond:
+                while not self._idle:
+                    # A sandbox being scrubbed or warming up is ready sooner
+                    # than a cold start of our own - unless other leases claimed it
+                    coming = self._warming + self._scrubbing
+                    if coming <= self._claims and self._total() < self.max_size:
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No sandbox available within {timeout:.0f}s (pool max_size={self.max_size})")
+                    claim = int(coming > self._claims)
+                    self._claims += claim
+                    self._cond.wait(remaining)
+                    self._claims -= claim
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._leased += 1
+                else:
+                    pooled = None
+                    self._creating += 1
+
+            if pooled is None:
+                # Pool is empty but under max_size - pay the cold start ourselves
+                print("[pool] No warm sandbox available, creating one...")
+                try:
+                    pooled = self._create()
+                except BaseException:
+                    # Free the slot for leases waiting on capacity
+                    with self._cond:
+                        self._creating -= 1
+                        self._cond.notify_all()
+                    raise
+                with self._cond:
+                    self._creating -= 1
+                    self._leased += 1
+                return pooled
+
+            # Re-check sandboxes that have been sitting idle for a while
+            if time.time() - pooled.last_checked > self.health_interval and not self._is_healthy(pooled):
+                print("[pool] Idle sandbox failed health check, discarding")
+                with self._cond:
+                    self._leased -= 1
+                    self._cond.notify_all()
+                self._destroy(pooled)
+                continue
+
+            return pooled
+
+    def _release(self, pooled: PooledSandbox, healthy: bool):
+        pooled.uses += 1
+        reuse = healthy and not self._stopped and pooled.uses < self.max_uses
+
+        with self._cond:
+            self._leased -= 1
+            if reuse:
+                self._scrubbing += 1
+            self._cond.notify_all()
+
+        # The user already has their result - scrub or retire off the caller's thread
+        if reuse:
+            threading.Thread(target=self._scrub_and_return, args=(pooled,), name="sandbox-scrub",
+                             daemon=True).start()
+        elif self.lifecycle is not None:
+            self._destroy(pooled)  # Just queues the delete
+        else:
+            threading.Thread(target=self._destroy, args=(pooled,), daemon=True).start()
+
+    def _scrub_and_return(self, pooled: PooledSandbox):
+        """Scrub a released sandbox, then make it leasable again (or retire it if the scrub failed)."""
+        clean = self._scrub(pooled)
+        with self._cond:
+            self._scrubbing -= 1
+            keep = clean and not self._stopped
+            if keep:
+                self._idle.append(pooled)
+            self._cond.notify_all()
+        if not keep:
+            self._destroy(pooled)
+
+    def _total(self) -> int:
+        return len(self._idle) + self._leased + self._scrubbing + self._creating
+
+    # ------------------------------------------------------------------
+    # Sandbox lifecycle
+    # ------------------------------------------------------------------
+
+    def _create(self) -> PooledSandbox:
+        from daytona import CreateSandboxFromImageParams, CreateSandboxFromSnapshotParams
+
+        # Labelled so the lifecycle reaper can find it if we ever lose track of it
+        labels = sandbox_lifecycle.sandbox_labels()
+        if self.snapshot:
+            params = CreateSandboxFromSnapshotParams(snapshot=self.snapshot, labels=labels)
+        else:
+            params = CreateSandboxFromImageParams(image=self.image, labels=labels)
+        sandbox = self.client.create(params, timeout=150)
+        if self.lifecycle is not None:
+            self.lifecycle.track(sandbox)
+        sandbox.process.exec(f"mkdir -p {WORK_DIR}", timeout=30)
+        if config.KERNEL_ENABLED:
+            try:
+                kernel.start_in_sandbox(sandbox, config.KERNEL_PRELOAD)
+            except Exception as e:
+                # Jobs fall back to a fresh interpreter - slower, still correct
+                print(f"[pool] Warning: Failed to start kernel: {e}")
+        print("[pool] ✓ Sandbox created")
+        return PooledSandbox(sandbox)
+
+    def _scrub(self, pooled: PooledSandbox) -> bool:
+        """Kill the job's leftover processes and wipe its directory (see SCRUB_COMMAND)."""
+        try:
+            response = pooled.sandbox.process.exec(SCRUB_COMMAND, timeout=30)
+            pooled.last_checked = time.time()
+            return getattr(response, "exit_code", 1) == 0
+        except Exception as e:
+            print(f"[pool] Warning: Failed to scrub sandbox: {e}")
+            return False
+
+    def _is_healthy(self, pooled: PooledSandbox) -> bool:
+        try:
+            response = pooled.sandbox.process.exec("true", timeout=10)
+            pooled.last_checked = time.time()
+            return getattr(response, "exit_code", 1) == 0
+        except Exception:
+            return False
+
+    def _destroy(self, pooled: PooledSandbox):
+        if self.lifecycle is not None:
+            self.lifecycle.retire(pooled.sandbox)
+            return
+        try:
+            pooled.sandbox.delete()
+            print("[pool] ✓ Sandbox deleted")
+        except Exception as e:
+            print(f"[pool] Warning: Failed to delete sandbox: {e}")
+
+    # ------------------------------------------------------------------
+    # Background replenishment
+    # ------------------------------------------------------------------
+
+    def _replenish_loop(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                need = self.min_size - len(self._idle) - self._creating
+                need = min(need, self.max_size - self._total())
+                if need > 0:
+                    self._creating += 1
+                    self._warming += 1
+
+            if need > 0:
+                if not self._create_idle():
+                    time.sleep(5)
+                continue
+
+            self._check_idle()
+            with self._cond:
+                if not self._stopped:
+                    self._cond.wait(self.health_interval)
+
+    def _create_idle(self) -> bool:
+        """Create a sandbox into the idle list (the caller already counted it in _creating/_warming)."""
+        try:
+            pooled = self._create()
+        except Exception as e:
+            pooled = None
+            print(f"[pool] Warning: Failed to warm sandbox: {e}")
+        with self._cond:
+            # Counted as creating until it is in _idle, never in neither
+            self._creating -= 1
+            self._warming -= 1
+            if pooled is not None:
+                self._idle.append(pooled)
+            self._cond.notify_all()
+        return pooled is not None
+
+    def _check_idle(self):
+        """Health-check idle sandboxes that are due, dropping the dead ones."""
+        now = time.time()
+        with self._cond:
+            due = [p for p in self._idle if now - p.last_checked > self.health_interval]
+            for pooled in due:
+                self._idle.remove(pooled)
+                self._leased += 1
+
+        for pooled in due:
+            healthy = self._is_healthy(pooled)
+            with self._cond:
+                self._leased -= 1
+                if healthy and not self._stopped:
+                    self._idle.append(pooled)
+                self._cond.notify_all()
+            if not healthy:
+                print("[pool] Idle sandbox failed health check, discarding")
+                self._destroy(pooled)
+
+
+# One pool per environment: None is the base image, anything else a snapshot name
+_pools: Dict[Optional[str], SandboxPool] = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(client_factory: Callable, snapshot: Optional[str] = None) -> SandboxPool:
+    """
+    Return the process-wide sandbox pool for an environment, creating and
+    starting it on first use.
+
+    Every pool gets SANDBOX_POOL_MAX_SIZE, so the number of live sandboxes is
+    bounded by that times the number of environments in use, not by it alone.
+
+    Args:
+        client_factory: Callable returning a Daytona client
+        snapshot: Dependency snapshot the sandboxes must come from (None = base image)
+    """
+    with _pool_lock:
+        pool = _pools.get(snapshot)
+        if pool is None:
+            lifecycle = sandbox_lifecycle.get_manager(client_factory)
+            pool = SandboxPool(
+                client_factory,
+                image=config.SANDBOX_IMAGE,
+                # Only the base pool is pre-warmed; snapshot pools fill up as they're used
+                min_size=config.SANDBOX_POOL_MIN_SIZE if snapshot is None else 0,
+                max_size=config.SANDBOX_POOL_MAX_SIZE,
+                max_uses=config.SANDBOX_POOL_MAX_USES,
+                health_interval=config.SANDBOX_POOL_HEALTH_INTERVAL,
+                snapshot=snapshot,
+                lifecycle=lifecycle,
+            )
+            pool.start()
+            atexit.register(pool.shutdown)
+            _pools[snapshot] = pool
+        return pool
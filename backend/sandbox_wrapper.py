@@ -0,0 +1,755 @@
+"""
+Sandbox Wrapper - The Python wrapper every execution backend runs
+
+The wrapper exec()s script.py (embedded in the wrapper or uploaded) with stdout/stderr captured and
+prints a single __RESULT__ JSON blob at the end, including structured
+records of every exception the script raised (handled or not). Captured
+output is capped (first/last N characters per stream), so a script that
+prints in a loop can't blow up memory anywhere between the sandbox and the UI. Keeping it here (instead of
+inline in executor.py) lets the Daytona and local backends share it.
+"""
+
+import collections
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+from backend import config
+
+# Printed in place of the dropped middle of an over-long stream
+TRUNCATION_MARKER = "\n... [output truncated: {} characters omitted] ...\n"
+
+# Files (in the job dir) a spilling wrapper writes the full, uncapped streams to
+SPILL_FILES = {"stdout": "stdout.log", "stderr": "stderr.log"}
+
+# Shared by every wrapper: scripts small enough are embedded in the wrapper
+# itself (no upload round trip, no file written); larger ones are read from
+# the job directory as before.
+LOADER_SOURCE = """
+_SOURCES = %(sources)s
+
+def _load(path):
+    if path in _SOURCES:
+        return _SOURCES[path]
+    with open(path) as f:
+        return f.read()
+"""
+
+# Shared by every wrapper: records exceptions that pass through the user's
+# script (type, message, file/line, handled or not) so the executor can
+# classify the run from structured data instead of grepping the output.
+# The unhandled exception comes from its traceback; caught ones are recorded
+# through sys.monitoring (3.12+), which costs nothing on calls. Handlers that
+# do nothing at all (`except: pass`) are instrumented at compile time with a
+# call that marks the exception swallowed - on every version, and before 3.12
+# it's the fallback that still sees them (a settrace hook would slow every
+# call down). Only the script's own handlers are looked at, so an exception
+# raised in a function and swallowed by its caller is attributed correctly.
+TRACKER_SOURCE = """
+import ast
+import builtins
+
+_track_files = set()
+_track_records = {}
+_track_state = {'tool': None}
+_TRACK_IGNORED = (StopIteration, StopAsyncIteration, GeneratorExit, SystemExit)
+_TRACK_MAX = 50
+
+def _track_locate(tb, default):
+    # Innermost frame of the traceback that belongs to the user's script
+    location = default
+    while tb is not None:
+        filename = tb.tb_frame.f_code.co_filename
+        if filename in _track_files:
+            location = (filename, tb.tb_lineno)
+        tb = tb.tb_next
+    return location
+
+def _track_add(exc, location, handled, count=1, swallowed=False):
+    key = (type(exc).__name__, location[0], location[1], handled, swallowed)
+    record = _track_records.get(key)
+    if record is None:
+        if len(_track_records) >= _TRACK_MAX:
+            return
+        record = _track_records[key] = {
+            'type': key[0],
+            'message': str(exc)[:500],
+            'file': location[0],
+            'line': location[1],
+            'handled': handled,
+            'swallowed': swallowed,
+            'count': 0,
+        }
+    record['count'] += count
+    if record['count'] <= 0:
+        del _track_records[key]
+
+def _track_on_handled(code, offset, exc):
+    if code.co_filename in _track_files and not isinstance(exc, _TRACK_IGNORED):
+        _track_add(exc, _track_locate(exc.__traceback__, (code.co_filename, code.co_firstlineno)), True)
+
+def _track_swallowed():
+    # First statement of every do-nothing handler in the script (see _track_instrument)
+    exc = sys.exc_info()[1]
+    if exc is None or isinstance(exc, _TRACK_IGNORED):
+        return
+    caller = sys._getframe(1)
+    location = _track_locate(exc.__traceback__, (caller.f_code.co_filename, caller.f_lineno))
+    if _track_state['tool'] is not None:
+        # sys.monitoring already counted it as an ordinary handled exception
+        _track_add(exc, location, True, -1)
+    _track_add(exc, location, True, 1, True)
+
+def _track_does_nothing(body):
+    return all(isinstance(stmt, (ast.Pass, ast.Continue, ast.Break))
+               or (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant))
+               for stmt in body)
+
+def _track_instrument(source, filename):
+    # The script as an AST whose do-nothing handlers call _track_swallowed
+    # first (line numbers unchanged); the source itself if it doesn't parse,
+    # so compile() reports the SyntaxError as usual
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return source
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ExceptHandler) and _track_does_nothing(node.body):
+            call = ast.Expr(ast.Call(ast.Name('__codephoenix_swallowed__', ast.Load()), [], []))
+            node.body.insert(0, ast.fix_missing_locations(ast.copy_location(call, node.body[0])))
+    return tree
+
+def _track_start(filename):
+    _track_files.clear()
+    _track_files.add(filename)
+    _track_records.clear()
+    # Reachable from the script's handlers without touching its globals
+    builtins.__codephoenix_swallowed__ = _track_swallowed
+    monitoring = getattr(sys, 'monitoring', None)
+    if monitoring is not None:
+        for tool in range(6):
+            if monitoring.get_tool(tool) is None:
+                monitoring.use_tool_id(tool, 'codephoenix')
+                monitoring.register_callback(tool, monitoring.events.EXCEPTION_HANDLED, _track_on_handled)
+                monitoring.set_events(tool, monitoring.events.EXCEPTION_HANDLED)
+                _track_state['tool'] = tool
+                return
+
+def _track_stop(unhandled=None):
+    tool = _track_state['tool']
+    if tool is not None:
+        monitoring = sys.monitoring
+        monitoring.set_events(tool, 0)
+        monitoring.register_callback(tool, monitoring.events.EXCEPTION_HANDLED, None)
+        monitoring.free_tool_id(tool)
+        _track_state['tool'] = None
+
+    if unhandled is not None:
+        default = (next(iter(_track_files), '<script>'), 0)
+        _track_add(unhandled, _track_locate(unhandled.__traceback__, default), False)
+    return list(_track_records.values())
+"""
+
+# Shared by every wrapper: a capture stream that keeps the first `head` and
+# last `tail` characters written to it and only counts the middle, optionally
+# writing everything to a spill file for full retrieval.
+CAPTURE_SOURCE = """
+import collections
+import io
+
+_TRUNCATED = %(truncated)r
+
+class _Capture(io.TextIOBase):
+    def __init__(self, head, tail, spill=None):
+        self.head = []
+        self.head_room = head
+        self.tail = collections.deque()
+        self.tail_size = 0
+        self.tail_limit = tail
+        self.total = 0
+        self.bytes = 0
+        self.spill = open(spill, 'w', encoding='utf-8', errors='replace') if spill else None
+
+    def writable(self):
+        return True
+
+    def add(self, text):
+        # Store text, returning the part of it that landed in the head
+        self.total += len(text)
+        self.bytes += len(text) if text.isascii() else len(text.encode('utf-8', 'replace'))
+        if self.spill is not None:
+            try:
+                self.spill.write(text)
+            except OSError:
+                self.close_spill()  # Out of disk / file size limit - keep the capped copy
+        kept = text[:self.head_room]
+        if kept:
+            self.head.append(kept)
+            self.head_room -= len(kept)
+            text = text[len(kept):]
+        if text and self.tail_limit > 0:
+            self.tail.append(text[-self.tail_limit:])
+            self.tail_size += len(self.tail[-1])
+            while self.tail_size - len(self.tail[0]) >= self.tail_limit:
+                self.tail_size -= len(self.tail.popleft())
+            excess = self.tail_size - self.tail_limit
+            if excess > 0:
+                self.tail[0] = self.tail[0][excess:]
+                self.tail_size -= excess
+        return kept
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f'write() argument must be str, not {type(text).__name__}')
+        self.add(text)
+        return len(text)
+
+    def rest(self):
+        # Everything after the head: the truncation marker (if anything was dropped) and the tail
+        tail = ''.join(self.tail)
+        dropped = self.total - sum(map(len, self.head)) - len(tail)
+        return (_TRUNCATED.format(dropped) if dropped > 0 else '') + tail
+
+    def getvalue(self):
+        return ''.join(self.head) + self.rest()
+
+    def close_spill(self):
+        if self.spill is not None:
+            try:
+                self.spill.close()
+            except OSError:
+                pass
+            self.spill = None
+"""
+
+# Shared by every wrapper: resource usage of the user's script - wall and CPU
+# time (including child processes), peak RSS and output volume. Peak RSS is
+# the interpreter's high-water mark, so in a batch it only ever grows.
+METER_SOURCE = """
+try:
+    import resource as _resource
+except ImportError:
+    _resource = None
+
+def _meter_cpu():
+    if _resource is None:
+        return time.process_time()
+    own = _resource.getrusage(_resource.RUSAGE_SELF)
+    children = _resource.getrusage(_resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def _meter_start():
+    return time.perf_counter(), _meter_cpu()
+
+def _meter_stop(started, stdout_capture, stderr_capture):
+    stats = {
+        'run_seconds': round(time.perf_counter() - started[0], 6),
+        'cpu_seconds': round(_meter_cpu() - started[1], 6),
+        'peak_rss_mb': None,
+        'stdout_bytes': stdout_capture.bytes,
+        'stderr_bytes': stderr_capture.bytes,
+    }
+    if _resource is not None:
+        peak = max(_resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss,
+                   _resource.getrusage(_resource.RUSAGE_CHILDREN).ru_maxrss)
+        # ru_maxrss is KB on Linux, bytes on macOS
+        stats['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return stats
+"""
+
+WRAPPER_TEMPLATE = """
+import sys
+import io
+import json
+import os
+import time
+import traceback
+
+%(loader)s
+%(tracker)s
+%(capture)s
+%(meter)s
+
+os.chdir(%(work_dir)r)
+
+# Capture stdout and stderr (capped, optionally spilled to disk)
+old_stdout = sys.stdout
+old_stderr = sys.stderr
+stdout_capture = _Capture(%(head)d, %(tail)d, %(stdout_spill)r)
+stderr_capture = _Capture(%(head)d, %(tail)d, %(stderr_spill)r)
+
+sys.stdout = stdout_capture
+sys.stderr = stderr_capture
+
+exit_code = 0
+unhandled = None
+_track_start('script.py')
+started = _meter_start()
+try:
+    exec(compile(_track_instrument(_load('script.py'), 'script.py'), 'script.py', 'exec'), {'__name__': '__main__'})
+except SystemExit as e:
+    if e.code not in (None, 0):
+        stderr_capture.write(f"SystemExit: {e.code}\\n")
+        exit_code = 1
+except Exception as e:
+    unhandled = e
+    stderr_capture.write(f"ERROR: {e}\\n")
+    stderr_capture.write(''.join(traceback.format_exception(type(e), e, e.__traceback__.tb_next)))
+    exit_code = 1
+finally:
+    exceptions = _track_stop(unhandled)
+    stats = _meter_stop(started, stdout_capture, stderr_capture)
+    sys.stdout = old_stdout
+    sys.stderr = old_stderr
+    stdout_capture.close_spill()
+    stderr_capture.close_spill()
+
+# Output results
+result = {
+    'stdout': stdout_capture.getvalue(),
+    'stderr': stderr_capture.getvalue(),
+    'exit_code': exit_code,
+    'exceptions': exceptions,
+    'stats': stats
+}
+print('__RESULT__')
+print(json.dumps(result))
+"""
+
+# Batch variant: runs script_0.py .. script_<n-1>.py in one interpreter, each
+# with its own globals and its own captured streams, and reports a list
+BATCH_WRAPPER_TEMPLATE = """
+import sys
+import io
+import json
+import os
+import time
+import traceback
+
+%(loader)s
+%(tracker)s
+%(capture)s
+%(meter)s
+
+os.chdir(%(work_dir)r)
+
+old_stdout = sys.stdout
+old_stderr = sys.stderr
+results = []
+
+for index in range(%(count)d):
+    stdout_capture = _Capture(%(head)d, %(tail)d)
+    stderr_capture = _Capture(%(head)d, %(tail)d)
+    sys.stdout = stdout_capture
+    sys.stderr = stderr_capture
+
+    exit_code = 0
+    unhandled = None
+    path = f'script_{index}.py'
+    _track_start(path)
+    started = _meter_start()
+    try:
+        exec(compile(_track_instrument(_load(path), path), path, 'exec'), {'__name__': '__main__'})
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            stderr_capture.write(f"SystemExit: {e.code}\\n")
+            exit_code = 1
+    except Exception as e:
+        unhandled = e
+        stderr_capture.write(f"ERROR: {e}\\n")
+        stderr_capture.write(''.join(traceback.format_exception(type(e), e, e.__traceback__.tb_next)))
+        exit_code = 1
+    finally:
+        exceptions = _track_stop(unhandled)
+        stats = _meter_stop(started, stdout_capture, stderr_capture)
+        sys.stdout = old_stdout
+        sys.stderr = old_stderr
+        os.chdir(%(work_dir)r)
+
+    results.append({
+        'stdout': stdout_capture.getvalue(),
+        'stderr': stderr_capture.getvalue(),
+        'exit_code': exit_code,
+        'exceptions': exceptions,
+        'stats': stats
+    })
+
+print('__RESULT__')
+print(json.dumps(results))
+"""
+
+# Streaming variant: instead of buffering, forwards output as framed lines
+#   __CHUNK__["stdout", "text"]    (batched, flushed at least every 50ms)
+#   __RESULT__{"exit_code": 0, "exceptions": [...]}     (last line)
+# so the caller can render output while the script is still running.
+CHUNK_MARKER = "__CHUNK__"
+RESULT_MARKER = "__RESULT__"
+
+STREAM_WRAPPER_TEMPLATE = """
+import sys
+import io
+import json
+import os
+import threading
+import time
+import traceback
+
+%(loader)s
+%(tracker)s
+%(capture)s
+%(meter)s
+
+os.chdir(%(work_dir)r)
+
+real_stdout = sys.stdout
+lock = threading.RLock()
+pending = []
+pending_size = [0]
+last_flush = [time.time()]
+
+def emit():
+    # Caller holds lock
+    for frame in pending:
+        real_stdout.write('__CHUNK__' + json.dumps(frame) + '\\n')
+    real_stdout.flush()
+    pending.clear()
+    pending_size[0] = 0
+    last_flush[0] = time.time()
+
+class FramedWriter(io.TextIOBase):
+    # Forwards the head of the stream live; past the cap, output is held in
+    # the capture's tail and sent (after the truncation marker) at the end
+    def __init__(self, name, spill):
+        self.name = name
+        self.capture = _Capture(%(head)d, %(tail)d, spill)
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f'write() argument must be str, not {type(text).__name__}')
+        size = len(text)
+        with lock:
+            live = self.capture.add(text)
+            if live:
+                text = live
+                if pending and pending[-1][0] == self.name:
+                    pending[-1][1] += text
+                else:
+                    pending.append([self.name, text])
+                pending_size[0] += len(text)
+                # Flush on line boundaries at most every 50ms (the flusher
+                # thread picks up partial lines) or when the batch gets big
+                if pending_size[0] >= 4096 or (text.endswith('\\n') and time.time() - last_flush[0] >= 0.05):
+                    emit()
+        return size
+
+    def flush(self):
+        with lock:
+            emit()
+
+def flusher():
+    while True:
+        time.sleep(0.05)
+        with lock:
+            if pending and time.time() - last_flush[0] >= 0.05:
+                emit()
+
+threading.Thread(target=flusher, daemon=True).start()
+
+stdout_writer = sys.stdout = FramedWriter('stdout', %(stdout_spill)r)
+stderr_writer = sys.stderr = FramedWriter('stderr', %(stderr_spill)r)
+
+exit_code = 0
+unhandled = None
+_track_start('script.py')
+started = _meter_start()
+try:
+    exec(compile(_track_instrument(_load('script.py'), 'script.py'), 'script.py', 'exec'), {'__name__': '__main__'})
+except SystemExit as e:
+    if e.code not in (None, 0):
+        sys.stderr.write(f"SystemExit: {e.code}\\n")
+        exit_code = 1
+except Exception as e:
+    unhandled = e
+    sys.stderr.write(f"ERROR: {e}\\n")
+    sys.stderr.write(''.join(traceback.format_exception(type(e), e, e.__traceback__.tb_next)))
+    exit_code = 1
+finally:
+    exceptions = _track_stop(unhandled)
+    stats = _meter_stop(started, stdout_writer.capture, stderr_writer.capture)
+    with lock:
+        sys.stdout = real_stdout
+        sys.stderr = sys.__stderr__
+        for writer in (stdout_writer, stderr_writer):
+            writer.capture.close_spill()
+            rest = writer.capture.rest()
+            if rest:
+                pending.append([writer.name, rest])
+        emit()
+
+real_stdout.write('__RESULT__' + json.dumps({'exit_code': exit_code, 'exceptions': exceptions, 'stats': stats}) + '\\n')
+real_stdout.flush()
+"""
+
+
+# Fingerprint of everything that shapes a result: the templates and the output
+# caps. Part of the execution cache key, so editing the wrapper invalidates it.
+WRAPPER_VERSION = hashlib.sha256("\0".join([
+    LOADER_SOURCE, TRACKER_SOURCE, CAPTURE_SOURCE, METER_SOURCE, TRUNCATION_MARKER,
+    WRAPPER_TEMPLATE, BATCH_WRAPPER_TEMPLATE, STREAM_WRAPPER_TEMPLATE,
+    str(config.OUTPUT_HEAD_CHARS), str(config.OUTPUT_TAIL_CHARS),
+]).encode("utf-8")).hexdigest()[:16]
+
+
+def _prelude(sources: Optional[Dict[str, str]], spill: bool = False) -> Dict:
+    return {
+        "loader": LOADER_SOURCE % {"sources": repr(dict(sources or {}))},
+        "tracker": TRACKER_SOURCE,
+        "capture": CAPTURE_SOURCE % {"truncated": TRUNCATION_MARKER},
+        "meter": METER_SOURCE,
+        "head": config.OUTPUT_HEAD_CHARS,
+        "tail": config.OUTPUT_TAIL_CHARS,
+        "stdout_spill": SPILL_FILES["stdout"] if spill else None,
+        "stderr_spill": SPILL_FILES["stderr"] if spill else None,
+    }
+
+
+def build_wrapper(work_dir: str, sources: Optional[Dict[str, str]] = None, spill: bool = False) -> str:
+    """
+    Render the wrapper for a backend whose job directory is work_dir.
+
+    Args:
+        work_dir: Job directory (the wrapper chdirs into it)
+        sources: Scripts to embed by filename; anything missing is read
+            from work_dir instead
+        spill: Also write the full, uncapped streams to SPILL_FILES in work_dir
+
+    Returns:
+        Python source to run in the sandbox / subprocess
+    """
+    return WRAPPER_TEMPLATE % dict(_prelude(sources, spill), work_dir=work_dir)
+
+
+def build_batch_wrapper(work_dir: str, count: int, sources: Optional[Dict[str, str]] = None) -> str:
+    """
+    Render the batch wrapper that runs script_0.py .. script_<count-1>.py.
+
+    Args:
+        work_dir: Job directory (the wrapper chdirs into it)
+        count: Number of scripts in the batch
+        sources: Scripts to embed by filename; anything missing is read
+            from work_dir instead
+
+    Returns:
+        Python source to run in the sandbox / subprocess
+    """
+    return BATCH_WRAPPER_TEMPLATE % dict(_prelude(sources), work_dir=work_dir, count=count)
+
+
+def build_stream_wrapper(work_dir: str, sources: Optional[Dict[str, str]] = None, spill: bool = False) -> str:
+    """
+    Render the streaming wrapper (framed output chunks) for work_dir.
+
+    Args:
+        work_dir: Job directory (the wrapper chdirs into it)
+        sources: Scripts to embed by filename; anything missing is read
+            from work_dir instead
+        spill: Also write the full, uncapped streams to SPILL_FILES in work_dir
+
+    Returns:
+        Python source to run in the sandbox / subprocess
+    """
+    return STREAM_WRAPPER_TEMPLATE % dict(_prelude(sources, spill), work_dir=work_dir)
+
+
+class OutputBuffer:
+    """
+    Host-side twin of the wrapper's capture: keeps the first head and last
+    tail characters appended to it and counts the rest.
+
+    Used wherever output is accumulated outside the wrapper (streamed chunks,
+    raw output of a wrapper that never reported), so those stay bounded too.
+
+    Args:
+        head: Characters kept from the start (defaults to config.OUTPUT_HEAD_CHARS)
+        tail: Characters kept from the end (defaults to config.OUTPUT_TAIL_CHARS,
+            plus room for the wrapper's own marker so output it already
+            capped passes through unchanged)
+    """
+
+    def __init__(self, head: int = None, tail: int = None):
+        self._head: List[str] = []
+        self._head_room = config.OUTPUT_HEAD_CHARS if head is None else head
+        self._tail: collections.deque = collections.deque()
+        self._tail_size = 0
+        if tail is None:
+            tail = config.OUTPUT_TAIL_CHARS + len(TRUNCATION_MARKER.format(10 ** 20))
+        self._tail_limit = tail
+        self.total = 0
+
+    def append(self, text: str):
+        self.total += len(text)
+        kept = text[:self._head_room]
+        if kept:
+            self._head.append(kept)
+            self._head_room -= len(kept)
+            text = text[len(kept):]
+        if text and self._tail_limit > 0:
+            self._tail.append(text[-self._tail_limit:])
+            self._tail_size += len(self._tail[-1])
+            while self._tail_size - len(self._tail[0]) >= self._tail_limit:
+                self._tail_size -= len(self._tail.popleft())
+            excess = self._tail_size - self._tail_limit
+            if excess > 0:
+                self._tail[0] = self._tail[0][excess:]
+                self._tail_size -= excess
+
+    def getvalue(self) -> str:
+        head, tail = "".join(self._head), "".join(self._tail)
+        dropped = self.total - len(head) - len(tail)
+        return head + (TRUNCATION_MARKER.format(dropped) if dropped > 0 else "") + tail
+
+
+def clip_output(text: str) -> str:
+    """Cap text to the configured head/tail, with the truncation marker in between."""
+    buffer = OutputBuffer()
+    buffer.append(text)
+    return buffer.getvalue()
+
+
+def parse_result(output: str, process_exit_code: int) -> Tuple[int, str, str, Optional[List[Dict]], Optional[Dict]]:
+    """
+    Extract the wrapper's __RESULT__ JSON from raw process output.
+
+    Args:
+        output: Everything the wrapper process printed
+        process_exit_code: Exit code of the wrapper process itself
+
+    Returns:
+        Tuple of (exit_code: int, stdout: str, stderr: str, exceptions, stats) for the
+        user script; exceptions is the wrapper's list of exception records
+        (type, message, file, line, handled, count) and stats its resource
+        usage (run_seconds, cpu_seconds, peak_rss_mb, stdout_bytes,
+        stderr_bytes) - both None if it never reported
+    """
+    if '__RESULT__' in output:
+        json_part = output.split('__RESULT__', 1)[1].strip()
+        try:
+            result = json.loads(json_part)
+            return (result.get('exit_code', 1), result.get('stdout', ''),
+                    result.get('stderr', ''), result.get('exceptions'), result.get('stats'))
+        except json.JSONDecodeError:
+            return 1, clip_output(output), "Failed to parse execution result", None, None
+
+    # Wrapper never got to print its result (killed, timed out, interpreter crash)
+    return process_exit_code, clip_output(output), "", None, None
+
+
+def parse_batch_result(output: str, process_exit_code: int,
+                       count: int) -> List[Tuple[int, str, str, Optional[List[Dict]], Optional[Dict]]]:
+    """
+    Extract per-script results from the batch wrapper's output.
+
+    Args:
+        output: Everything the batch wrapper process printed
+        process_exit_code: Exit code of the wrapper process itself
+        count: Number of scripts in the batch
+
+    Returns:
+        List of (exit_code, stdout, stderr, exceptions, stats), one per script. If the wrapper
+        died before reporting, every script gets the raw output as its error.
+    """
+    if '__RESULT__' in output:
+        json_part = output.split('__RESULT__', 1)[1].strip()
+        try:
+            results = json.loads(json_part)
+            if len(results) == count:
+                return [(r.get('exit_code', 1), r.get('stdout', ''), r.get('stderr', ''), r.get('exceptions'),
+                         r.get('stats')) for r in results]
+        except json.JSONDecodeError:
+            pass
+        return [(1, "", "Failed to parse batch execution result", None, None)] * count
+
+    exit_code = process_exit_code or 1
+    error = clip_output(output) or f"Batch wrapper exited with code {process_exit_code}"
+    return [(exit_code, "", error, None, None)] * count
+
+
+class StreamDecoder:
+    """
+    Incrementally decodes the streaming wrapper's framed output.
+
+    Feed it raw text in whatever pieces the transport delivers; it returns
+    (stream, text) events for every complete frame and remembers the exit
+    code, exception records and resource stats from the final __RESULT__ frame. Unframed lines (interpreter crash,
+    output written straight to the file descriptor) come back as "stderr".
+
+    At most head + tail characters of an unframed line are held back waiting
+    for its newline; past that the line is passed on as it arrives, so output
+    that never ends a line can't grow the buffer without bound.
+
+    Args:
+        limit: Longest unframed partial line held back (defaults to
+            config.OUTPUT_HEAD_CHARS + config.OUTPUT_TAIL_CHARS)
+    """
+
+    def __init__(self, limit: int = None):
+        self._buffer = ""
+        self._limit = config.OUTPUT_HEAD_CHARS + config.OUTPUT_TAIL_CHARS if limit is None else limit
+        # The current line is unframed output already being passed on in pieces
+        self._passing = False
+        self.exit_code: Optional[int] = None
+        self.exceptions: Optional[List[Dict]] = None
+        self.stats: Optional[Dict] = None
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        events = []
+        for line in lines:
+            if self._passing:
+                self._passing = False
+                events.append(("stderr", line + "\n"))
+            else:
+                events.extend(self._decode(line))
+        if self._passing or len(self._buffer) > self._held_limit():
+            if self._buffer:
+                events.append(("stderr", self._buffer))
+            self._buffer = ""
+            self._passing = True
+        return events
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Decode whatever is left once the transport is exhausted."""
+        line, self._buffer = self._buffer, ""
+        if self._passing:
+            self._passing = False
+            return [("stderr", line)] if line else []
+        return self._decode(line)
+
+    def _held_limit(self) -> int:
+        # A frame carries at most head + tail characters of capped output,
+        # but json.dumps can spell one character with up to 12 (a surrogate
+        # pair escape), so frames get that much more room
+        if self._buffer.startswith((CHUNK_MARKER, RESULT_MARKER)):
+            return 12 * self._limit + 1024
+        return self._limit
+
+    def _decode(self, line: str) -> List[Tuple[str, str]]:
+        if line.startswith(CHUNK_MARKER):
+            try:
+                stream, text = json.loads(line[len(CHUNK_MARKER):])
+                return [(stream, text)]
+            except (ValueError, TypeError):
+                return [("stderr", line + "\n")]
+        if line.startswith(RESULT_MARKER):
+            try:
+                result = json.loads(line[len(RESULT_MARKER):])
+                self.exit_code = result.get("exit_code", 1)
+                self.exceptions = result.get("exceptions")
+                self.stats = result.get("stats")
+            except (ValueError, AttributeError):
+                self.exit_code = 1
+            return []
+        return [("stderr", line + "\n")] if line.strip() else []
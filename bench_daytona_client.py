@@ -0,0 +1,71 @@
+"""
+Benchmark: per-call Daytona client setup vs the shared client
+
+1. Setup cost - building a fresh client per call vs daytona_client.get_client()
+   (offline; a placeholder API key is used if none is configured)
+2. Round trip - one API call per iteration with a fresh client (new
+   connections + TLS handshake each time) vs the shared keep-alive client
+   (needs a real DAYTONA_API_KEY; skipped otherwise)
+
+Usage:
+    python bench_daytona_client.py [iterations]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+HAS_KEY = bool(os.getenv("DAYTONA_API_KEY"))
+if not HAS_KEY:
+    os.environ["DAYTONA_API_KEY"] = "bench-placeholder"
+
+from backend import config
+from backend.daytona_client import client_stats, get_client, new_client
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label, samples):
+    print(f"   {label:<22} mean {statistics.mean(samples):8.2f}ms   "
+          f"median {statistics.median(samples):8.2f}ms   max {max(samples):8.2f}ms")
+
+
+def list_sandboxes(client):
+    from daytona import ListSandboxesQuery
+    client.list(ListSandboxesQuery(limit=1))
+
+
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+print("="*60)
+print(f"BENCHMARK: Daytona client reuse ({iterations} iterations)")
+print("="*60)
+
+print("\n1. Client setup per call...")
+fresh = timed(lambda: new_client(config.DAYTONA_API_KEY, config.DAYTONA_API_URL), iterations)
+get_client()  # First use builds it
+shared = timed(get_client, iterations)
+report("fresh client", fresh)
+report("shared client", shared)
+print(f"   Saved per call: {statistics.mean(fresh) - statistics.mean(shared):.2f}ms")
+
+print("\n2. API round trip per call...")
+if not HAS_KEY:
+    print("   Skipped - set DAYTONA_API_KEY to measure connection reuse")
+else:
+    list_sandboxes(get_client())  # Warm the keep-alive connection
+    fresh = timed(lambda: list_sandboxes(new_client(config.DAYTONA_API_KEY, config.DAYTONA_API_URL)), iterations)
+    shared = timed(lambda: list_sandboxes(get_client()), iterations)
+    report("fresh client", fresh)
+    report("shared client", shared)
+    print(f"   Saved per call: {statistics.mean(fresh) - statistics.mean(shared):.2f}ms")
+
+print(f"\n   Registry: {client_stats()}")
@@ -0,0 +1,210 @@
+"""
+Stand-ins shared by the offline tests
+
+- FakeCompletions: OpenAI's client.chat.completions (plain, n-choice and
+  streamed replies); fake_openai() wraps it as a client
+- FakeDaytona / FakeSandbox: a Daytona client whose sandboxes run commands
+  and wrappers on this machine, with WORK_DIR moved under a private directory
+
+SIMPLICITY: only the SDK surface the backend calls is faked; knobs for the
+failure modes the tests need (slow creates, failed creates and deletes,
+broken sandboxes, slow scrubs) and nothing else.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Union
+
+from backend.sandbox_pool import WORK_DIR
+
+Tokens = Union[int, Callable[[str], int]]
+
+
+class FakeCompletions:
+    """
+    Stand-in for client.chat.completions.
+
+    Args:
+        reply: What a request is answered with - a string, a list of strings
+            (the choices of an n-completion request), or a callable taking
+            the request's messages and returning either
+        replies: Answers handed out one per request instead of `reply`
+        prompt_tokens / completion_tokens: Usage per request / per choice, or
+            a callable counting the tokens of the prompt / choice text
+        first_token_delay / chunk_delay: Pacing of streamed replies (seconds)
+
+    Every request is kept in .requests (model, messages, n, stream, params).
+    """
+
+    def __init__(self, reply: Union[str, List[str], Callable] = "print('hello world')",
+                 replies: Optional[List[str]] = None, prompt_tokens: Tokens = 100,
+                 completion_tokens: Tokens = 40, first_token_delay: float = 0.1, chunk_delay: float = 0.02):
+        self.reply = reply
+        self.replies = list(replies) if replies is not None else None
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.requests = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.requests)
+
+    @property
+    def models(self) -> List[str]:
+        return [request.model for request in self.requests]
+
+    @property
+    def prompts(self) -> List[str]:
+        return [request.messages[-1]["content"] for request in self.requests]
+
+    def create(self, model, messages, n=1, stream=False, **params):
+        self.requests.append(SimpleNamespace(model=model, messages=messages, n=n, stream=stream, params=params))
+        if self.replies is not None:
+            answer = self.replies.pop(0)
+        else:
+            answer = self.reply(messages) if callable(self.reply) else self.reply
+        contents = answer[:n] if isinstance(answer, list) else [answer]
+        prompt_tokens = _count(self.prompt_tokens, messages[-1]["content"])
+        if stream:
+            return self._stream(contents[0], prompt_tokens)
+        completion_tokens = sum(_count(self.completion_tokens, content) for content in contents)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content)) for content in contents],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        )
+
+    def _stream(self, content: str, prompt_tokens: int):
+        """The reply in 4-character chunks, then a usage-only chunk (one token per chunk)."""
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        time.sleep(self.first_token_delay)
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+            time.sleep(self.chunk_delay)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=len(pieces), total_tokens=prompt_tokens + len(pieces)))
+
+
+def fake_openai(completions: FakeCompletions):
+    """An OpenAI client whose chat.completions is `completions`."""
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def _count(tokens: Tokens, text: str) -> int:
+    return tokens(text) if callable(tokens) else tokens
+
+
+class Response:
+    def __init__(self, exit_code, result=""):
+        self.exit_code = exit_code
+        self.result = result
+
+
+class FakeProcess:
+    """Runs shell commands and wrappers locally, with WORK_DIR moved under the sandbox's root."""
+
+    def __init__(self, sandbox):
+        self.sandbox = sandbox
+        self.programs = []
+
+    def exec(self, command, timeout=None):
+        if self.sandbox.broken:
+            return Response(1, "sandbox is gone")
+        if "rm -rf" in command:
+            time.sleep(self.sandbox.scrub_seconds)
+        done = subprocess.run(command.replace(WORK_DIR, self.sandbox.work_dir), shell=True,
+                              capture_output=True, text=True, timeout=timeout)
+        return Response(done.returncode, done.stdout + done.stderr)
+
+    def code_run(self, code, timeout=None):
+        self.programs.append(code)
+        done = subprocess.run([sys.executable, "-"], input=code.replace(WORK_DIR, self.sandbox.work_dir),
+                              capture_output=True, text=True, timeout=timeout)
+        return Response(done.returncode, done.stdout + done.stderr)
+
+
+class FakeFS:
+    def __init__(self, sandbox):
+        self.sandbox = sandbox
+        self.uploads = []
+
+    def upload_files(self, files, timeout=None):
+        self.uploads.append([(f.source, f.destination) for f in files])
+        for upload in files:
+            path = upload.destination.replace(WORK_DIR, self.sandbox.work_dir)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(upload.source)
+
+
+class FakeSandbox:
+    """
+    A sandbox rooted in a fresh temporary directory.
+
+    Set broken to fail every exec, scrub_seconds to slow the scrub down;
+    the first delete_failures deletes raise (each after delete_delay seconds).
+    """
+
+    def __init__(self, sandbox_id: str, labels: Optional[dict] = None, last_activity_at: Optional[str] = None,
+                 delete_failures: int = 0, delete_delay: float = 0.0):
+        self.id = sandbox_id
+        self.labels = labels or {}
+        self.last_activity_at = last_activity_at
+        self.work_dir = os.path.join(tempfile.mkdtemp(), "codephoenix")
+        self.fs = FakeFS(self)
+        self.process = FakeProcess(self)
+        self.broken = False
+        self.scrub_seconds = 0.0
+        self.delete_failures = delete_failures
+        self.delete_delay = delete_delay
+        self.deleted = False
+
+    def delete(self):
+        time.sleep(self.delete_delay)
+        if self.delete_failures > 0:
+            self.delete_failures -= 1
+            raise RuntimeError("503 Service Unavailable")
+        self.deleted = True
+
+
+class FakeDaytona:
+    """
+    Daytona client: create() makes a FakeSandbox after `delay` seconds (the
+    first `failures` creates raise instead), list() returns the live ones.
+    """
+
+    def __init__(self, sandboxes: Optional[List[FakeSandbox]] = None, delay: float = 0.02, failures: int = 0):
+        self.created: List[FakeSandbox] = list(sandboxes or ())
+        self.delay = delay
+        self.failures = failures
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def create(self, params, timeout=None):
+        time.sleep(self.delay)
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("quota exceeded")
+            sandbox = FakeSandbox(f"sandbox-{len(self.created)}")
+            self.created.append(sandbox)
+        return sandbox
+
+    def list(self, query):
+        self.queries.append(query)
+        return [sandbox for sandbox in self.created if not sandbox.deleted]
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    """Poll condition until it holds or timeout seconds pass; returns its last value."""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
@@ -5,7 +5,7 @@ SIMPLE SERVICE ORCHESTRATION:
 1. User enters prompt
 2. Generate code (LLM + Galileo)
 3. Execute in Daytona
-4. If error: Report to Sentry + Fix with CodeRabbit + Re-execute
+4. If error: Report to Sentry + Fix with CodeRabbit + Re-execute (repeated within a budget)
 5. Display results
 
 That's it. No complex logic, just wiring sponsors together.
@@ -13,10 +13,11 @@ That's it. No complex logic, just wiring sponsors together.
 
 import streamlit as st
 from datetime import datetime
-from backend import config
-from backend.generator import generate_code
-from backend.executor import execute_code
-from backend.fixer import fix_code
+from backend import config, generator, model_router
+from backend.generator import generate_candidates, generate_code
+from backend.executor import execute_first_success, stream_code
+from backend.sandbox_wrapper import OutputBuffer
+from backend.repair_loop import repair
 from backend.sentry_helper import report_error
 
 # Page config
@@ -97,6 +98,18 @@ st.sidebar.markdown("- **Sentry**: Error tracking & monitoring")
 st.sidebar.markdown("- **Daytona**: Workspace & sandbox status")
 st.sidebar.markdown("- **CodeRabbit**: AI code review (simulated)")
 
+st.sidebar.divider()
+st.sidebar.header("⚡ Speed vs Cost")
+candidates = st.sidebar.slider(
+    "Candidates per prompt", 1, 5, max(1, config.GENERATION_CANDIDATES),
+    help="Generate several programs at once and keep the first one that runs successfully - "
+         "fewer fix rounds, roughly N x the output tokens"
+)
+max_fix_attempts = st.sidebar.slider(
+    "Max fix attempts", 1, 5, max(1, config.REPAIR_MAX_ITERATIONS),
+    help="Fix + re-run rounds before giving up (token and time budgets also apply)"
+)
+
 st.sidebar.divider()
 st.sidebar.header("🎯 How It Works")
 st.sidebar.markdown("""
@@ -104,9 +117,60 @@ st.sidebar.markdown("""
 2. **Execute**: Daytona runs code in sandbox
 3. **Monitor**: Sentry catches any errors
 4. **Fix**: CodeRabbit analyzes and fixes
-5. **Retry**: Re-execute fixed code
+5. **Retry**: Re-execute fixed code, fixing again until it works
 """)
 
+def show_execution_metrics(metrics: dict):
+    """Execution metrics row (same layout as the LLM metrics row)."""
+    phases = metrics.get("phases_ms", {})
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if metrics.get("preflight"):
+            st.metric("Execution", f"{metrics['total_ms']:.1f} ms", delta="caught by pre-flight, no sandbox",
+                      delta_color="off")
+        elif metrics.get("cached"):
+            st.metric("Execution", f"{metrics['total_ms']:.1f} ms", delta="cached result")
+        else:
+            st.metric("Execution", f"{metrics['total_ms']:.0f} ms",
+                      delta=f"{phases.get('create', 0):.0f} ms sandbox / {phases.get('run', 0):.0f} ms run",
+                      delta_color="off")
+    with col2:
+        cpu = metrics.get("cpu_seconds")
+        st.metric("CPU Time", f"{cpu * 1000:.0f} ms" if cpu is not None else "-")
+    with col3:
+        rss = metrics.get("peak_rss_mb")
+        st.metric("Peak Memory", f"{rss:.0f} MB" if rss is not None else "-")
+    with col4:
+        out_bytes = metrics.get("stdout_bytes")
+        err_bytes = metrics.get("stderr_bytes")
+        st.metric("Output", f"{out_bytes:,} B" if out_bytes is not None else "-",
+                  delta=f"{err_bytes:,} B stderr" if err_bytes else None, delta_color="off")
+
+def run_with_live_output(code: str, filename: str):
+    """
+    Execute code in Daytona, rendering stdout/stderr live while it runs,
+    then the execution metrics row.
+
+    Returns the same (success, output, error, error_type) tuple as execute_code.
+    """
+    live = st.empty()
+    # Bounded like the executor's own capture - no ever-growing string to re-render
+    streamed = OutputBuffer()
+    result = (False, "", "Execution produced no result", "crash")
+    metrics = None
+    for event, payload in stream_code(code, filename, return_metrics=True):
+        if event == "result":
+            result = payload
+        elif event == "metrics":
+            metrics = payload
+        else:
+            streamed.append(payload)
+            live.code(streamed.getvalue(), language='text')
+    live.empty()
+    if metrics:
+        show_execution_metrics(metrics)
+    return result
+
 # Main interface
 st.header("✍️ What code should I generate?")
 
@@ -129,21 +193,42 @@ if generate_btn and user_prompt:
     with st.status("Generating code with LLM...", expanded=True) as status:
         st.write("🔭 Galileo is monitoring this LLM call...")
         try:
-            code, metrics = generate_code(user_prompt)
-            st.code(code, language='python', line_numbers=True)
+            if candidates > 1:
+                codes, metrics = generate_candidates(user_prompt, candidates)
+                code = codes[0]
+                st.write(f"🏁 {len(codes)} distinct candidates - they'll race in the sandbox")
+            else:
+                # Tokens render as they arrive; the final code replaces the preview
+                live = st.empty()
+                streamed = ""
+                for event, payload in generate_code(user_prompt, stream=True):
+                    if event == "result":
+                        code, metrics = payload
+                    else:
+                        streamed += payload
+                        live.code(streamed, language='python')
+                live.code(code, language='python', line_numbers=True)
+                codes = [code]
 
             # Display LLM performance metrics
             st.write("**📊 LLM Performance Metrics:**")
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Model", metrics['model'])
+                st.metric("Model", metrics['model'], delta=f"{metrics['tier']} tier: {metrics['route_reason']}",
+                          delta_color="off")
             with col2:
                 st.metric("Tokens", f"{metrics['total_tokens']:,}",
                          delta=f"{metrics['prompt_tokens']} in / {metrics['completion_tokens']} out")
             with col3:
-                st.metric("Latency", f"{metrics['latency_ms']:.0f} ms")
+                if metrics.get("cached"):
+                    st.metric("Latency", f"{metrics['latency_ms']:.0f} ms", delta="cached")
+                else:
+                    st.metric("Latency", f"{metrics['latency_ms']:.0f} ms",
+                              delta=f"{metrics['ttft_ms']:.0f} ms to first token / "
+                                    f"{metrics['tokens_per_sec'] or 0:.0f} tok/s",
+                              delta_color="off")
             with col4:
-                st.metric("Cost", f"${metrics['estimated_cost']:.4f}")
+                st.metric("Cost", f"${metrics['estimated_cost']:.6f}")
 
             status.update(label="✅ Code generated successfully!", state="complete")
         except Exception as e:
@@ -153,7 +238,21 @@ if generate_btn and user_prompt:
     # STEP 2: Execute in Daytona
     with st.status("Executing code in Daytona sandbox...", expanded=True) as status:
         st.write("🟦 Running in isolated Daytona workspace...")
-        success, output, error, error_type = execute_code(code, filename)
+        if len(codes) > 1:
+            # First candidate to succeed wins; if none does, fix the first one
+            filenames = [f"generated_{timestamp}_{i}.py" for i in range(len(codes))]
+            winner, results = execute_first_success(codes, filenames)
+            chosen = winner if winner is not None else 0
+            code = codes[chosen]
+            success, output, error, error_type = results[chosen]
+            st.write(f"**Candidate {chosen + 1} of {len(codes)}:**")
+            st.code(code, language='python', line_numbers=True)
+        else:
+            success, output, error, error_type = run_with_live_output(code, filename)
+        # Past outcomes steer the router (a fast-tier failure escalates next time)
+        model_router.record_outcome("generate", user_prompt, metrics["model"], error_type == "success")
+        # Code that failed isn't replayed from the generation cache
+        generator.record_result(metrics, code, error_type == "success")
 
         # Display execution results based on error type
         if error_type == "success":
@@ -187,14 +286,15 @@ if generate_btn and user_prompt:
         elif error_type == "handled_exception":
             st.warning("⚠️ Code handled an exception but may not be working correctly!")
             st.write("**Output/Error:**")
-            st.code(output + error, language='text')
-            st.write("Detected error patterns in output (e.g., 'Cannot divide by zero', exception handling)")
+            combined = output + error
+            st.code(combined, language='text')
+            st.write("The script caught an exception internally - locations are listed above")
             status.update(label="⚠️ Handled exception detected - starting auto-fix...", state="error")
 
             # Report to Sentry
             st.write("🔴 Reporting handled exception to Sentry...")
             report_error(
-                error_message=f"Handled exception detected: {(output + error)[:200]}",
+                error_message=f"Handled exception detected: {combined[:200]}",
                 error_type="handled_exception",
                 context={
                     "user_prompt": user_prompt,
@@ -228,42 +328,64 @@ if generate_btn and user_prompt:
 
         if needs_fix:
 
-            # STEP 4: Fix with CodeRabbit
+            # STEP 4 + 5: Fix with CodeRabbit and re-execute until it works or the budget runs out
             with st.status("CodeRabbit is analyzing and fixing...", expanded=True) as fix_status:
                 st.write("🐰 AI code review in progress...")
-                try:
-                    # Create detailed error message for fixer
-                    error_detail = error if error else f"Code produced no output. Type: {error_type}. Output: {output}"
-                    fixed_code = fix_code(code, error_detail)
-                    st.write("**Fixed Code:**")
+
+                def show_fix(iteration, fixed_code, fix_metrics):
+                    st.write(f"**Fix attempt {iteration}:**")
                     st.code(fixed_code, language='python', line_numbers=True)
-                    fix_status.update(label="✅ Code fixed by CodeRabbit!", state="complete")
+                    context_note = ""
+                    if fix_metrics["context_tokens_after"] < fix_metrics["context_tokens_before"]:
+                        context_note = (f", context cut from {fix_metrics['context_tokens_before']:,} to "
+                                        f"{fix_metrics['context_tokens_after']:,} tokens")
+                    if fix_metrics["fix_mode"] == "diff":
+                        context_note += (f", {fix_metrics['patch_edits']} edit(s) applied, "
+                                         f"{fix_metrics['completion_tokens_saved']:,} output tokens saved")
+                    if fix_metrics["rule"]:
+                        st.caption(f"Fixed locally by rule '{fix_metrics['rule']}' in "
+                                   f"{fix_metrics['latency_ms']:.2f} ms - no LLM call")
+                    else:
+                        st.caption(f"Fixed by {fix_metrics['model']} ({fix_metrics['route_reason']}) in "
+                                   f"{fix_metrics['latency_ms']:.0f} ms for ${fix_metrics['estimated_cost']:.6f}"
+                                   f"{context_note}")
+                    st.write("🟦 Running fixed code in Daytona...")
+
+                def show_result(record, result):
+                    if record["outcome"] == "repeat":
+                        st.warning("Same code as an earlier version - skipped re-running it")
+                    elif record["outcome"] != "success":
+                        _, output_retry, error_retry, _ = result
+                        st.error(f"❌ Fixed code still has issues (type: {record['outcome']})")
+                        if error_retry or output_retry:
+                            st.code(error_retry or output_retry, language='text')
+
+                try:
+                    # Code from the fast tier that failed gets fixed by the strong tier
+                    repaired = repair(code, error, error_type, output, failed_model=metrics["model"],
+                                      execute=run_with_live_output, max_iterations=max_fix_attempts,
+                                      on_fix=show_fix, on_result=show_result,
+                                      filename_prefix=f"fixed_{timestamp}")
                 except Exception as e:
                     st.error(f"Fix generation failed: {e}")
                     st.stop()
 
-            # STEP 5: Re-execute Fixed Code
-            with st.status("Re-executing fixed code...", expanded=True) as retry_status:
-                st.write("🟦 Running fixed code in Daytona...")
-                fixed_filename = f"fixed_{timestamp}.py"
-                success_retry, output_retry, error_retry, error_type_retry = execute_code(fixed_code, fixed_filename)
-
-                if error_type_retry == "success":
+                attempts = len(repaired["iterations"])
+                st.caption(f"{attempts} fix attempt(s), {repaired['total_tokens']:,} tokens, "
+                           f"${repaired['total_cost']:.6f}, {repaired['elapsed_ms'] / 1000:.1f} s "
+                           f"(stopped: {repaired['stop_reason'].replace('_', ' ')})")
+                if repaired["success"]:
                     st.balloons()
                     st.success("🎉 Fixed code executed successfully!")
                     st.write("**Output:**")
-                    if output_retry.strip():
-                        st.code(output_retry, language='text')
+                    if repaired["output"].strip():
+                        st.code(repaired["output"], language='text')
                     else:
                         st.info("(No output produced - code may only define functions/classes)")
-                    retry_status.update(label="✅ Self-healing complete!", state="complete")
+                    fix_status.update(label="✅ Self-healing complete!", state="complete")
                 else:
-                    st.error(f"❌ Fixed code still has issues (type: {error_type_retry})")
-                    if error_retry:
-                        st.code(error_retry, language='text')
-                    elif output_retry:
-                        st.code(output_retry, language='text')
-                    retry_status.update(label=f"❌ Fix attempt resulted in: {error_type_retry}", state="error")
+                    fix_status.update(label=f"❌ Still failing after {attempts} fix attempt(s): "
+                                            f"{repaired['error_type']}", state="error")
 
     # Summary
     st.divider()
@@ -0,0 +1,57 @@
+"""
+Test 10: Streaming Execution Output
+Checks that stream_code delivers output while the script is still running.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+import time
+
+print("="*60)
+print("TEST 10: Streaming Output")
+print("="*60)
+
+from backend.executor import stream_code
+
+code = """
+import time
+for i in range(3):
+    print(f"step {i}")
+    time.sleep(1)
+print("done")
+"""
+
+print("\nStreaming a 3-second script...")
+print("-"*60)
+start = time.time()
+first_output_at = None
+streamed = ""
+result = None
+
+for event, payload in stream_code(code, "test_streaming.py", backend="local"):
+    if event == "result":
+        result = payload
+    else:
+        if first_output_at is None:
+            first_output_at = time.time() - start
+        streamed += payload
+        print(f"   [{time.time() - start:.1f}s] {event}: {payload.strip()}")
+
+total = time.time() - start
+
+if result is None or result[3] != "success":
+    print(f"❌ Expected a success result, got {result}")
+    exit(1)
+print("✅ Final result event received")
+
+if streamed != result[1]:
+    print("❌ Streamed output doesn't match the final output")
+    exit(1)
+print("✅ Streamed chunks add up to the final output")
+
+if first_output_at is not None and first_output_at < total - 1.5:
+    print(f"✅ First output after {first_output_at:.1f}s (script took {total:.1f}s)")
+else:
+    print(f"❌ Output was not streamed (first output at {first_output_at}, total {total:.1f}s)")
+    exit(1)
+
+print("\n🎉 Test 10 PASSED - Streaming works!")
@@ -0,0 +1,137 @@
+"""
+Test 11: Structured Exception Capture
+Checks classification comes from exceptions recorded inside the wrapper,
+not from the words a script happens to print.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+print("="*60)
+print("TEST 11: Structured Exception Capture")
+print("="*60)
+
+import subprocess
+import sys
+
+from backend.executor import execute_code
+
+# Step 1: Printing the word "Error" is not an exception
+print("\nSTEP 1: Output Mentioning 'Error'")
+print("-"*60)
+success, output, error, error_type = execute_code(
+    'print("Error: none - ValueError count is 0")', "test_error_word.py", backend="local"
+)
+if error_type == "success":
+    print("✅ Classified as success")
+else:
+    print(f"❌ Expected success, got {error_type}")
+    exit(1)
+
+# Step 2: Ordinary EAFP error handling is a success
+print("\nSTEP 2: Caught KeyError (counting with try/except)")
+print("-"*60)
+code = """
+counts = {}
+for word in "a b a c a".split():
+    try:
+        counts[word] += 1
+    except KeyError:
+        counts[word] = 1
+print(counts)
+"""
+success, output, error, error_type = execute_code(code, "test_eafp.py", backend="local", use_cache=False)
+if error_type == "success" and not error:
+    print("✅ Classified as success")
+else:
+    print(f"❌ Expected success, got {error_type}: {error}")
+    exit(1)
+
+# Step 3: An exception swallowed by `except: pass` is reported with its location
+print("\nSTEP 3: Swallowed ZeroDivisionError")
+print("-"*60)
+code = """
+numbers = []
+average = None
+try:
+    average = sum(numbers) / len(numbers)
+except ZeroDivisionError:
+    pass
+print(f"Average: {average}")
+"""
+success, output, error, error_type = execute_code(code, "test_handled.py", backend="local", use_cache=False)
+if error_type == "handled_exception" and "ZeroDivisionError at script.py line 5" in error:
+    print("✅ Swallowed exception detected with exact location")
+    print(f"   {error.splitlines()[-1]}")
+else:
+    print(f"❌ Expected handled_exception at line 5, got {error_type}: {error}")
+    exit(1)
+
+# Step 4: Raised in a function, swallowed by the caller's handler
+print("\nSTEP 4: Swallowed by the Caller")
+print("-"*60)
+code = """
+def average(numbers):
+    return sum(numbers) / len(numbers)
+
+result = None
+try:
+    result = average([])
+except ZeroDivisionError:
+    pass
+print(f"Average: {result}")
+"""
+success, output, error, error_type = execute_code(code, "test_caller.py", backend="local", use_cache=False)
+if error_type == "handled_exception" and "ZeroDivisionError at script.py line 3" in error:
+    print("✅ Swallowed exception reported where it was raised")
+else:
+    print(f"❌ Expected handled_exception raised at line 3, got {error_type}: {error}")
+    exit(1)
+
+# Step 5: sys.exit(0) is a clean exit, not a caught exception
+print("\nSTEP 5: sys.exit(0)")
+print("-"*60)
+success, output, error, error_type = execute_code('import sys\nprint("done")\nsys.exit(0)\n',
+                                                  "test_exit.py", backend="local", use_cache=False)
+if (success, output, error, error_type) == (True, "done\n", "", "success"):
+    print("✅ Classified as success")
+else:
+    print(f"❌ Expected a clean success, got {(success, output, error, error_type)}")
+    exit(1)
+
+# Step 6: An uncaught exception is a crash with its location
+print("\nSTEP 6: Uncaught KeyError")
+print("-"*60)
+code = """
+def lookup(d):
+    return d["missing"]
+
+lookup({})
+"""
+success, output, error, error_type = execute_code(code, "test_unhandled.py", backend="local")
+if error_type == "crash" and "Unhandled KeyError at script.py line 3" in error:
+    print("✅ Crash reported with exact location")
+else:
+    print(f"❌ Expected crash at line 3, got {error_type}: {error}")
+    exit(1)
+
+# Step 7: Tracking exceptions doesn't slow the script down
+print("\nSTEP 7: Tracking Overhead")
+print("-"*60)
+code = """
+import time
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+started = time.perf_counter()
+fib(24)
+print(f"{time.perf_counter() - started:.6f}")
+"""
+wrapped = min(float(execute_code(code, "test_overhead.py", backend="local", use_cache=False)[1])
+              for _ in range(3))
+plain = min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout)
+            for _ in range(3))
+print(f"   fib(24): {wrapped * 1000:.1f} ms in the wrapper, {plain * 1000:.1f} ms plain")
+if wrapped > plain * 2 + 0.02:
+    print("❌ Exception tracking slows call-heavy scripts down")
+    exit(1)
+print("✅ No per-call tracing overhead")
+
+print("\n🎉 Test 11 PASSED - Structured exception capture works!")
@@ -0,0 +1,84 @@
+"""
+Test 12: Bounded Output Capture
+Checks that a script printing far more than the output cap comes back as
+head + truncation marker + tail, and that the full output can be spilled
+to disk and read back through a memory map.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+import os
+import tempfile
+
+print("="*60)
+print("TEST 12: Bounded Output Capture")
+print("="*60)
+
+from backend import config
+from backend.executor import execute_code, open_spilled_output, spill_paths, stream_code
+from backend.sandbox_wrapper import StreamDecoder
+
+# ~2.9MB of output, far past the default 64KB head + 64KB tail
+code = """
+for i in range(200000):
+    print(f"line {i:06d}")
+"""
+cap = config.OUTPUT_HEAD_CHARS + config.OUTPUT_TAIL_CHARS
+
+print("\n1. Capped capture (execute_code)...")
+success, output, error, error_type = execute_code(code, "test_output_caps.py", backend="local", spill_dir="")
+if not success:
+    print(f"❌ Execution failed: {error}")
+    exit(1)
+if len(output) > cap + 200:
+    print(f"❌ Output not capped: {len(output)} chars (cap {cap})")
+    exit(1)
+if not output.startswith("line 000000\n") or not output.endswith("line 199999\n") or "[output truncated:" not in output:
+    print("❌ Expected head + truncation marker + tail")
+    exit(1)
+print(f"✅ {len(output)} chars returned, head and tail intact, truncation marked")
+
+print("\n2. Capped capture (stream_code)...")
+result = None
+streamed = 0
+for event, payload in stream_code(code, "test_output_caps.py", backend="local", spill_dir="", use_cache=False):
+    if event == "result":
+        result = payload
+    else:
+        streamed += len(payload)
+if result is None or result[1] != output:
+    print("❌ Streamed result differs from execute_code's capped output")
+    exit(1)
+print(f"✅ {streamed} chars streamed, same capped result")
+
+print("\n3. Spill full output to disk...")
+spill_dir = tempfile.mkdtemp(prefix="codephoenix_spill_")
+success, output, error, error_type = execute_code(code, "test_output_caps.py", backend="local", spill_dir=spill_dir)
+stdout_path = spill_paths(spill_dir, "test_output_caps.py")["stdout"]
+if not os.path.exists(stdout_path):
+    print(f"❌ Spill file missing: {stdout_path}")
+    exit(1)
+full = open_spilled_output(stdout_path)
+try:
+    expected_size = sum(len(f"line {i:06d}\n") for i in range(200000))
+    if len(full) != expected_size or full[:12] != b"line 000000\n" or full.find(b"line 123456\n") < 0:
+        print(f"❌ Spilled output incomplete ({len(full)} of {expected_size} bytes)")
+        exit(1)
+finally:
+    full.close()
+print(f"✅ Full output ({expected_size} bytes) spilled to {stdout_path}")
+
+print("\n4. Unframed output without newlines (stream decoder)...")
+decoder = StreamDecoder()
+passed = []
+for _ in range(100):
+    passed.extend(decoder.feed("x" * 10000))
+if sum(len(text) for stream, text in passed) < 1000000 - cap:
+    print(f"❌ Decoder held back {1000000 - sum(len(text) for stream, text in passed)} chars of an unfinished line")
+    exit(1)
+events = decoder.feed('\n__CHUNK__["stdout", "after"]\n') + decoder.close()
+if events != [("stderr", "\n"), ("stdout", "after")]:
+    print(f"❌ Frames after a long unframed line were not decoded: {events}")
+    exit(1)
+print(f"✅ {sum(len(text) for stream, text in passed)} of 1000000 chars passed on before the line ended")
+
+print("\n🎉 Test 12 PASSED - Output capture is bounded!")
@@ -0,0 +1,121 @@
+"""
+Test 13: Execution Result Cache
+Checks that repeat runs of the same (or merely reformatted) deterministic
+code are served from the cache, that time/random scripts are never cached,
+and that the LRU/TTL and SQLite tiers behave.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+import os
+import tempfile
+import time
+
+print("="*60)
+print("TEST 13: Execution Result Cache")
+print("="*60)
+
+from backend.cache import MemoryCache, SQLiteCache, TieredCache
+from backend.code_analysis import nondeterminism_reasons
+from backend.executor import execute_code, get_result_cache
+
+code = """
+total = sum(i * i for i in range(1000))
+print(f"Sum of squares: {total}")
+"""
+reformatted = """
+# Same program, different formatting
+total = sum(i*i for i in range(1000))
+print(f"Sum of squares: {total}")
+"""
+
+print("\n1. Repeat execution...")
+get_result_cache().clear()
+start = time.perf_counter()
+first = execute_code(code, "test_cache.py", backend="local")
+cold = time.perf_counter() - start
+start = time.perf_counter()
+second = execute_code(code, "test_cache.py", backend="local")
+warm = time.perf_counter() - start
+if first != second or first[3] != "success":
+    print(f"❌ Cached result differs: {first} vs {second}")
+    exit(1)
+if warm > cold / 10:
+    print(f"❌ Repeat run not served from cache ({cold * 1000:.1f}ms cold, {warm * 1000:.3f}ms warm)")
+    exit(1)
+print(f"✅ Cold run {cold * 1000:.1f}ms, cached run {warm * 1000:.3f}ms")
+
+print("\n2. Reformatted code...")
+hits_before = get_result_cache().stats()["memory"]["hits"]
+if execute_code(reformatted, "test_cache.py", backend="local") != first:
+    print("❌ Reformatted code returned a different result")
+    exit(1)
+if get_result_cache().stats()["memory"]["hits"] != hits_before + 1:
+    print("❌ Reformatted code was not a cache hit")
+    exit(1)
+print("✅ Comments and whitespace don't change the cache key")
+
+print("\n3. Nondeterministic code...")
+random_code = "import random\nprint(random.random())"
+a = execute_code(random_code, "test_cache_random.py", backend="local")
+b = execute_code(random_code, "test_cache_random.py", backend="local")
+if a[1] == b[1]:
+    print("❌ Script using random was served from the cache")
+    exit(1)
+print("✅ Scripts using random are executed every time")
+flagged = {
+    "import numpy as np\nprint(np.random.rand())": "uses numpy.random",
+    "import numpy\nprint(numpy.random.rand())": "uses numpy.random",
+    "from numpy import random\nprint(random.rand())": "imports numpy.random",
+    'colors = {"red", "green", "blue"}\nprint(colors)': "outputs set order",
+    'colors = {"red", "green"}\nfor color in colors:\n    print(color)': "outputs set order",
+    'colors = {"red", "green"}\nprint(str(colors))': "outputs set order",
+    'colors = {"red", "green"}\nline = f"{colors}"\nprint(line)': "outputs set order",
+    'print(", ".join({"red", "green"}))': "outputs set order",
+    'colors = set(["red", "green"])\nnames = [c.upper() for c in colors]\nprint(names)': "outputs set order",
+}
+for source, reason in flagged.items():
+    if reason not in nondeterminism_reasons(source):
+        print(f"❌ Expected {reason!r} for:\n{source}\ngot {nondeterminism_reasons(source)}")
+        exit(1)
+for source in ["import numpy as np\nprint(np.arange(3))", 'print(sorted({"red", "green"}))', "print({1, 2, 3})",
+               'colors = {"red", "green"}\nprint(len(colors), sorted(c.upper() for c in colors))']:
+    if nondeterminism_reasons(source):
+        print(f"❌ Deterministic code flagged: {source!r} -> {nondeterminism_reasons(source)}")
+        exit(1)
+print("✅ Aliased numpy.random and printed sets of strings are never cached")
+
+print("\n4. LRU + TTL eviction...")
+lru = MemoryCache(max_entries=2, ttl=0.2)
+lru.set("a", 1)
+lru.set("b", 2)
+lru.get("a")
+lru.set("c", 3)
+if lru.get("b") is not None or lru.get("a") != 1:
+    print("❌ Least recently used entry was not evicted")
+    exit(1)
+time.sleep(0.3)
+if lru.get("a") is not None:
+    print("❌ Expired entry was returned")
+    exit(1)
+print("✅ LRU eviction and TTL expiry work")
+
+print("\n5. On-disk tier...")
+path = os.path.join(tempfile.mkdtemp(prefix="codephoenix_cache_"), "results.sqlite")
+SQLiteCache(path).set("key", [True, "out", "", "success"])
+if SQLiteCache(path).get("key") != [True, "out", "", "success"]:
+    print("❌ Disk cache did not persist the entry")
+    exit(1)
+print("✅ SQLite cache survives a new instance")
+tiered = TieredCache(MemoryCache(ttl=0.4), SQLiteCache(path, ttl=0.4))
+tiered.disk.set("aging", "value")
+time.sleep(0.25)
+if tiered.get("aging") != "value":
+    print("❌ Disk hit was not served")
+    exit(1)
+time.sleep(0.25)
+if tiered.get("aging") is not None:
+    print("❌ Entry promoted from disk outlived its disk TTL")
+    exit(1)
+print("✅ Entries promoted from disk keep their original age")
+
+print("\n🎉 Test 13 PASSED - Result cache works!")
@@ -0,0 +1,121 @@
+"""
+Test 14: Dependency Detection for Sandbox Snapshots
+Checks that third-party imports are detected from the AST and mapped to pip
+packages, and that dependency sets map to stable snapshot names / prebuilt
+snapshots, and that a missing snapshot is built in the background without
+blocking the run. Offline - the "build" is a stand-in client.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+os.environ["DEPENDENCY_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "snapshots.sqlite")
+
+print("="*60)
+print("TEST 14: Dependency Detection")
+print("="*60)
+
+from backend import config
+from backend import dependencies
+from backend.dependencies import find_prebuilt, required_packages, resolve_snapshot, snapshot_name
+
+code = """
+import os, json
+import numpy as np
+import pandas
+from sklearn.linear_model import LinearRegression
+from PIL import Image
+import yaml
+from collections import Counter
+from . import helpers
+"""
+
+print("\n1. Import detection...")
+packages = required_packages([code])
+expected = ["numpy", "pandas", "pillow", "pyyaml", "scikit-learn"]
+if packages != expected:
+    print(f"❌ Expected {expected}, got {packages}")
+    exit(1)
+print(f"✅ Detected packages: {', '.join(packages)}")
+
+if required_packages(["import math\nprint(math.pi)"]):
+    print("❌ Standard library imports should not need packages")
+    exit(1)
+print("✅ Standard library imports ignored")
+
+print("\n2. Snapshot names...")
+if snapshot_name(["numpy", "pandas"]) != snapshot_name(["pandas", "numpy"]):
+    print("❌ Snapshot name depends on package order")
+    exit(1)
+if snapshot_name(["numpy"]) == snapshot_name(["numpy", "pandas"]):
+    print("❌ Different dependency sets share a snapshot name")
+    exit(1)
+print(f"✅ Stable name per dependency set: {snapshot_name(['numpy', 'pandas'])}")
+
+print("\n3. Prebuilt snapshots...")
+config.PREBUILT_SNAPSHOTS = {
+    "datasci-large": ["numpy", "pandas", "scipy", "matplotlib"],
+    "datasci-small": ["numpy", "pandas"],
+}
+if find_prebuilt(["numpy"]) != "datasci-small" or find_prebuilt(["scipy"]) != "datasci-large":
+    print("❌ Expected the smallest prebuilt snapshot that covers the packages")
+    exit(1)
+if find_prebuilt(["torch"]) is not None:
+    print("❌ No prebuilt snapshot should cover torch")
+    exit(1)
+print("✅ Smallest covering prebuilt snapshot chosen")
+
+print("\n4. Snapshot builds don't block the run...")
+
+
+class SlowSnapshots:
+    """Stand-in for client.snapshot: builds take `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.built = set()
+        self.creates = 0
+        self.release = threading.Event()
+
+    def get(self, name):
+        if name not in self.built:
+            raise RuntimeError("snapshot not found")
+        return type("Snapshot", (), {"state": "active"})()
+
+    def create(self, params, timeout=None):
+        self.creates += 1
+        self.release.wait(self.delay)
+        self.built.add(params.name)
+
+
+snapshots = SlowSnapshots(delay=30)
+client = type("Client", (), {"snapshot": snapshots})()
+started = time.perf_counter()
+first = resolve_snapshot(client, ["torch"])
+elapsed = time.perf_counter() - started
+if first is not None or elapsed > 1:
+    print(f"❌ Expected None right away while the snapshot builds, got {first!r} after {elapsed:.2f}s")
+    exit(1)
+second = resolve_snapshot(client, ["torch"])
+
+
+def wait_until(condition):
+    deadline = time.time() + 5
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+wait_until(lambda: snapshots.creates)
+if second is not None or snapshots.creates != 1 or dependencies.building() != [snapshot_name(["torch"])]:
+    print(f"❌ A second run should use the base image without another build ({snapshots.creates} builds)")
+    exit(1)
+snapshots.release.set()
+wait_until(lambda: not dependencies.building())
+if resolve_snapshot(client, ["torch"]) != snapshot_name(["torch"]):
+    print("❌ The snapshot should be used once its build is done")
+    exit(1)
+print(f"✅ First run used the base image after {elapsed * 1000:.1f} ms; snapshot used once built")
+
+print("\n🎉 Test 14 PASSED - Dependency detection works!")
@@ -0,0 +1,61 @@
+"""
+Test 15: Per-Execution Resource Metrics
+Checks that execute_code(return_metrics=True) reports phase timings,
+in-sandbox CPU time, peak RSS and output byte counts.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+print("="*60)
+print("TEST 15: Execution Metrics")
+print("="*60)
+
+from backend.executor import execute_code, stream_code
+
+code = """
+data = bytearray(150 * 1024 * 1024)   # ~150MB resident
+total = 0
+for i in range(3_000_000):             # some CPU work
+    total += i % 7
+print(f"total={total} ✓")
+"""
+
+print("\n1. Metrics from execute_code...")
+success, output, error, error_type, metrics = execute_code(
+    code, "test_metrics.py", backend="local", use_cache=False, return_metrics=True
+)
+print(f"   {metrics}")
+if not success:
+    print(f"❌ Execution failed: {error}")
+    exit(1)
+
+for phase in ("create", "run", "parse", "delete"):
+    if phase not in metrics["phases_ms"]:
+        print(f"❌ Missing phase timing: {phase}")
+        exit(1)
+print(f"✅ Phase timings: {metrics['phases_ms']}")
+
+if not metrics["cpu_seconds"] or metrics["cpu_seconds"] < 0.05:
+    print(f"❌ CPU time not measured: {metrics['cpu_seconds']}")
+    exit(1)
+print(f"✅ CPU time: {metrics['cpu_seconds']:.3f}s")
+
+if not metrics["peak_rss_mb"] or metrics["peak_rss_mb"] < 150:
+    print(f"❌ Peak RSS should reflect the 150MB buffer: {metrics['peak_rss_mb']}")
+    exit(1)
+print(f"✅ Peak RSS: {metrics['peak_rss_mb']:.0f} MB")
+
+if metrics["stdout_bytes"] != len(output.encode("utf-8")):
+    print(f"❌ stdout_bytes {metrics['stdout_bytes']} != {len(output.encode('utf-8'))}")
+    exit(1)
+print(f"✅ Output bytes: {metrics['stdout_bytes']}")
+
+print("\n2. Metrics event from stream_code...")
+events = list(stream_code("print('hi')", "test_metrics_stream.py", backend="local",
+                          use_cache=False, return_metrics=True))
+kinds = [event for event, _ in events]
+if kinds[-2:] != ["metrics", "result"]:
+    print(f"❌ Expected a metrics event before the result, got {kinds}")
+    exit(1)
+print(f"✅ Stream metrics: {events[-2][1]['phases_ms']}")
+
+print("\n🎉 Test 15 PASSED - Execution metrics work!")
@@ -0,0 +1,81 @@
+"""
+Test 16: Background Sandbox Teardown
+Checks that the lifecycle manager deletes retired sandboxes off the caller's
+thread, retries failed deletes, and reaps labelled orphans - only those whose
+owner is gone, or that another host abandoned long ago.
+Offline - stand-in sandboxes and client (fakes.py), no Daytona calls.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+print("="*60)
+print("TEST 16: Background Sandbox Teardown")
+print("="*60)
+
+from backend.sandbox_lifecycle import (HOST_LABEL, HOSTNAME, INSTANCE_LABEL, LABELS, PID_LABEL,
+                                       LifecycleManager, sandbox_labels)
+from fakes import FakeDaytona, FakeSandbox
+
+print("\n1. Retire returns immediately...")
+manager = LifecycleManager(lambda: None, max_attempts=3, retry_delay=0.05, orphan_ttl=0)
+manager.start()
+slow = FakeSandbox("slow", delete_delay=0.5)
+start = time.perf_counter()
+manager.retire(slow)
+elapsed = time.perf_counter() - start
+if elapsed > 0.05:
+    print(f"❌ retire() blocked for {elapsed:.2f}s")
+    exit(1)
+print(f"✅ retire() returned in {elapsed * 1000:.2f}ms")
+
+print("\n2. Failed deletes are retried...")
+flaky = FakeSandbox("flaky", delete_failures=2)
+hopeless = FakeSandbox("hopeless", delete_failures=10)
+manager.retire(flaky)
+manager.retire(hopeless)
+if not manager.drain(timeout=10):
+    print("❌ Deletes still pending")
+    exit(1)
+stats = manager.stats()
+if not (slow.deleted and flaky.deleted) or hopeless.deleted or stats["failed"] != 1:
+    print(f"❌ Unexpected outcome: {stats}")
+    exit(1)
+print(f"✅ Flaky delete succeeded on retry, hopeless one left to the reaper: {stats}")
+
+print("\n3. Orphans are reaped...")
+# A pid that surely isn't running: spawn a process and wait for it to exit
+dead = subprocess.Popen([sys.executable, "-c", "pass"])
+dead.wait()
+recent = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+ancient = (datetime.now(timezone.utc) - timedelta(days=3)).isoformat()
+here = {HOST_LABEL: HOSTNAME}
+live = FakeSandbox("live", labels=sandbox_labels(), last_activity_at=recent)
+own_lost = FakeSandbox("own_lost", labels=sandbox_labels(), last_activity_at=recent)
+crashed = FakeSandbox("crashed", labels=dict(here, **{INSTANCE_LABEL: "crashed", PID_LABEL: str(dead.pid)}),
+                      last_activity_at=recent)
+sibling = FakeSandbox("sibling", labels=dict(here, **{INSTANCE_LABEL: "sibling", PID_LABEL: str(os.getppid())}),
+                      last_activity_at=recent)
+remote = FakeSandbox("remote", labels={HOST_LABEL: "elsewhere", INSTANCE_LABEL: "remote", PID_LABEL: "1"},
+                     last_activity_at=recent)
+abandoned = FakeSandbox("abandoned", labels={HOST_LABEL: "elsewhere", INSTANCE_LABEL: "old", PID_LABEL: "1"},
+                        last_activity_at=ancient)
+client = FakeDaytona([live, own_lost, crashed, sibling, remote, abandoned])
+reaper = LifecycleManager(lambda: client, retry_delay=0.05, orphan_ttl=3600, foreign_ttl=24 * 3600)
+reaper.track(live)
+reaped = reaper.reap_orphans()
+reaper.start()
+reaper.drain(timeout=10)
+deleted = sorted(sandbox.id for sandbox in client.created if sandbox.deleted)
+if reaped != 3 or deleted != ["abandoned", "crashed", "own_lost"]:
+    print(f"❌ Expected our lost, the crashed and the abandoned sandbox to be reaped, got {deleted}")
+    exit(1)
+if client.queries[0].labels != LABELS:
+    print(f"❌ Reaper should select on {LABELS}, used {client.queries[0].labels}")
+    exit(1)
+print("✅ Reaped: own untracked, dead owner, long-abandoned; kept: tracked, live sibling, recent remote")
+
+print("\n🎉 Test 16 PASSED - Background teardown works!")
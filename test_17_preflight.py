@@ -0,0 +1,61 @@
+"""
+Test 17: Local Pre-flight Checks
+Checks that syntax errors, undefined names / missing imports and define-only
+code are reported without running anything, and that valid code still runs.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+print("="*60)
+print("TEST 17: Pre-flight Checks")
+print("="*60)
+
+from backend.executor import execute_batch, execute_code
+from backend.preflight import check_code
+
+print("\n1. Doomed code is caught...")
+cases = [
+    ("def broken(:\n    pass", "crash", "SyntaxError"),
+    ("total = 3\nprint(totl)", "crash", "name 'totl' is not defined"),
+    ("print(math.sqrt(2))", "crash", "(import math)"),
+    ("values = np.arange(3)\nprint(values)", "crash", "(import numpy as np)"),
+    ("def fibonacci(n):\n    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)", "silent_failure", "no output"),
+]
+for code, expected_type, expected_text in cases:
+    problem = check_code(code, "test_preflight.py")
+    if problem is None or problem[0] != expected_type or expected_text not in problem[1]:
+        print(f"❌ Expected {expected_type} mentioning {expected_text!r} for {code!r}, got {problem}")
+        exit(1)
+    print(f"✅ {expected_type}: {problem[1].strip().splitlines()[-1]}")
+
+print("\n2. Valid code passes...")
+valid = [
+    "def square(x):\n    return x * x\nprint(square(4))",
+    "from os import *\nprint(getcwd())",
+    "import numpy as np\nvalues = np.ones(3)",
+    "def lookup(d):\n    return d['missing']\nlookup({})",
+    "x = 10 / 0",
+    "try:\n    pass\nexcept ValueError as e:\n    print(e)\nprint([y for y in range(3) if (z := y)], z)",
+]
+for code in valid:
+    problem = check_code(code)
+    if problem is not None:
+        print(f"❌ False alarm for {code!r}: {problem}")
+        exit(1)
+print(f"✅ {len(valid)} valid scripts left alone (they may still fail at runtime)")
+
+print("\n3. execute_code short-circuits without a sandbox...")
+success, output, error, error_type, metrics = execute_code(
+    "print(undefined_total)", "test_preflight.py", backend="local", return_metrics=True
+)
+if error_type != "crash" or not metrics["preflight"] or "run" in metrics["phases_ms"]:
+    print(f"❌ Expected a pre-flight crash with no run phase, got {error_type}: {metrics}")
+    exit(1)
+print(f"✅ Reported in {metrics['total_ms']:.2f}ms, phases: {metrics['phases_ms']}")
+
+results = execute_batch(["print('ran')", "def only_defines():\n    return 1"], backend="local")
+if [r[3] for r in results] != ["success", "silent_failure"]:
+    print(f"❌ Unexpected batch results: {results}")
+    exit(1)
+print("✅ Batch runs only the scripts that pass pre-flight")
+
+print("\n🎉 Test 17 PASSED - Pre-flight checks work!")
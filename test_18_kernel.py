@@ -0,0 +1,85 @@
+"""
+Test 18: Fork-Server Kernel
+Checks that the local backend forks jobs from a resident kernel that has
+KERNEL_PRELOAD already imported, that jobs can't leak state into each other,
+that timeouts still kill the job, and compares per-run latency with a fresh
+interpreter. Uses the local backend - no network or Daytona account needed.
+"""
+
+import os
+import time
+
+# A stdlib module the wrapper itself never imports, so finding it loaded proves the preload
+os.environ["KERNEL_PRELOAD"] = "decimal"
+
+print("="*60)
+print("TEST 18: Fork-Server Kernel")
+print("="*60)
+
+from backend import config, kernel
+from backend.execution_backends import get_backend
+from backend.executor import execute_code
+
+backend = get_backend("local")
+backend.prepare()
+local_kernel = kernel.get_local_kernel(config.KERNEL_PRELOAD, {})
+deadline = time.time() + 30
+while not local_kernel.ready and time.time() < deadline:
+    time.sleep(0.05)
+if not local_kernel.ready:
+    print("❌ Local kernel never became ready")
+    exit(1)
+print("✅ Local kernel ready")
+
+print("\n1. Jobs start with the preloaded modules...")
+success, output, error, error_type = execute_code(
+    "import sys\nprint('decimal' in sys.modules)", "test_kernel_preload.py", backend="local", use_cache=False
+)
+if output.strip() != "True":
+    print(f"❌ Expected decimal to be preloaded, got {output!r} {error}")
+    exit(1)
+print("✅ decimal already imported when the script starts")
+
+print("\n2. Jobs don't leak state...")
+execute_code("import json\njson.leaked = True\nprint('set')", "test_kernel_leak.py", backend="local", use_cache=False)
+success, output, error, error_type = execute_code(
+    "import json\nprint(hasattr(json, 'leaked'))", "test_kernel_leak_check.py", backend="local", use_cache=False
+)
+if output.strip() != "False":
+    print(f"❌ State leaked between jobs: {output!r}")
+    exit(1)
+print("✅ Each job is a fresh fork")
+
+print("\n3. Timeouts still kill the job...")
+start = time.time()
+try:
+    backend.run("import time\ntime.sleep(30)", timeout=1)
+    print("❌ Expected a timeout")
+    exit(1)
+except TimeoutError as e:
+    print(f"✅ {e} (after {time.time() - start:.1f}s)")
+
+print("\n4. Per-run latency, kernel vs fresh interpreter...")
+code = "import decimal\nprint(decimal.Decimal('1.1') + decimal.Decimal('2.2'))"
+
+
+def measure(runs=5):
+    timings = []
+    for _ in range(runs):
+        _, _, _, _, metrics = execute_code(code, "test_kernel_bench.py", backend="local",
+                                           use_cache=False, return_metrics=True)
+        timings.append(metrics["phases_ms"]["create"] + metrics["phases_ms"]["run"])
+    return sorted(timings)[len(timings) // 2]
+
+
+kernel_ms = measure()
+config.KERNEL_ENABLED = False
+subprocess_ms = measure()
+config.KERNEL_ENABLED = True
+print(f"   kernel: {kernel_ms:.1f}ms   fresh interpreter: {subprocess_ms:.1f}ms")
+if kernel_ms >= subprocess_ms:
+    print("❌ Kernel should be faster than starting an interpreter")
+    exit(1)
+print(f"✅ {subprocess_ms / kernel_ms:.1f}x faster per run")
+
+print("\n🎉 Test 18 PASSED - Fork-server kernel works!")
@@ -0,0 +1,95 @@
+"""
+Test 19: Generation Cache
+Checks that identical prompts (ignoring whitespace) are answered from the
+generation cache with zero tokens and cost, that a different system prompt
+or model misses, that hits/misses are counted in the metrics, and that a
+generation whose code failed is evicted.
+Uses a stand-in OpenAI client (fakes.py) - no network or API key needed.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["GENERATION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "generations.sqlite")
+
+print("="*60)
+print("TEST 19: Generation Cache")
+print("="*60)
+
+from backend import generator
+from fakes import FakeCompletions, fake_openai
+
+
+# Answers every prompt with a fenced script that says which call it came from
+completions = FakeCompletions(lambda messages: f"```python\nprint('answer {completions.calls}')\n```",
+                              prompt_tokens=120, completion_tokens=30)
+generator.client = fake_openai(completions)
+
+print("\n1. Cache key normalization...")
+key = generator.generation_cache_key("Sort a list of numbers")
+if generator.generation_cache_key("  Sort a list\n of   numbers ") != key:
+    print("❌ Whitespace changes should not change the key")
+    exit(1)
+if (generator.generation_cache_key("Sort a list of numbers", system_prompt="Be terse.") == key
+        or generator.generation_cache_key("Sort a list of numbers", model="gpt-4o-mini") == key
+        or generator.generation_cache_key("Sort a list of numbers", params={"temperature": 0}) == key):
+    print("❌ System prompt, model and parameters must be part of the key")
+    exit(1)
+print("✅ Key ignores whitespace, includes system prompt / model / params")
+
+print("\n2. First request calls the LLM...")
+code, metrics = generator.generate_code("Sort a list of numbers")
+if completions.calls != 1 or metrics["cached"] or metrics["estimated_cost"] == 0:
+    print(f"❌ Expected an LLM call, got {metrics}")
+    exit(1)
+print(f"✅ Miss: {metrics['total_tokens']} tokens, ${metrics['estimated_cost']}")
+
+print("\n3. Repeat request is served from cache...")
+cached_code, cached_metrics = generator.generate_code("  Sort a list of numbers\n")
+if completions.calls != 1 or cached_code != code:
+    print(f"❌ Expected the cached code without an LLM call ({completions.calls} calls)")
+    exit(1)
+if (not cached_metrics["cached"] or cached_metrics["total_tokens"] != 0
+        or cached_metrics["estimated_cost"] != 0 or cached_metrics["latency_ms"] > 50):
+    print(f"❌ Hit should report zero tokens/cost and near-zero latency, got {cached_metrics}")
+    exit(1)
+if cached_metrics["cache_hits"] - metrics["cache_hits"] != 1:
+    print(f"❌ Hit counter didn't move: {metrics} -> {cached_metrics}")
+    exit(1)
+print(f"✅ Hit in {cached_metrics['latency_ms']}ms, $0, hits={cached_metrics['cache_hits']} "
+      f"misses={cached_metrics['cache_misses']}")
+
+print("\n4. Disk tier survives a restart of the memory tier...")
+generator.get_generation_cache().memory.clear()
+generator.generate_code("Sort a list of numbers")
+if completions.calls != 1:
+    print("❌ Expected the SQLite tier to answer")
+    exit(1)
+print("✅ Served from SQLite")
+
+print("\n5. use_cache=False always calls the LLM...")
+generator.generate_code("Sort a list of numbers", use_cache=False)
+if completions.calls != 2:
+    print("❌ Expected a fresh LLM call")
+    exit(1)
+print(f"✅ Bypassed, stats: {generator.generation_cache_stats()}")
+
+print("\n6. Code that fails is dropped from the cache...")
+cached_code, cached_metrics = generator.generate_code("Sort a list of numbers")
+generator.record_result(cached_metrics, cached_code, True)
+generator.generate_code("Sort a list of numbers")
+if completions.calls != 2:
+    print("❌ Code that ran successfully should stay cached")
+    exit(1)
+generator.record_result(cached_metrics, cached_code, False)
+fresh_code, fresh_metrics = generator.generate_code("Sort a list of numbers")
+if completions.calls != 3 or fresh_metrics["cached"] or fresh_code == cached_code:
+    print(f"❌ Expected a fresh generation after the cached code failed ({completions.calls} calls)")
+    exit(1)
+if not generator.generate_code("Sort a list of numbers")[1]["cached"]:
+    print("❌ The new generation should be cached")
+    exit(1)
+print("✅ Failed generation evicted; the next request calls the LLM and caches the new code")
+
+print("\n🎉 Test 19 PASSED - Generation cache works!")
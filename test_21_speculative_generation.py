@@ -0,0 +1,109 @@
+"""
+Test 21: Speculative Candidates
+Checks that generate_candidates asks for N completions in one request, and
+that execute_first_success returns the first candidate that succeeds without
+waiting for slower ones, which are killed and give back their sandboxes.
+Offline - stand-in OpenAI client, local execution backend, stand-in Daytona
+client whose sandboxes run the wrapper locally (fakes.py).
+"""
+
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 21: Speculative Candidates")
+print("="*60)
+
+from backend import config, generator, sandbox_pool
+from backend.execution_backends import DaytonaBackend
+from backend.executor import execute_first_success
+from backend.sandbox_pool import SandboxPool
+from fakes import FakeCompletions, FakeDaytona, fake_openai
+
+CANDIDATES = [
+    "```python\nimport time\ntime.sleep(3)\nprint('slow but fine')\n```",
+    "print(undefined_total)",
+    "```python\nprint(sum(range(10)))\n```",
+    "print(sum(range(10)))",
+]
+
+completions = FakeCompletions(CANDIDATES, completion_tokens=40)
+generator.client = fake_openai(completions)
+
+print("\n1. N candidates from one request...")
+codes, metrics = generator.generate_candidates("Sum the numbers below ten", n=4)
+requested = [request.n for request in completions.requests]
+if requested != [4] or len(codes) != 3 or metrics["candidates"] != 3:
+    print(f"❌ Expected one n=4 request and 3 distinct candidates: {requested} {codes}")
+    exit(1)
+if any("```" in code for code in codes):
+    print(f"❌ Fences not stripped: {codes}")
+    exit(1)
+print(f"✅ {metrics['candidates']} distinct candidates, {metrics['completion_tokens']} output tokens, "
+      f"${metrics['estimated_cost']}")
+
+print("\n2. First success wins the race...")
+started = time.time()
+winner, results = execute_first_success(codes, backend="local")
+elapsed = time.time() - started
+if winner != 2 or results[2][1].strip() != "45":
+    print(f"❌ Expected candidate 2 to win, got {winner}: {results}")
+    exit(1)
+if elapsed > 2.5:
+    print(f"❌ Waited {elapsed:.1f}s - the slow candidate held up the race")
+    exit(1)
+print(f"✅ Candidate {winner} won in {elapsed:.2f}s (slow candidate not awaited: {results[0]})")
+
+print("\n3. No winner when every candidate fails...")
+winner, results = execute_first_success(["print(missing)", "raise SystemExit(3)"], backend="local")
+if winner is not None or [r[3] for r in results] != ["crash", "crash"]:
+    print(f"❌ Expected no winner and two crashes: {winner} {results}")
+    exit(1)
+print("✅ All results returned for the fixer")
+
+
+
+def running_in(work_dir):
+    """Processes whose working directory is inside work_dir."""
+    found = []
+    for pid in os.listdir("/proc"):
+        try:
+            if pid.isdigit() and os.readlink(f"/proc/{pid}/cwd").startswith(work_dir):
+                found.append(pid)
+        except OSError:
+            pass
+    return found
+
+
+print("\n4. Losers are killed and release their sandboxes...")
+client = FakeDaytona()
+pool = SandboxPool(lambda: client, image=config.SANDBOX_IMAGE, min_size=0, max_size=2)
+# The base pool execute_code leases from, backed by the stand-in client
+sandbox_pool._pools[None] = pool
+kernel_enabled = config.KERNEL_ENABLED
+config.KERNEL_ENABLED = False
+try:
+    started = time.time()
+    winner, results = execute_first_success(
+        ["import time\ntime.sleep(30)\nprint('too late')", "import time\ntime.sleep(0.5)\nprint('first')"],
+        backend=DaytonaBackend(),
+    )
+    elapsed = time.time() - started
+finally:
+    config.KERNEL_ENABLED = kernel_enabled
+if winner != 1 or elapsed > 5:
+    print(f"❌ Expected candidate 1 to win quickly, got {winner} after {elapsed:.1f}s: {results}")
+    exit(1)
+if pool.stats()["leased"] != 0:
+    print(f"❌ A loser still holds a sandbox after the race returned: {pool.stats()}")
+    exit(1)
+survivors = [pid for sandbox in client.created for pid in running_in(sandbox.work_dir)]
+if len(client.created) != 2 or survivors:
+    print(f"❌ Expected both candidates' processes gone from 2 sandboxes, still running: {survivors}")
+    exit(1)
+print(f"✅ Candidate {winner} won in {elapsed:.2f}s; slow loser killed, 0 sandboxes leased: {pool.stats()}")
+pool.shutdown()
+
+print("\n🎉 Test 21 PASSED - Speculative candidates work!")
@@ -0,0 +1,126 @@
+"""
+Test 22: Shared LLM Client
+Checks that the generator and the fixer share one OpenAI client, that
+sequential and concurrent calls (sync and async) reuse pooled keep-alive
+connections instead of opening new ones, and compares with a fresh client
+per call. Offline - talks to a local stand-in of the chat completions API.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """Answers every chat completion with a tiny script; counts connections opened."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    opened = 0
+
+    def setup(self):
+        FakeOpenAI.opened += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.05)
+        body = json.dumps({
+            "id": "chatcmpl-test", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "print('hello')"}}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 22: Shared LLM Client")
+print("="*60)
+
+from openai import OpenAI
+from backend import fixer, generator, llm_client
+
+
+def connections(action):
+    """New connections the server saw while running action()."""
+    before = FakeOpenAI.opened
+    action()
+    return FakeOpenAI.opened - before
+
+
+print("\n1. One client for the generator and the fixer...")
+if generator.client is not fixer.client or generator.client is not llm_client.get_client():
+    print("❌ generator and fixer should use llm_client's shared client")
+    exit(1)
+print(f"✅ Shared (HTTP/2: {llm_client._http_options()['http2']})")
+
+print("\n2. Sequential calls reuse one connection...")
+fresh = connections(lambda: [OpenAI().chat.completions.create(model="gpt-4o", messages=[])
+                             for _ in range(10)])
+shared = connections(lambda: [generator.generate_code(f"task {i}", use_cache=False) for i in range(10)])
+if shared != 1:
+    print(f"❌ Expected 1 connection for 10 calls, saw {shared}")
+    exit(1)
+print(f"✅ 10 calls: {shared} connection shared vs {fresh} with a fresh client per call")
+
+print("\n3. Concurrent generate + fix calls share the pool...")
+
+
+def mixed_threads():
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        jobs = [pool.submit(generator.generate_code, f"task {i}", False) for i in range(3)]
+        jobs += [pool.submit(fixer.fix_code, "print(x)", "NameError") for _ in range(3)]
+        for job in jobs:
+            job.result()
+
+
+connections(mixed_threads)
+reused = connections(mixed_threads)
+if reused != 0:
+    print(f"❌ Second round opened {reused} new connections")
+    exit(1)
+print("✅ Second round of 6 concurrent calls opened no new connections")
+
+print("\n4. Async generate + fix on the shared AsyncOpenAI client...")
+
+
+async def mixed_async():
+    if llm_client.get_async_client() is not llm_client.get_async_client():
+        raise AssertionError("expected one async client per loop")
+    calls = [generator.generate_code_async(f"task {i}", use_cache=False) for i in range(3)]
+    calls += [fixer.fix_code_async("print(x)", "NameError") for _ in range(3)]
+    results = await asyncio.gather(*calls)
+    started = time.perf_counter()
+    before = FakeOpenAI.opened
+    await asyncio.gather(*[generator.generate_code_async(f"task {i}", use_cache=False) for i in range(6)])
+    return results, FakeOpenAI.opened - before, time.perf_counter() - started
+
+
+results, new_connections, elapsed = asyncio.run(mixed_async())
+if results[0][0] != "print('hello')" or results[-1] != "print('hello')":
+    print(f"❌ Unexpected async results: {results}")
+    exit(1)
+if new_connections != 0 or elapsed > 0.25:
+    print(f"❌ Expected 6 concurrent calls over pooled connections, "
+          f"saw {new_connections} new in {elapsed:.2f}s")
+    exit(1)
+print(f"✅ 6 concurrent awaits in {elapsed * 1000:.0f}ms over pooled connections")
+
+server.shutdown()
+print("\n🎉 Test 22 PASSED - Shared LLM client works!")
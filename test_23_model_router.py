@@ -0,0 +1,92 @@
+"""
+Test 23: Model Routing
+Checks that easy prompts go to the fast tier and hard ones to gpt-4o, that
+fast-tier failures and repeated fixes escalate, that past outcomes steer
+later routing, and that per-tier latency and cost land in the metrics.
+Offline - stand-in OpenAI client (fakes.py).
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["GENERATION_CACHE_ENABLED"] = "false"
+
+print("="*60)
+print("TEST 23: Model Routing")
+print("="*60)
+
+from backend import config, fixer, generator, model_router
+from fakes import FakeCompletions, fake_openai
+
+
+completions = FakeCompletions("print('hello world')", prompt_tokens=1000, completion_tokens=1000)
+fake_client = fake_openai(completions)
+generator.client = fake_client
+fixer.client = fake_client
+FAST, STRONG = config.ROUTER_FAST_MODEL, config.ROUTER_STRONG_MODEL
+
+print("\n1. Difficulty decides the first try...")
+cases = [
+    ("generate", "Print hello world", FAST),
+    ("generate", "Implement Dijkstra's shortest path algorithm on a weighted graph", STRONG),
+    ("generate", "Write a program that " + "does one more small thing and " * 15 + "prints it", STRONG),
+    ("fix", "print(x)\nNameError: name 'x' is not defined", FAST),
+    ("fix", "\n".join(f"print({i})" for i in range(100)), STRONG),
+]
+for task, text, expected in cases:
+    model, reason = model_router.route(task, text)
+    if model != expected:
+        print(f"❌ {task} {text[:40]!r} went to {model} ({reason}), expected {expected}")
+        exit(1)
+    print(f"✅ {task} {text[:40]!r} -> {model} ({reason})")
+
+print("\n2. Escalation...")
+if model_router.route("fix", "print(x)", failed_model=FAST)[0] != STRONG:
+    print("❌ Fixing fast-tier code should escalate")
+    exit(1)
+if model_router.route("fix", "print(x)", attempt=2, failed_model=STRONG)[0] != STRONG:
+    print("❌ A repeated fix should escalate")
+    exit(1)
+print("✅ Fast-tier failures and repeated fixes go to the strong tier")
+
+print("\n3. Past outcomes steer routing...")
+model_router.record_outcome("generate", "Print hello world", FAST, False)
+if model_router.route("generate", "  Print  hello world ")[0] != STRONG:
+    print("❌ A prompt the fast tier failed should go to the strong tier")
+    exit(1)
+for i in range(config.ROUTER_MIN_SAMPLES):
+    model_router.record_outcome("generate", f"Print the number {i}", FAST, i % 2 == 0)
+model, reason = model_router.route("generate", "Print the number 99")
+if model != STRONG or "success rate" not in reason:
+    print(f"❌ Low fast-tier success rate should route to the strong tier, got {model} ({reason})")
+    exit(1)
+print(f"✅ Repeat prompt escalated; new prompt escalated too ({reason})")
+model_router.reset_stats()
+
+print("\n4. Calls record per-tier latency and cost...")
+code, metrics = generator.generate_code("Print a greeting")
+fixed, fix_metrics = fixer.fix_code(code, "Code produced no output", failed_model=metrics["model"],
+                                    return_metrics=True)
+if completions.models[-2:] != [FAST, STRONG] or metrics["tier"] != "fast" or fix_metrics["tier"] != "strong":
+    print(f"❌ Expected fast generation then strong fix: {completions.models} {metrics} {fix_metrics}")
+    exit(1)
+fast_cost, strong_cost = metrics["estimated_cost"], fix_metrics["estimated_cost"]
+if not 0 < fast_cost < strong_cost:
+    print(f"❌ Fast tier should be cheaper: {fast_cost} vs {strong_cost}")
+    exit(1)
+tiers = fix_metrics["tiers"]
+if tiers["fast"]["calls"] < 1 or tiers["strong"]["calls"] < 1 or tiers["fast"]["avg_latency_ms"] is None:
+    print(f"❌ Missing per-tier totals: {tiers}")
+    exit(1)
+print(f"✅ Generation ${fast_cost} on {metrics['model']}, fix ${strong_cost} on {fix_metrics['model']}")
+print(f"   Tiers: {tiers}")
+
+print("\n5. Disabled router always uses the strong tier...")
+config.ROUTER_ENABLED = False
+if model_router.route("generate", "Print hello world")[0] != STRONG:
+    print("❌ Expected the strong tier")
+    exit(1)
+config.ROUTER_ENABLED = True
+print("✅ ROUTER_ENABLED=false -> strong tier")
+
+print("\n🎉 Test 23 PASSED - Model routing works!")
@@ -0,0 +1,120 @@
+"""
+Test 24: Fix Context Compression
+Checks that deep tracebacks are pruned (library frames, recursion), that
+definitions off the failing stack become stubs that are restored after the
+fix, that the token budget is respected, and that fix_code sends a smaller
+prompt but returns the whole program.
+Offline - stand-in OpenAI client (fakes.py).
+"""
+
+import os
+import re
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 24: Fix Context Compression")
+print("="*60)
+
+from backend import fix_context, fixer
+from fakes import FakeCompletions, fake_openai
+
+HELPERS = "\n".join(
+    f"def helper_{i}(values):\n    '''Scale values by {i}.'''\n    scaled = [v * {i} for v in values]\n    return sum(scaled)\n"
+    for i in range(80)
+)
+PROGRAM = "import json\n\n" + HELPERS + """
+def load(text):
+    return json.loads(text)
+
+def main():
+    print(helper_2([1, 2, 3]))
+    print(load("{broken"))
+
+main()
+"""
+LIB = "/usr/lib/python3.11/json"
+SOURCE = PROGRAM.splitlines()
+FAILING_CALL = '    print(load("{broken"))'
+TRACEBACK = "\n".join([
+    "Traceback (most recent call last):",
+    f'  File "script.py", line {SOURCE.index("main()") + 1}, in <module>',
+    f'  File "script.py", line {SOURCE.index(FAILING_CALL) + 1}, in main',
+    f'  File "script.py", line {SOURCE.index("    return json.loads(text)") + 1}, in load',
+    f'  File "{LIB}/__init__.py", line 346, in loads',
+    f'  File "{LIB}/decoder.py", line 337, in decode',
+    f'  File "{LIB}/decoder.py", line 353, in raw_decode',
+    "json.decoder.JSONDecodeError: Expecting property name enclosed in double quotes: line 1 column 2 (char 1)",
+])
+
+print("\n1. Traceback pruning...")
+recursion = "\n".join(["Traceback (most recent call last):", '  File "script.py", line 9, in <module>']
+                      + ['  File "script.py", line 2, in a\n  File "script.py", line 4, in b'] * 400
+                      + ["RecursionError: maximum recursion depth exceeded"])
+pruned = fix_context.compress_traceback(recursion)
+if "repeated 399 more times" not in pruned or not pruned.endswith("maximum recursion depth exceeded"):
+    print(f"❌ Recursion not collapsed:\n{pruned}")
+    exit(1)
+pruned_lib = fix_context.compress_traceback(TRACEBACK)
+if "decoder.py\", line 337" in pruned_lib or "raw_decode" not in pruned_lib or "2 library frame" not in pruned_lib:
+    print(f"❌ Expected inner library frames collapsed, raising frame kept:\n{pruned_lib}")
+    exit(1)
+print(f"✅ Recursion: {fix_context.count_tokens(recursion)} -> {fix_context.count_tokens(pruned)} tokens")
+print(f"✅ Library frames collapsed, raising frame kept")
+
+print("\n2. Code slicing keeps the failing stack...")
+lines, functions = fix_context.failing_locations(TRACEBACK)
+sliced, kept = fix_context.slice_code(PROGRAM, lines, functions)
+if "def load(text):\n    return json.loads(text)" not in sliced or "def main():" not in sliced or len(kept) != 80:
+    print(f"❌ Expected load/main in full and 80 stubs, got {len(kept)} stubs")
+    exit(1)
+if fix_context.restore(sliced, kept) != PROGRAM:
+    print("❌ restore() should give back the original program")
+    exit(1)
+print(f"✅ {len(kept)} helpers stubbed, load/main kept, restore() round-trips")
+
+print("\n3. Budget...")
+small = fix_context.compress("print(x)", "NameError: name 'x' is not defined")
+if small.compressed or small.code != "print(x)":
+    print("❌ Small context should be left alone")
+    exit(1)
+context = fix_context.compress(PROGRAM, "noise line\n" * 2000 + TRACEBACK, budget=1500)
+if context.tokens_after > 1500 or "JSONDecodeError" not in context.error:
+    print(f"❌ Over budget or lost the exception: {context.stats()}")
+    exit(1)
+print(f"✅ {context.tokens_before} -> {context.tokens_after} tokens, exception line kept")
+# Line numbers in the traceback now refer to the sliced code the model sees
+sliced_source = context.code.splitlines()
+for original, renumbered in zip(re.findall(r'"script.py", line (\d+)', TRACEBACK),
+                                re.findall(r'"script.py", line (\d+)', context.error)):
+    shown = sliced_source[int(renumbered) - 1] if int(renumbered) <= len(sliced_source) else None
+    if shown != SOURCE[int(original) - 1]:
+        print(f"❌ Traceback line {original} became {renumbered}, which is {shown!r} in the sliced code")
+        exit(1)
+if len(re.findall(r'"script.py", line', context.error)) != 3:
+    print(f"❌ Expected the 3 script frames to survive:\n{context.error}")
+    exit(1)
+print("✅ Traceback line numbers match the sliced code")
+
+print("\n4. fix_code sends the small context, returns the whole program...")
+
+
+def fix_prompt_code(messages):
+    """The prompt's code with the bug fixed (stub lines copied as instructed)."""
+    code = re.search(r"```python\n(.*?)```", messages[-1]["content"], re.S).group(1)
+    return "```python\n" + code.replace('load("{broken")', 'load(\'{"ok": true}\')') + "```"
+
+
+completions = FakeCompletions(fix_prompt_code, prompt_tokens=fix_context.count_tokens, completion_tokens=100)
+fixer.client = fake_openai(completions)
+fixed, metrics = fixer.fix_code(PROGRAM, "noise line\n" * 2000 + TRACEBACK, return_metrics=True)
+if fixed.strip() != PROGRAM.replace('load("{broken")', 'load(\'{"ok": true}\')').strip():
+    print("❌ Fixed program should contain every original definition plus the fix")
+    exit(1)
+if "<kept: helper_0>" not in completions.prompts[-1] or metrics["context_tokens_after"] >= metrics["context_tokens_before"]:
+    print(f"❌ Expected a compressed prompt: {metrics}")
+    exit(1)
+print(f"✅ Prompt context {metrics['context_tokens_before']} -> {metrics['context_tokens_after']} tokens, "
+      f"{metrics['context_stubs']} stubs restored")
+
+print("\n🎉 Test 24 PASSED - Fix context compression works!")
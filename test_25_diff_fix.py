@@ -0,0 +1,134 @@
+"""
+Test 25: Diff-Mode Fixes
+Checks that SEARCH/REPLACE blocks and unified diffs are applied (exactly,
+ignoring indentation, or by similarity), that fix_code asks for edits on
+bigger programs and reports the completion tokens saved, and that edits that
+don't apply fall back to a full rewrite.
+Offline - stand-in OpenAI client (fakes.py).
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 25: Diff-Mode Fixes")
+print("="*60)
+
+from backend import fix_context, fixer, patcher
+from fakes import FakeCompletions, fake_openai
+
+REPORT = "".join(f"\ndef section_{i}(rows):\n    return [row * {i} for row in rows]\n" for i in range(15))
+PROGRAM = """def average(values):
+    total = sum(values)
+    return total / len(values)
+""" + REPORT + """
+print(average([]))
+"""
+FIXED = PROGRAM.replace("    return total / len(values)", "    return total / len(values) if values else 0")
+BLOCK = """<<<<<<< SEARCH
+    return total / len(values)
+=======
+    return total / len(values) if values else 0
+>>>>>>> REPLACE"""
+
+print("\n1. Applying edits...")
+patched, stats = patcher.apply_patch(PROGRAM, BLOCK)
+if patched != FIXED or stats["exact"] != 1:
+    print(f"❌ SEARCH/REPLACE should apply exactly: {stats}")
+    exit(1)
+# Model lost the indentation
+patched, stats = patcher.apply_patch(PROGRAM, "<<<<<<< SEARCH\ntotal = sum(values)\nreturn total / len(values)\n"
+                                              "=======\ntotal = sum(values)\nreturn total / len(values) if values else 0\n"
+                                              ">>>>>>> REPLACE")
+if patched != FIXED or stats["fuzzy"] != 1:
+    print(f"❌ Indentation-insensitive match should re-indent the replacement:\n{patched}")
+    exit(1)
+# Model misremembered a line
+patched, _ = patcher.apply_patch(PROGRAM, BLOCK.replace("    return total / len(values)\n=", "    return total / len(value)\n="))
+if patched != FIXED:
+    print("❌ Similar lines should still take the edit")
+    exit(1)
+diff = """```diff
+--- script.py
++++ script.py
+@@ -1,3 +1,3 @@
+ def average(values):
+     total = sum(values)
+-    return total / len(values)
++    return total / len(values) if values else 0
+```"""
+patched, _ = patcher.apply_patch(PROGRAM, diff)
+if patched != FIXED:
+    print("❌ Unified diff should apply")
+    exit(1)
+try:
+    patcher.apply_patch(PROGRAM, BLOCK.replace("return total / len(values)\n=", "raise SystemExit('nothing like this')\n="))
+    print("❌ An edit that matches nothing should raise ValueError")
+    exit(1)
+except ValueError:
+    pass
+# Searches match whole lines only
+code = "max = 10\nx = 1\nprint(x, max)\n"
+patched, how = patcher.apply_edit(code, "x = 1", "x = 2")
+if patched != "max = 10\nx = 2\nprint(x, max)\n" or how != "exact":
+    print(f"❌ 'x = 1' should edit its own line only, not 'max = 10':\n{patched}")
+    exit(1)
+code = "def inner():\n        y = 1\n        return y\n\ndef outer():\n    y = 1\n    return y * 2\n"
+patched, how = patcher.apply_edit(code, "    y = 1", "    y = 3")
+if patched != code.replace("\n    y = 1\n", "\n    y = 3\n") or how != "exact":
+    print(f"❌ An indented search shouldn't match inside a more deeply indented line:\n{patched}")
+    exit(1)
+# Several exact matches: the hint decides, without one the edit is ambiguous
+code = "a = []\nprint(len(a))\nb = []\nprint(len(a))\n"
+patched, how = patcher.apply_edit(code, "print(len(a))", "print(len(b))", hint=4)
+if patched != "a = []\nprint(len(a))\nb = []\nprint(len(b))\n":
+    print(f"❌ The hint should pick the second occurrence:\n{patched}")
+    exit(1)
+if patcher.apply_edit(code, "print(len(a))", "print(len(b))") != (code, None):
+    print("❌ Several matches without a hint should not be applied")
+    exit(1)
+print("✅ Exact, re-indented, similar and unified-diff edits apply; unplaceable or ambiguous edits don't")
+
+
+def scripted(*answers):
+    """Completions answering with the queued replies in order."""
+    completions = FakeCompletions(replies=answers, prompt_tokens=500, completion_tokens=fix_context.count_tokens)
+    fixer.client = fake_openai(completions)
+    return completions
+
+
+ERROR = "ZeroDivisionError: division by zero"
+
+print("\n2. fix_code in diff mode...")
+completions = scripted(BLOCK)
+fixed, metrics = fixer.fix_code(PROGRAM, ERROR, return_metrics=True)
+if fixed != FIXED or metrics["fix_mode"] != "diff" or "SEARCH/REPLACE" not in completions.prompts[0]:
+    print(f"❌ Expected the edit applied in diff mode: {metrics.get('fix_mode')}")
+    exit(1)
+if metrics["completion_tokens_saved"] <= 0:
+    print(f"❌ Expected completion tokens saved: {metrics}")
+    exit(1)
+print(f"✅ {metrics['completion_tokens']} completion tokens instead of ~{metrics['completion_tokens_full_estimate']} "
+      f"({metrics['completion_tokens_saved']} saved)")
+
+print("\n3. Fallback to a full rewrite...")
+completions = scripted(BLOCK.replace("return total / len(values)\n=", "nothing = 'like this'\n="), FIXED)
+fixed, metrics = fixer.fix_code(PROGRAM, ERROR, return_metrics=True)
+if fixed.strip() != FIXED.strip() or metrics["fix_mode"] != "diff_fallback" or len(completions.prompts) != 2:
+    print(f"❌ Expected a second, full-program call: {metrics.get('fix_mode')}, {len(completions.prompts)} calls")
+    exit(1)
+if "SEARCH/REPLACE" in completions.prompts[1]:
+    print("❌ The fallback prompt should ask for the whole program")
+    exit(1)
+print(f"✅ Unappliable edits -> full rewrite ({metrics['completion_tokens_saved']} tokens saved = the wasted attempt)")
+
+print("\n4. Short programs are rewritten in full...")
+completions = scripted("print(1 / 1)")
+fixed, metrics = fixer.fix_code("print(1 / 0)", ERROR, return_metrics=True)
+if fixed != "print(1 / 1)" or metrics["fix_mode"] != "full" or "SEARCH/REPLACE" in completions.prompts[0]:
+    print(f"❌ Expected full mode for a one-liner: {metrics.get('fix_mode')}")
+    exit(1)
+print("✅ One-liner fixed in full mode")
+
+print("\n🎉 Test 25 PASSED - Diff-mode fixes work!")
@@ -0,0 +1,94 @@
+"""
+Test 26: Repair Loop
+Checks that repair() keeps fixing until the code works, carries the failed
+attempts into the next fix, skips running code it has already seen
+(formatting/comment changes included), stops on oscillation, and respects
+the token and time budgets.
+Offline - scripted fixer and executor.
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 26: Repair Loop")
+print("="*60)
+
+from backend.repair_loop import repair
+
+BROKEN = "values = []\nprint(sum(values) / len(values))\n"
+STILL_BROKEN = "values = []\nprint(sum(values) / len(values or None))\n"
+FIXED = "values = []\nprint(sum(values) / len(values) if values else 0)\n"
+ERROR = "ZeroDivisionError: division by zero"
+
+
+class ScriptedFixer:
+    """Hands back the queued fixes in order and remembers what it was asked."""
+
+    def __init__(self, *fixes, tokens=400):
+        self.fixes = list(fixes)
+        self.calls = []
+        self.tokens = tokens
+
+    def __call__(self, code, error, attempt=1, failed_model=None, return_metrics=False):
+        self.calls.append({"code": code, "error": error, "attempt": attempt, "failed_model": failed_model})
+        return self.fixes.pop(0), {"model": "gpt-4o", "tier": "strong", "fix_mode": "full",
+                                   "total_tokens": self.tokens, "estimated_cost": 0.001}
+
+
+def scripted_execute(runs):
+    """Executor that succeeds only for FIXED."""
+    def execute(code, filename):
+        runs.append(code)
+        if code == FIXED:
+            return True, "0\n", "", "success"
+        return False, "", "TypeError: object of type 'NoneType' has no len()", "crash"
+    return execute
+
+
+print("\n1. Fix until it works...")
+runs = []
+fixer = ScriptedFixer(STILL_BROKEN, FIXED)
+result = repair(BROKEN, ERROR, "crash", failed_model="gpt-4o-mini", fix=fixer, execute=scripted_execute(runs))
+if not result["success"] or result["stop_reason"] != "success" or len(result["iterations"]) != 2:
+    print(f"❌ Expected success on attempt 2: {result['stop_reason']}, {len(result['iterations'])} iterations")
+    exit(1)
+second = fixer.calls[1]
+if second["attempt"] != 2 or second["code"] != STILL_BROKEN or "Earlier fix attempts" not in second["error"] \
+        or "TypeError" not in second["error"] or fixer.calls[0]["failed_model"] != "gpt-4o-mini":
+    print(f"❌ Attempt 2 should fix attempt 1's code with the history: {second}")
+    exit(1)
+if result["total_tokens"] != 800 or any(r["fix_ms"] < 0 or r["execute_ms"] < 0 for r in result["iterations"]):
+    print(f"❌ Expected per-iteration timings and 800 tokens: {result}")
+    exit(1)
+print(f"✅ Succeeded on attempt 2, history carried, {result['total_tokens']} tokens, ${result['total_cost']}")
+
+print("\n2. Repeats are not re-run; oscillation stops the loop...")
+runs = []
+# Attempt 1 runs, attempt 2 is the original with a comment, attempt 3 is attempt 1 again
+fixer = ScriptedFixer(STILL_BROKEN, "# average\n" + BROKEN, STILL_BROKEN, FIXED)
+result = repair(BROKEN, ERROR, "crash", fix=fixer, execute=scripted_execute(runs), max_iterations=5)
+outcomes = [r["outcome"] for r in result["iterations"]]
+if result["stop_reason"] != "oscillation" or len(runs) != 1 or outcomes != ["crash", "repeat", "repeat"]:
+    print(f"❌ Expected one run then two skipped repeats: {result['stop_reason']}, {outcomes}, {len(runs)} runs")
+    exit(1)
+if [r["repeat_of"] for r in result["iterations"]] != [None, 0, 1] or "different approach" not in fixer.calls[2]["error"]:
+    print("❌ Repeats should name the version they repeat and ask for a different approach")
+    exit(1)
+print(f"✅ {outcomes} - 1 execution, stopped on oscillation")
+
+print("\n3. Budgets...")
+runs = []
+fixer = ScriptedFixer(STILL_BROKEN, STILL_BROKEN + "x = 1\n", STILL_BROKEN + "x = 2\n", tokens=1000)
+result = repair(BROKEN, ERROR, "crash", fix=fixer, execute=scripted_execute(runs), max_iterations=5, max_tokens=1500)
+if result["stop_reason"] != "token_budget" or len(result["iterations"]) != 2 or result["success"]:
+    print(f"❌ Expected the token budget to stop after 2 attempts: {result['stop_reason']}")
+    exit(1)
+result = repair(BROKEN, ERROR, "crash", fix=ScriptedFixer(FIXED), execute=scripted_execute([]), max_seconds=0)
+if result["stop_reason"] != "time_budget" or result["iterations"] or result["code"] != BROKEN:
+    print(f"❌ Expected the time budget to stop before any fix: {result['stop_reason']}")
+    exit(1)
+print("✅ Token budget stops after 2 attempts, zero time budget makes none")
+
+print("\n🎉 Test 26 PASSED - Repair loop works!")
@@ -0,0 +1,118 @@
+"""
+Test 27: Fix Cache
+Checks failure fingerprints (formatting-insensitive, exception type + failing
+line), that only fixes verified by re-execution are reused with no LLM call,
+that a failed re-run un-verifies a fix, persistence across restarts, LRU
+eviction, and the repair loop recording results.
+Offline - stand-in OpenAI client (fakes.py), temporary SQLite file.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["FIX_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "fixes.sqlite")
+
+print("="*60)
+print("TEST 27: Fix Cache")
+print("="*60)
+
+from backend import config, fix_cache, fixer
+from backend.repair_loop import repair
+from fakes import FakeCompletions, fake_openai
+
+BROKEN = """numbers = [10, 20, 30]
+total = sum(numbers)
+count = 0
+average = total / count
+print(f"Average: {average}")
+"""
+REFORMATTED = "# same script, new comments\n" + BROKEN.replace("total = sum(numbers)", "total   =   sum( numbers )")
+FIXED = BROKEN.replace("count = 0", "count = len(numbers)")
+ERROR = """Traceback (most recent call last):
+  File "/home/daytona/script.py", line 4, in <module>
+    average = total / count
+ZeroDivisionError: division by zero"""
+
+
+# Always answers with FIXED
+completions = FakeCompletions(FIXED, prompt_tokens=200, completion_tokens=40)
+fixer.client = fake_openai(completions)
+
+print("\n1. Fingerprints...")
+key = fix_cache.fingerprint(BROKEN, ERROR)
+if fix_cache.fingerprint(REFORMATTED, ERROR) != key:
+    print("❌ Formatting/comments should not change the fingerprint")
+    exit(1)
+if fix_cache.fingerprint(BROKEN, ERROR.replace("line 4", "line 5")) == key or \
+        fix_cache.fingerprint(BROKEN, ERROR.replace("ZeroDivisionError", "TypeError")) == key:
+    print("❌ Failing line and exception type should be part of the fingerprint")
+    exit(1)
+types = [fix_cache.exception_type(ERROR), fix_cache.exception_type("Unhandled KeyError at script.py line 4: 'x'"),
+         fix_cache.exception_type("Code produced no output. Type: silent_failure. Output: ")]
+if types != ["ZeroDivisionError", "KeyError", "silent_failure"]:
+    print(f"❌ Unexpected exception types: {types}")
+    exit(1)
+print(f"✅ Fingerprint {key[:12]}..., types {types}")
+
+print("\n2. Only verified fixes are reused...")
+fixed, metrics = fixer.fix_code(BROKEN, ERROR, return_metrics=True)
+fixer.fix_code(BROKEN, ERROR)
+if completions.calls != 2 or metrics["fix_fingerprint"] != key or metrics["cached"]:
+    print(f"❌ Unverified fixes must not be served ({completions.calls} LLM calls)")
+    exit(1)
+fix_cache.record_result(key, fixed, True)
+fixed_again, metrics = fixer.fix_code(REFORMATTED, ERROR, return_metrics=True)
+if completions.calls != 2 or not metrics["cached"] or fixed_again != FIXED or metrics["estimated_cost"] != 0:
+    print(f"❌ A verified fix should be reused with no LLM call: {metrics}")
+    exit(1)
+print(f"✅ Verified fix reused in {metrics['latency_ms']:.2f} ms, 0 tokens")
+
+print("\n3. A failed re-run un-verifies the fix...")
+fix_cache.record_result(key, FIXED, False)
+fixer.fix_code(BROKEN, ERROR)
+if completions.calls != 3:
+    print("❌ A fix that failed re-execution should not be served")
+    exit(1)
+fix_cache.record_result(key, FIXED, True)
+print("✅ Failed re-run -> LLM fix again")
+
+print("\n4. Persistence...")
+fix_cache._fix_cache = None  # as after a restart
+_, metrics = fixer.fix_code(BROKEN, ERROR, return_metrics=True)
+if not metrics["cached"] or completions.calls != 3:
+    print("❌ Verified fix should survive a restart (SQLite tier)")
+    exit(1)
+print(f"✅ Served from disk after restart ({fix_cache.get_fix_cache().stats()['disk']['entries']} entries)")
+
+print("\n5. Repair loop verifies its fixes...")
+other = BROKEN.replace("[10, 20, 30]", "[1, 2]")
+runs = []
+
+def execute(code, filename):
+    runs.append(code)
+    return True, "Average: 1.5\n", "", "success"
+
+result = repair(other, ERROR, "crash", fix=fixer.fix_code, execute=execute)
+calls = completions.calls
+result_again = repair(other, ERROR, "crash", fix=fixer.fix_code, execute=execute)
+if not (result["success"] and result_again["success"]) or completions.calls != calls \
+        or not result_again["iterations"][0]["cached"]:
+    print(f"❌ Second repair of the same failure should use the cache ({completions.calls - calls} LLM calls)")
+    exit(1)
+print("✅ Second repair healed from the cache, no LLM call")
+
+print("\n6. LRU eviction...")
+config.FIX_CACHE_SIZE = 2
+config.FIX_CACHE_DISK_SIZE = 2
+config.FIX_CACHE_PATH = os.path.join(tempfile.mkdtemp(), "fixes.sqlite")
+fix_cache._fix_cache = None
+keys = [fix_cache.fingerprint(f"print(1 / {i} - {i})", "ZeroDivisionError: division by zero") for i in range(3)]
+for k in keys:
+    fix_cache.record_result(k, "print(0)", True)
+if fix_cache.lookup(keys[0]) is not None or fix_cache.lookup(keys[2]) is None:
+    print("❌ Oldest fix should be evicted past the size limit")
+    exit(1)
+print("✅ Least recently used fix evicted")
+
+print("\n🎉 Test 27 PASSED - Fix cache works!")
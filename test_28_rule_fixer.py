@@ -0,0 +1,103 @@
+"""
+Test 28: Rule-Based Fast-Path Fixer
+Checks the deterministic fixes (missing stdlib import, unprinted result,
+define-only code), that fix_code uses them without an LLM call, falls back
+to the LLM when no rule applies, and records per-rule hit rate and latency.
+Offline - stand-in OpenAI client (fakes.py), local execution of the fixed code.
+"""
+
+import contextlib
+import io
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+print("="*60)
+print("TEST 28: Rule-Based Fast-Path Fixer")
+print("="*60)
+
+from backend import fixer, rule_fixer
+from fakes import FakeCompletions, fake_openai
+
+SILENT = "Code produced no output. Type: silent_failure. Output: "
+
+
+def run(code):
+    """stdout of running code in-process."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        exec(compile(code, "fixed.py", "exec"), {"__name__": "__main__"})
+    return out.getvalue()
+
+
+CASES = [
+    ("missing_import",
+     '"""Circle area."""\nradius = 2\nprint(round(math.pi * radius ** 2, 2))\n',
+     "NameError: name 'math' is not defined", "12.57\n"),
+    ("print_result",
+     "def fibonacci(n):\n    a, b = 0, 1\n    for _ in range(n):\n        a, b = b, a + b\n    return a\n\nfibonacci(10)\n",
+     SILENT, "55\n"),
+    ("print_result",
+     "values = [3, 1, 2]\nordered = sorted(values)\n", SILENT, "[1, 2, 3]\n"),
+    ("call_functions",
+     "def main():\n    print('report ready')\n", SILENT, "report ready\n"),
+    ("call_functions",
+     "import math\n\ndef answer():\n    return 42\n\ndef helper(x):\n    return x\n", SILENT, "42\n"),
+]
+
+print("\n1. Rules...")
+for expected_rule, code, error, expected_output in CASES:
+    result = rule_fixer.fix(code, error)
+    if result is None or result[1] != expected_rule:
+        print(f"❌ Expected rule {expected_rule} for:\n{code}\ngot {result}")
+        exit(1)
+    fixed, rule, latency_ms = result
+    output = run(fixed)
+    if output != expected_output:
+        print(f"❌ Rule {rule} output {output!r}, expected {expected_output!r}:\n{fixed}")
+        exit(1)
+    print(f"✅ {rule}: {expected_output.strip()!r} in {latency_ms:.2f} ms")
+
+print("\n2. Conservative - no rule for ambiguous failures...")
+no_rule = [
+    ("print(undefined_thing)\n", "NameError: name 'undefined_thing' is not defined"),
+    ("def greet(name):\n    return 'hi ' + name\n", SILENT),
+    ("def log():\n    pass\n\nlog()\n", SILENT),
+    ("def summarize(values):\n    total = sum(values)\n\nresult = summarize([1, 2, 3])\n", SILENT),
+    ("print(1 / 0)\n", "ZeroDivisionError: division by zero"),
+]
+for code, error in no_rule:
+    if rule_fixer.fix(code, error) is not None:
+        print(f"❌ No rule should apply to:\n{code}")
+        exit(1)
+print(f"✅ {len(no_rule)} ambiguous failures left to the LLM")
+
+print("\n3. fix_code uses the rules first...")
+completions = FakeCompletions("print(1)", completion_tokens=5)
+fixer.client = fake_openai(completions)
+fixed, metrics = fixer.fix_code(CASES[0][1], CASES[0][2], return_metrics=True, use_cache=False)
+if completions.calls or metrics["rule"] != "missing_import" or metrics["total_tokens"] or metrics["tier"] != "local":
+    print(f"❌ Expected a rule fix with no LLM call: {metrics}")
+    exit(1)
+fixed, metrics = fixer.fix_code("print(1 / 0)\n", "ZeroDivisionError: division by zero",
+                                return_metrics=True, use_cache=False)
+if completions.calls != 1 or metrics["rule"] is not None:
+    print("❌ No rule applies -> the LLM should fix it")
+    exit(1)
+print("✅ Rule fix skipped the LLM; ZeroDivisionError went to the LLM")
+
+print("\n4. Per-rule stats...")
+stats = rule_fixer.rule_stats()
+if any(key not in stats.get("missing_import", {}) for key in ("hits", "hit_rate", "avg_latency_ms")):
+    print(f"❌ Missing stats: {stats}")
+    exit(1)
+rule_fixer.record_result("missing_import", True)
+for rule, rule_stats in rule_fixer.rule_stats().items():
+    print(f"   {rule}: {rule_stats['hits']}/{rule_stats['attempts']} hits, "
+          f"{rule_stats['avg_latency_ms']} ms avg, success rate {rule_stats['success_rate']}")
+if rule_fixer.rule_stats()["missing_import"]["success_rate"] != 1.0:
+    print("❌ Re-execution results should be tracked per rule")
+    exit(1)
+print("✅ Hit rate, latency and success rate per rule")
+
+print("\n🎉 Test 28 PASSED - Rule fixer works!")
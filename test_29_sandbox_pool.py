@@ -0,0 +1,152 @@
+"""
+Test 29: Sandbox Pool
+Checks that leased sandboxes are reused, retired after SANDBOX_POOL_MAX_USES,
+replaced when they fail a health check, that the pool stays within its
+min/max size (a failed cold start frees its slot for waiting leases right
+away), and that releasing a sandbox kills the processes its job left
+running - on a background thread, so the lease ends without waiting for it.
+Offline - stand-in Daytona client whose sandboxes run commands on this
+machine under a private directory (fakes.py).
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+os.environ["KERNEL_ENABLED"] = "false"
+
+print("="*60)
+print("TEST 29: Sandbox Pool")
+print("="*60)
+
+from backend.sandbox_pool import SandboxPool
+from fakes import FakeDaytona, wait_until
+
+
+print("\n1. Leases reuse the same sandbox...")
+client = FakeDaytona()
+pool = SandboxPool(lambda: client, image="python:3.11-slim", min_size=0, max_size=2, max_uses=3)
+pool.start()
+ids = []
+for _ in range(3):
+    with pool.lease() as sandbox:
+        ids.append(sandbox.id)
+if ids != ["sandbox-0"] * 3 or len(client.created) != 1:
+    print(f"❌ Expected one sandbox for three leases, got {ids} ({len(client.created)} created)")
+    exit(1)
+print(f"✅ 3 leases, 1 sandbox created: {pool.stats()}")
+
+print("\n2. Retired after max_uses...")
+if not wait_until(lambda: client.created[0].deleted):
+    print("❌ Sandbox should be deleted after max_uses leases")
+    exit(1)
+with pool.lease() as sandbox:
+    fresh = sandbox.id
+if fresh != "sandbox-1" or not wait_until(lambda: pool.stats()["idle"] == 1):
+    print(f"❌ Expected a new sandbox after retirement, got {fresh}: {pool.stats()}")
+    exit(1)
+print(f"✅ sandbox-0 deleted after 3 uses, next lease got {fresh}")
+
+print("\n3. Unhealthy idle sandboxes are replaced...")
+pool.health_interval = 0
+client.created[1].broken = True
+with pool.lease() as sandbox:
+    replacement = sandbox.id
+if replacement != "sandbox-2" or not wait_until(lambda: client.created[1].deleted):
+    print(f"❌ Expected the broken sandbox discarded and replaced, got {replacement}")
+    exit(1)
+pool.health_interval = 30
+print(f"✅ Broken sandbox-1 discarded, lease got {replacement}")
+pool.shutdown()
+
+print("\n4. min_size / max_size bounds...")
+client = FakeDaytona()
+pool = SandboxPool(lambda: client, image="python:3.11-slim", min_size=2, max_size=2, max_uses=10)
+pool.start()
+if not wait_until(lambda: pool.stats()["idle"] == 2):
+    print(f"❌ Background thread should warm min_size sandboxes: {pool.stats()}")
+    exit(1)
+with pool.lease() as first, pool.lease() as second:
+    started = time.perf_counter()
+    try:
+        with pool.lease(timeout=0.3):
+            pass
+        print("❌ A third lease should not exceed max_size")
+        exit(1)
+    except TimeoutError:
+        waited = time.perf_counter() - started
+if len(client.created) != 2 or first.id == second.id:
+    print(f"❌ Expected exactly 2 distinct sandboxes, created {len(client.created)}")
+    exit(1)
+print(f"✅ Warmed to 2 idle; third concurrent lease timed out after {waited:.2f}s without creating more")
+
+print("\n5. Release kills the job's leftover processes...")
+with pool.lease() as sandbox:
+    # A job that left a background process running in the job directory
+    os.makedirs(sandbox.work_dir, exist_ok=True)
+    open(os.path.join(sandbox.work_dir, "leftover.txt"), "w").write("secret")
+    stray = subprocess.Popen(["sleep", "60"], cwd=sandbox.work_dir)
+if not wait_until(lambda: stray.poll() is not None, timeout=2):
+    stray.kill()
+    print("❌ The stray process survived the scrub")
+    exit(1)
+if not wait_until(lambda: not os.listdir(sandbox.work_dir), timeout=2):
+    print(f"❌ Job directory not wiped: {os.listdir(sandbox.work_dir)}")
+    exit(1)
+print("✅ Stray process killed and job directory wiped before the next lease")
+pool.shutdown()
+
+print("\n6. A failed cold start wakes leases waiting for capacity...")
+client = FakeDaytona(delay=0.3, failures=1)
+pool = SandboxPool(lambda: client, image="python:3.11-slim", min_size=0, max_size=1)
+outcomes = []
+
+
+def lease_once():
+    try:
+        with pool.lease(timeout=5) as leased:
+            outcomes.append(leased.id)
+    except Exception as e:
+        outcomes.append(repr(e))
+
+
+first = threading.Thread(target=lease_once)
+first.start()
+time.sleep(0.1)
+started = time.perf_counter()
+waiter = threading.Thread(target=lease_once)
+waiter.start()
+first.join()
+waiter.join()
+waited = time.perf_counter() - started
+if sorted(outcomes) != ["RuntimeError('quota exceeded')", "sandbox-0"] or waited > 2:
+    print(f"❌ Expected the waiting lease to create a sandbox as soon as the first create failed, "
+          f"got {outcomes} after {waited:.2f}s")
+    exit(1)
+if not wait_until(lambda: pool.stats() == {"idle": 1, "leased": 0, "scrubbing": 0, "creating": 0}):
+    print(f"❌ Pool accounting is off after the failed create: {pool.stats()}")
+    exit(1)
+print(f"✅ Waiting lease got a sandbox {waited:.2f}s later instead of timing out")
+pool.shutdown()
+
+print("\n7. Scrubbing doesn't hold up the caller...")
+client = FakeDaytona()
+pool = SandboxPool(lambda: client, image="python:3.11-slim", min_size=0, max_size=1, max_uses=10)
+with pool.lease() as sandbox:
+    sandbox.scrub_seconds = 1.0
+    started = time.perf_counter()
+released = time.perf_counter() - started
+scrubbing = pool.stats()
+with pool.lease() as again:
+    waited = time.perf_counter() - started
+if released > 0.5 or scrubbing["scrubbing"] != 1 or scrubbing["idle"] != 0:
+    print(f"❌ Lease exit took {released:.2f}s ({scrubbing}) - the scrub should run in the background")
+    exit(1)
+if again is not sandbox or len(client.created) != 1 or waited < 0.9:
+    print(f"❌ The next lease should wait for the scrubbed sandbox, got {again.id} after {waited:.2f}s")
+    exit(1)
+print(f"✅ Lease ended in {released * 1000:.0f} ms, next lease reused the sandbox once scrubbed ({waited:.2f}s)")
+pool.shutdown()
+
+print("\n🎉 Test 29 PASSED - Sandbox pool works!")
@@ -0,0 +1,78 @@
+"""
+Test 30: Getting Scripts to the Interpreter
+Checks that the local backend runs a script bigger than the 128KB limit of a
+`python -c` argument (the wrapper goes in on stdin), and that the Daytona
+backend embeds scripts up to SANDBOX_INLINE_LIMIT_BYTES in the code_run
+payload and uploads bigger ones from memory with one upload_files call.
+Offline - stand-in Daytona client whose sandboxes run the wrapper locally
+(fakes.py).
+"""
+
+import os
+
+os.environ["KERNEL_ENABLED"] = "false"
+
+print("="*60)
+print("TEST 30: Script Upload Paths")
+print("="*60)
+
+from backend import config, sandbox_pool
+from backend.execution_backends import DaytonaBackend
+from backend.executor import execute_code
+from backend.sandbox_pool import WORK_DIR, SandboxPool
+from fakes import FakeDaytona
+
+
+def big_script(size):
+    """(script of about `size` bytes that prints how many items it holds, its expected output)."""
+    count = size // 12
+    items = ", ".join(f'"{i:08d}"' for i in range(count))
+    return f"DATA = [{items}]\nprint(len(DATA), DATA[-1])\n", f"{count} {count - 1:08d}\n"
+
+
+print("\n1. Local backend: script larger than 128KB...")
+code, expected = big_script(200 * 1024)
+success, output, error, error_type = execute_code(code, "test_big_local.py", backend="local", use_cache=False)
+if error_type != "success" or output != expected:
+    print(f"❌ Expected {expected!r}, got {error_type}: {output[:200]!r} {error[:500]}")
+    exit(1)
+print(f"✅ {len(code) // 1024} KB script ran from stdin")
+
+client = FakeDaytona()
+# The base pool execute_code leases from, backed by the stand-in client
+sandbox_pool._pools[None] = SandboxPool(lambda: client, image=config.SANDBOX_IMAGE, min_size=0, max_size=1)
+daytona = DaytonaBackend()
+
+print(f"\n2. Daytona: script below {config.SANDBOX_INLINE_LIMIT_BYTES // 1024}KB is inlined...")
+small, expected = big_script(100 * 1024)
+success, output, error, error_type = execute_code(small, "test_inline.py", backend=daytona, use_cache=False)
+sandbox = client.created[0]
+if error_type != "success" or output != expected:
+    print(f"❌ Inline run failed: {error_type}: {output[:200]!r} {error[:500]}")
+    exit(1)
+# Embedded sources are repr()s inside the wrapper
+if sandbox.fs.uploads or repr(small) not in sandbox.process.programs[-1]:
+    print(f"❌ Expected the script inside the code_run payload and no upload ({len(sandbox.fs.uploads)} uploads)")
+    exit(1)
+print(f"✅ {len(small) // 1024} KB script ran inline, 0 uploads")
+
+print(f"\n3. Daytona: script above {config.SANDBOX_INLINE_LIMIT_BYTES // 1024}KB is uploaded...")
+large, expected = big_script(300 * 1024)
+success, output, error, error_type = execute_code(large, "test_upload.py", backend=daytona, use_cache=False)
+if error_type != "success" or output != expected:
+    print(f"❌ Upload run failed: {error_type}: {output[:200]!r} {error[:500]}")
+    exit(1)
+if len(sandbox.fs.uploads) != 1:
+    print(f"❌ Expected one upload_files call, got {len(sandbox.fs.uploads)}")
+    exit(1)
+(source, destination), = sandbox.fs.uploads[0]
+if source != large.encode("utf-8") or destination != f"{WORK_DIR}/script.py":
+    print(f"❌ Expected the script's bytes uploaded to {WORK_DIR}/script.py, got {destination}")
+    exit(1)
+if repr(large) in sandbox.process.programs[-1] or len(sandbox.process.programs[-1]) > len(large) // 4:
+    print("❌ An uploaded script shouldn't also be embedded in the code_run payload")
+    exit(1)
+print(f"✅ {len(large) // 1024} KB script uploaded from memory in one request, "
+      f"{len(sandbox.process.programs[-1]) // 1024} KB wrapper")
+
+print("\n🎉 Test 30 PASSED - Script upload paths work!")
@@ -0,0 +1,88 @@
+"""
+Test 31: Shared Daytona Client Registry
+Checks that daytona_client.get_client hands out one client per (api_url,
+api_key), a new one for other credentials or after reset_clients(), and that
+concurrent first calls build the client exactly once.
+Offline - clients are built with placeholder keys and never make a request.
+"""
+
+import threading
+import time
+
+print("="*60)
+print("TEST 31: Daytona Client Registry")
+print("="*60)
+
+from backend import config, daytona_client
+
+print("\n1. One client per config...")
+first = daytona_client.get_client("key-a", "https://daytona.example/api")
+again = daytona_client.get_client("key-a", "https://daytona.example/api")
+other_key = daytona_client.get_client("key-b", "https://daytona.example/api")
+other_url = daytona_client.get_client("key-a", "https://other.example/api")
+if first is not again:
+    print("❌ The same config should get the same client")
+    exit(1)
+if other_key is first or other_url is first or other_key is other_url:
+    print("❌ A different api_key or api_url should get its own client")
+    exit(1)
+stats = daytona_client.client_stats()
+if stats["created"] != 3 or stats["reused"] != 1 or stats["cached"] != 3:
+    print(f"❌ Expected 3 built, 1 reused: {stats}")
+    exit(1)
+print(f"✅ Same config -> same client, other credentials -> new client: {stats}")
+
+print("\n2. Missing API key...")
+configured_key = config.DAYTONA_API_KEY
+config.DAYTONA_API_KEY = ""
+try:
+    daytona_client.get_client()
+    print("❌ Expected ValueError without an API key")
+    exit(1)
+except ValueError as e:
+    print(f"✅ ValueError: {e}")
+finally:
+    config.DAYTONA_API_KEY = configured_key
+
+print("\n3. reset_clients() forgets them...")
+daytona_client.reset_clients()
+if daytona_client.get_client("key-a", "https://daytona.example/api") is first:
+    print("❌ Expected a new client after reset_clients()")
+    exit(1)
+print("✅ New client after reset")
+
+print("\n4. Concurrent first use builds one client...")
+built = []
+real_new_client = daytona_client.new_client
+
+
+def slow_new_client(api_key, api_url):
+    # Wide window for a second thread to slip in if the registry weren't locked
+    time.sleep(0.1)
+    client = object()
+    built.append(client)
+    return client
+
+
+daytona_client.new_client = slow_new_client
+try:
+    results = []
+    start = threading.Barrier(16)
+
+    def worker():
+        start.wait()
+        results.append(daytona_client.get_client("key-concurrent", "https://daytona.example/api"))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+finally:
+    daytona_client.new_client = real_new_client
+if len(built) != 1 or len(results) != 16 or any(client is not built[0] for client in results):
+    print(f"❌ Expected 1 client shared by 16 threads, built {len(built)}")
+    exit(1)
+print("✅ 16 threads, 1 client built and shared")
+
+print("\n🎉 Test 31 PASSED - Daytona client registry works!")
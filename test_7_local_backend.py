@@ -0,0 +1,64 @@
+"""
+Test 7: Local Execution Backend
+Runs the executor through the resource-limited local subprocess backend.
+No network or Daytona account needed.
+"""
+
+print("="*60)
+print("TEST 7: Local Execution Backend")
+print("="*60)
+
+from backend.executor import execute_code
+from backend.execution_backends import LocalBackend
+
+# Step 1: Working code
+print("\nSTEP 1: Execute Working Code Locally")
+print("-"*60)
+success, output, error, error_type = execute_code('print("Hello from local backend!")', "test_local.py", backend="local")
+
+if success and error_type == "success" and "Hello from local backend!" in output:
+    print("✅ Local execution works")
+    print(f"   Output: {output.strip()}")
+else:
+    print(f"❌ Expected success, got {error_type}: {error}")
+    exit(1)
+
+# Step 2: Crash is captured
+print("\nSTEP 2: Execute Crashing Code Locally")
+print("-"*60)
+success, output, error, error_type = execute_code("x = 10 / 0", "test_local_crash.py", backend="local")
+
+if not success and error_type == "crash" and "ZeroDivisionError" in error:
+    print("✅ Crash captured")
+else:
+    print(f"❌ Expected crash, got {error_type}")
+    exit(1)
+
+# Step 3: API keys don't leak into the subprocess
+print("\nSTEP 3: Environment Is Scrubbed")
+print("-"*60)
+success, output, error, error_type = execute_code(
+    "import os\nprint([k for k in os.environ if 'KEY' in k or 'DSN' in k])", "test_local_env.py", backend="local"
+)
+
+if success and output.strip() == "[]":
+    print("✅ No secrets visible to the script")
+else:
+    print(f"❌ Secrets leaked into subprocess: {output}")
+    exit(1)
+
+# Step 4: CPU limit kills runaway loops
+print("\nSTEP 4: CPU Limit Enforced")
+print("-"*60)
+success, output, error, error_type = execute_code(
+    "while True:\n    pass", "test_local_loop.py", backend=LocalBackend(cpu_seconds=1)
+)
+
+if not success and error_type == "crash":
+    print("✅ Runaway loop was killed")
+    print(f"   Error: {error.strip()}")
+else:
+    print(f"❌ Expected crash from CPU limit, got {error_type}")
+    exit(1)
+
+print("\n🎉 Test 7 PASSED - Local backend works!")
@@ -0,0 +1,54 @@
+"""
+Test 8: Async / Concurrent Execution
+Runs several scripts concurrently through execute_many on the local backend.
+No network or Daytona account needed.
+"""
+
+import asyncio
+import time
+
+print("="*60)
+print("TEST 8: Async Concurrent Execution")
+print("="*60)
+
+from backend.executor import execute_many, execute_as_completed
+
+# Each script sleeps 1s - run serially this would take ~6s
+codes = [f"import time\ntime.sleep(1)\nprint('script {i} done')" for i in range(6)]
+
+# Step 1: Results come back in input order
+print("\nSTEP 1: execute_many (input order)")
+print("-"*60)
+start = time.time()
+results = asyncio.run(execute_many(codes, concurrency=6, backend="local"))
+elapsed = time.time() - start
+
+outputs = [output.strip() for _, output, _, _ in results]
+if outputs == [f"script {i} done" for i in range(6)]:
+    print(f"✅ All {len(results)} scripts succeeded in input order")
+else:
+    print(f"❌ Unexpected outputs: {outputs}")
+    exit(1)
+
+if elapsed < 4:
+    print(f"✅ Ran concurrently in {elapsed:.1f}s")
+else:
+    print(f"❌ Took {elapsed:.1f}s - scripts did not overlap")
+    exit(1)
+
+# Step 2: Results as they complete
+print("\nSTEP 2: execute_as_completed (completion order)")
+print("-"*60)
+codes = ["import time\ntime.sleep(1.5)\nprint('slow')", "print('fast')"]
+
+async def collect():
+    return [index async for index, _ in execute_as_completed(codes, concurrency=2, backend="local")]
+
+order = asyncio.run(collect())
+if order == [1, 0]:
+    print("✅ Fast script was yielded first")
+else:
+    print(f"❌ Unexpected completion order: {order}")
+    exit(1)
+
+print("\n🎉 Test 8 PASSED - Concurrent execution works!")
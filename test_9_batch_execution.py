@@ -0,0 +1,47 @@
+"""
+Test 9: Batch Execution in One Round Trip
+Runs several snippets through execute_batch and checks per-script isolation.
+Uses the local backend - no network or Daytona account needed.
+"""
+
+print("="*60)
+print("TEST 9: Batch Execution")
+print("="*60)
+
+from backend.executor import execute_batch
+
+snippets = [
+    'print("first")',
+    'x = 10 / 0',
+    'print(f"x defined here? {\'x\' in globals()}")',
+    'def helper():\n    return 42',
+]
+
+print(f"\nExecuting {len(snippets)} snippets in one batch...")
+print("-"*60)
+results = execute_batch(snippets, backend="local")
+
+if len(results) != len(snippets):
+    print(f"❌ Expected {len(snippets)} results, got {len(results)}")
+    exit(1)
+
+for i, (success, output, error, error_type) in enumerate(results):
+    print(f"   Script {i}: {error_type}")
+
+expected_types = ["success", "crash", "success", "silent_failure"]
+if [r[3] for r in results] != expected_types:
+    print(f"❌ Expected types {expected_types}")
+    exit(1)
+print("✅ Each script classified independently")
+
+if "ZeroDivisionError" not in results[1][2]:
+    print("❌ Crash traceback missing from script 1")
+    exit(1)
+print("✅ Crash captured in its own stderr")
+
+if results[2][1].strip() != "x defined here? False":
+    print(f"❌ Globals leaked between scripts: {results[2][1]}")
+    exit(1)
+print("✅ Scripts run in isolated globals")
+
+print("\n🎉 Test 9 PASSED - Batch execution works!")